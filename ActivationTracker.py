@@ -0,0 +1,316 @@
+import asyncio
+
+from collections import namedtuple
+from datetime import datetime, timezone
+
+from OpenwhiskClient import OpenwhiskClient
+from PollScheduler import PollScheduler
+
+
+# maximum page size allowed by the openwhisk activations list api
+ACTIVATIONS_LIST_LIMIT = 200
+# activations are listed from slightly before the oldest dispatch to account for clock differences with the controller
+ACTIVATIONS_LIST_SINCE_SLACK_MS = 10000
+
+# record: activation record returned by openwhisk, detected_ts: when the completion was noticed, checks: number of checks made
+Completion = namedtuple('Completion', ['record', 'detected_ts', 'checks'])
+
+
+class ActivationTracker:
+    """
+    A single polling service per orchestrator for every activation in flight, across batches, retries, object recovery and orchestrations.
+    Callers register an activation with `track` and await the returned future, which is resolved as soon as the activation is seen
+    to be completed. All the due activations are looked up together, with one list query or with concurrent GETs by id.
+    """
+
+    def __init__(self, http: OpenwhiskClient, url, logger, poll_mode='list', list_max_pages=5, straggler_interval=10,
+                 min_poll_interval=0.1, max_poll_interval=8, max_poll_errors=5, poll_error_timeout=60) -> None:
+        """
+        Parameters
+        ----------
+        http : OpenwhiskClient
+            client used for the api calls
+        url : str
+            base url of the openwhisk namespaces api.
+        logger : logging.Logger
+            logger of the orchestrator
+        poll_mode : str
+            'list' polls all recently completed activations with a single list query and falls back to a GET per activation
+            only for stragglers. 'id' makes one GET per due activation.
+        list_max_pages : int
+            maximum number of pages of the activations list fetched on a single poll.
+        straggler_interval : int
+            seconds after which an activation that was not found in the list is fetched directly by its id.
+        min_poll_interval : float
+            seconds before the first check of an activation without prediction, checks then back off exponentially.
+        max_poll_interval : float
+            maximum seconds between two checks of the same activation.
+        max_poll_errors : int
+            number of consecutive failed checks of an activation after which its caller gets the error.
+        poll_error_timeout : float
+            seconds after the first of consecutive failed checks of an activation after which its caller gets the error,
+            even if it has failed fewer than max_poll_errors times.
+
+        Returns
+        -------
+        None
+
+        """
+        self.http = http
+        self.url = url
+        self.logger = logger
+        self.poll_mode = poll_mode
+        self.list_max_pages = list_max_pages
+        self.straggler_interval = straggler_interval
+        self.min_poll_interval = min_poll_interval
+        self.max_poll_interval = max_poll_interval
+        self.max_poll_errors = max_poll_errors
+        self.poll_error_timeout = poll_error_timeout
+        self.task = None
+        self.task_loop = None
+
+    def __ensure_running(self):
+        """
+        Starts the polling task in the running event loop if it is not running already.
+        Futures of an earlier event loop can never be resolved, so the state is reset along with the task.
+        """
+        loop = asyncio.get_running_loop()
+        if self.task is not None and not self.task.done() and self.task_loop is loop:
+            return
+
+        self.scheduler = PollScheduler(
+            self.min_poll_interval, self.max_poll_interval)
+        self.wakeup = asyncio.Event()
+        # activation_id -> future resolved with its Completion
+        self.futures = dict()
+        self.start_times = dict()
+        self.last_direct_polls = dict()
+        # activation_id -> (number of consecutive failed checks, time of the first of them)
+        self.poll_errors = dict()
+        self.closing = False
+        self.task = loop.create_task(self.__run())
+        self.task_loop = loop
+
+    def track(self, activation_id, start_ts, expected_runtime=None) -> asyncio.Future:
+        """
+        Registers an activation to be polled.
+
+        Parameters
+        ----------
+        activation_id : str
+            activation to be polled
+        start_ts : datetime
+            time at which the activation was invoked
+        expected_runtime : float
+            predicted runtime in seconds, the first check is made around it.
+
+        Returns
+        -------
+        asyncio.Future
+            resolved with a Completion once the activation has completed.
+
+        """
+        self.__ensure_running()
+        future = asyncio.get_running_loop().create_future()
+        self.futures[activation_id] = future
+        self.start_times[activation_id] = start_ts
+        self.scheduler.add(activation_id, expected_runtime)
+        self.wakeup.set()
+        return future
+
+    def untrack(self, activation_id):
+        """
+        Stops polling an activation, its future is cancelled if it is still pending.
+        Returns the number of checks that were made for it.
+        """
+        if self.task is None or activation_id not in self.futures:
+            return 0
+        future = self.futures[activation_id]
+        num_checks = self.__forget(activation_id)
+        if not future.done():
+            future.cancel()
+        return num_checks
+
+    def __forget(self, activation_id):
+        """
+        Removes all the state kept for an activation and returns the number of checks that were made for it.
+        """
+        self.futures.pop(activation_id, None)
+        self.start_times.pop(activation_id, None)
+        self.last_direct_polls.pop(activation_id, None)
+        self.poll_errors.pop(activation_id, None)
+        return self.scheduler.remove(activation_id)
+
+    async def __get_call(self, api_url, params=None):
+        return await self.http.get(api_url, params)
+
+    async def __fetch_activations_by_id(self, activation_ids):
+        """
+        Fetches the activation record of every activation id with one GET call per id. The calls are made concurrently.
+
+        Parameters
+        ----------
+        activation_ids : str[]
+            activation ids to fetch
+
+        Returns
+        -------
+        dict[str, dict]
+            activation records keyed by activation id, only for the activations that have completed.
+
+        """
+        def _get_url(activation_id):
+            """
+            returns a url that can be used for polling and getting details for a particular activation id.
+            """
+            return "{}/guest/activations/{}".format(self.url, activation_id)
+
+        responses = await asyncio.gather(*[
+            self.__get_call(_get_url(activation_id=activation_id)) for activation_id in activation_ids
+        ])
+
+        polled_ts = datetime.utcnow()
+        completed = {}
+        for activation_id, responseData in zip(activation_ids, responses):
+            if activation_id in self.start_times:
+                self.last_direct_polls[activation_id] = polled_ts
+            if responseData.get('end', None) is not None:
+                completed[activation_id] = responseData
+
+        return completed
+
+    async def __fetch_activations_by_list(self, activation_ids):
+        """
+        Fetches the records of all the activations completed since the oldest of activation_ids was dispatched using the
+        activations list api, and matches them against activation_ids. Activations that are not found in the list
+        are fetched by id, but only once every straggler_interval seconds.
+
+        Parameters
+        ----------
+        activation_ids : str[]
+            activation ids to fetch
+
+        Returns
+        -------
+        dict[str, dict]
+            activation records keyed by activation id, only for the activations that have completed.
+
+        """
+        url = "{}/guest/activations".format(self.url)
+        oldest_start = min(self.start_times[activation_id]
+                           for activation_id in activation_ids)
+        since = int(oldest_start.replace(tzinfo=timezone.utc).timestamp()
+                    * 1000) - ACTIVATIONS_LIST_SINCE_SLACK_MS
+
+        outstanding = set(activation_ids)
+        completed = {}
+        for page in range(self.list_max_pages):
+            records = await self.__get_call(url, {
+                'docs': 'true',
+                'since': since,
+                'limit': ACTIVATIONS_LIST_LIMIT,
+                'skip': page * ACTIVATIONS_LIST_LIMIT
+            })
+            if not isinstance(records, list):
+                # list api is not available, every outstanding activation is treated as a straggler
+                self.logger.info(
+                    "Listing activations failed with: {}".format(records))
+                return await self.__fetch_activations_by_id(activation_ids)
+
+            for record in records:
+                activation_id = record.get('activationId', None)
+                if activation_id in outstanding and record.get('end', None) is not None:
+                    completed[activation_id] = record
+                    outstanding.remove(activation_id)
+
+            if not outstanding or len(records) < ACTIVATIONS_LIST_LIMIT:
+                break
+
+        now = datetime.utcnow()
+        stragglers = [activation_id for activation_id in outstanding if (
+            now - self.last_direct_polls.get(activation_id, self.start_times[activation_id])).total_seconds() >= self.straggler_interval]
+        if stragglers:
+            completed.update(await self.__fetch_activations_by_id(stragglers))
+
+        return completed
+
+    def __handle_poll_error(self, due, error):
+        """
+        Checks the due activations again later, with the same backoff as when they have not completed, as a failed
+        poll is usually transient. Only the callers of the activations that have failed max_poll_errors checks in a row,
+        or for longer than poll_error_timeout seconds, get the error instead of waiting forever.
+        """
+        now = datetime.utcnow()
+        for activation_id in due:
+            future = self.futures.get(activation_id, None)
+            if future is None:
+                continue
+            num_errors, first_error_ts = self.poll_errors.get(
+                activation_id, (0, now))
+            num_errors += 1
+            if num_errors < self.max_poll_errors and (now - first_error_ts).total_seconds() < self.poll_error_timeout:
+                self.poll_errors[activation_id] = (num_errors, first_error_ts)
+                self.scheduler.reschedule(activation_id)
+                continue
+            self.logger.info("Giving up polling for {} after {} failed checks".format(
+                activation_id, num_errors))
+            self.__forget(activation_id)
+            if not future.done():
+                future.set_exception(error)
+
+    async def __run(self):
+        """
+        Polling loop that keeps running in the event loop. It only checks when some activation is due according to the
+        poll scheduler, and sleeps until the next check is due or a new activation is tracked.
+        """
+        while not self.closing:
+            due = self.scheduler.pop_due()
+            if due:
+                self.logger.info("Polling for: {}".format(due))
+                try:
+                    # a single list query answers for every tracked activation, not just the due ones
+                    if self.poll_mode == 'list':
+                        completed = await self.__fetch_activations_by_list(list(self.futures))
+                    else:
+                        completed = await self.__fetch_activations_by_id(due)
+                except Exception as e:
+                    self.logger.info("Polling failed with: {}".format(e))
+                    self.__handle_poll_error(due, e)
+                    continue
+
+                detected_ts = datetime.utcnow()
+                for activation_id, record in completed.items():
+                    future = self.futures.get(activation_id, None)
+                    if future is None:
+                        continue
+                    checks = self.__forget(activation_id)
+                    if not future.done():
+                        future.set_result(
+                            Completion(record, detected_ts, checks))
+
+                for activation_id in due:
+                    self.poll_errors.pop(activation_id, None)
+                    self.scheduler.reschedule(activation_id)
+
+            self.wakeup.clear()
+            try:
+                await asyncio.wait_for(self.wakeup.wait(), self.scheduler.time_to_next())
+            except asyncio.TimeoutError:
+                pass
+
+    async def close(self):
+        """
+        Stops the polling task, pending futures are cancelled.
+        """
+        if self.task is None:
+            return
+        for future in self.futures.values():
+            if not future.done():
+                future.cancel()
+        # the task is asked to return rather than cancelled, as wait_for can swallow a cancellation that races with the wakeup
+        if self.task_loop is asyncio.get_running_loop():
+            self.closing = True
+            self.wakeup.set()
+            await self.task
+        self.task = None
+        self.task_loop = None
@@ -0,0 +1,117 @@
+import asyncio
+import math
+
+from DispatchOrder import PrioritySemaphore
+
+
+class AdaptiveSemaphore(PrioritySemaphore):
+    """
+    A PrioritySemaphore whose number of slots follows the capacity of the openwhisk namespace with AIMD. The limit grows
+    additively, by about one slot for every limit activations completing normally, and is cut multiplicatively when an
+    invocation is throttled (429/503) or when the time activations wait in the openwhisk queue rises well above its baseline.
+    The limit never goes over max_limit, the parallelisation asked for.
+    """
+
+    def __init__(self, max_limit, logger, min_limit=1, increase=1, decrease_factor=0.9, decrease_cooldown=1,
+                 queue_wait_factor=4, min_queue_wait=0.1) -> None:
+        """
+        Parameters
+        ----------
+        max_limit : int
+            maximum number of slots, the limit starts at it.
+        logger : logging.Logger
+            logger of the orchestrator
+        min_limit : int
+            minimum number of slots
+        increase : float
+            slots added once limit activations have completed normally.
+        decrease_factor : float
+            the limit is multiplied by it on backpressure. Every throttled invocation cuts the limit, as each one shows
+            the namespace is still full, so a burst of them cuts it by several times this factor.
+        decrease_cooldown : float
+            seconds after a cut during which a long queue wait does not cut the limit again, as the activations
+            which were queued before the cut complete after it.
+        queue_wait_factor : float
+            a queue wait over queue_wait_factor times the lowest queue wait seen is treated as backpressure.
+        min_queue_wait : float
+            seconds of queue wait below which it is never treated as backpressure.
+
+        Returns
+        -------
+        None
+
+        """
+        super().__init__(max_limit)
+        self.logger = logger
+        self.max_limit = max_limit
+        self.min_limit = min(min_limit, max_limit)
+        self.limit = float(max_limit)
+        self.increase = increase
+        self.decrease_factor = decrease_factor
+        self.decrease_cooldown = decrease_cooldown
+        self.queue_wait_factor = queue_wait_factor
+        self.min_queue_wait = min_queue_wait
+        # slots taken back by a cut while they were in use, they are dropped instead of being freed on release
+        self.debt = 0
+        self.base_queue_wait = None
+        self.last_decrease = None
+
+    def release(self):
+        if self.debt > 0:
+            self.debt -= 1
+            return
+        super().release()
+
+    def __resize(self, limit):
+        """
+        Changes the limit and adds or takes back the slots for its integral part.
+        """
+        change = math.floor(limit) - math.floor(self.limit)
+        self.limit = limit
+        while change > 0:
+            change -= 1
+            if self.debt > 0:
+                self.debt -= 1
+            else:
+                super().release()
+        if change < 0:
+            taken = min(self.value, -change)
+            self.value -= taken
+            self.debt += -change - taken
+
+    def on_completed(self, queue_wait=None):
+        """
+        Grows the limit for an activation that completed normally, or cuts it if the activation waited too long in the queue.
+
+        Parameters
+        ----------
+        queue_wait : float
+            seconds the activation waited in the openwhisk queue, None if it is not known.
+
+        Returns
+        -------
+        None
+
+        """
+        if queue_wait is not None:
+            if self.base_queue_wait is None or queue_wait < self.base_queue_wait:
+                self.base_queue_wait = queue_wait
+            if queue_wait > max(self.base_queue_wait * self.queue_wait_factor, self.min_queue_wait):
+                now = asyncio.get_running_loop().time()
+                if self.last_decrease is None or now - self.last_decrease >= self.decrease_cooldown:
+                    self.on_backpressure(
+                        'queue wait of {:.3f}s'.format(queue_wait))
+                return
+
+        if self.limit < self.max_limit:
+            self.__resize(min(self.limit + self.increase / self.limit, self.max_limit))
+
+    def on_backpressure(self, reason):
+        """
+        Cuts the limit multiplicatively, down to min_limit.
+        """
+        self.last_decrease = asyncio.get_running_loop().time()
+        limit = max(self.limit * self.decrease_factor, self.min_limit)
+        self.logger.info("Concurrency limit cut from {:.2f} to {:.2f} on {}".format(
+            self.limit, limit, reason))
+        self.__resize(limit)
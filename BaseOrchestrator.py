@@ -1,9 +1,11 @@
-import requests
-import urllib3
 import asyncio
+import contextvars
+import json
 import logging
+import os
+import random
 
-from datetime import datetime
+from datetime import datetime, timedelta, timezone
 from bson import ObjectId
 from pymongo import MongoClient, collection, UpdateOne
 from collections import defaultdict, namedtuple
@@ -11,18 +13,47 @@ from collections import defaultdict, namedtuple
 from typing import List
 
 from object_store import store
-from constants import MONGO_HOST, MONGO_PORT
-
-
-urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
-client = MongoClient(MONGO_HOST, MONGO_PORT)
-
-
-def get_logger(name):
+from object_store.metadata import MetadataStore
+from constants import MONGO_HOST, MONGO_PORT, MINIO_ENDPOINT, AWS_ACCESS_KEY_ID, AWS_SECRET_ACCESS_KEY
+from OpenwhiskClient import ThrottledException
+from Executor import Executor
+from OpenwhiskExecutor import OpenwhiskExecutor
+from InstrumentationWriter import InstrumentationWriter
+from OrchestrationDAG import OrchestrationDAG
+from DispatchOrder import DISPATCH_ORDERS, PrioritySemaphore, get_dispatch_order, get_downstream_lengths
+from AdaptiveSemaphore import AdaptiveSemaphore
+from NamespaceLimiter import NamespaceLimiter
+
+
+# shared with the object store, so that the process keeps a single connection pool to the document store
+client: MongoClient = store.get_mongo_client(
+    {'MONGO_HOST': MONGO_HOST, 'MONGO_PORT': MONGO_PORT})
+
+# number of the most recent actions of a name whose attempts are used for the speculation threshold
+SPECULATION_HISTORY_LIMIT = 200
+# number of the most recent actions of a name whose runtimes are used for ordering the dispatch
+DISPATCH_HISTORY_LIMIT = 1000
+# number of the most recent successful actions of a name looked up for a result to reuse
+MEMOIZATION_HISTORY_LIMIT = 1000
+
+
+def get_params_key(params):
+    """
+    Returns a canonical string for the parameters of an action, so that equal parameters can be matched across runs.
+    """
+    return json.dumps(params, sort_keys=True, default=str)
+
+
+def get_logger(name, log_file='logfile.log'):
     logger = logging.getLogger(name)
     logger.setLevel(logging.INFO)
 
-    fh = logging.FileHandler('logfile.log')
+    # every orchestrator of the process shares the logger, which writes each line to the file once
+    log_path = os.path.abspath(log_file)
+    if any(isinstance(handler, logging.FileHandler) and handler.baseFilename == log_path for handler in logger.handlers):
+        return logger
+
+    fh = logging.FileHandler(log_file)
     formatter = logging.Formatter('%(asctime)s %(levelname)-8s %(message)s')
     fh.setFormatter(formatter)
 
@@ -31,55 +62,230 @@ def get_logger(name):
     return logger
 
 
+class OrchestrationContext:
+    """
+    Keeps the state of a single orchestration, from start to stop.
+    """
+
+    def __init__(self, orch_id: ObjectId, name: str, input_size=0, weight=1) -> None:
+        self.orch_id = orch_id
+        self.name = name
+        self.input_size = input_size
+        self.weight = weight
+        self.start_ts = datetime.utcnow()
+        self.action_ids = set()
+        # action name -> predicted runtime, None if it can not be predicted
+        self.expected_runtimes = {}
+        # action name -> seconds after which a speculative copy is invoked, None if there are too few earlier attempts
+        self.speculation_thresholds = {}
+        # action name -> {parameters -> mean runtime} of its earlier actions
+        self.params_runtimes = {}
+        # action name -> seconds of work after it on the critical path of the last run, None until it is looked up
+        self.downstream_lengths = None
+        # (action name, parameters) -> actions recorded before a resume that have not been asked for again yet
+        self.recorded_actions = defaultdict(list)
+        # ids of the recorded actions asked for again, whose state is checked when they are next made
+        self.resumed_ids = set()
+        self.time_taken = None
+        self.action_time_taken = 0
+
+
 class BaseOrchestrator:
-    def __init__(self, auth) -> None:
+    def __init__(self, auth, url="https://localhost:31001/api/v1/namespaces", poll_mode='list', list_max_pages=5, straggler_interval=10,
+                 adaptive_polling=True, min_poll_interval=0.1, max_poll_interval=8, retry_backoff=0.5, max_retry_backoff=8,
+                 action_timeout=300, deadline_factor=4, min_action_timeout=30, speculation_percentile=0.95, speculation_factor=1.5,
+                 min_speculation_samples=10, adaptive_concurrency=True, limiter: NamespaceLimiter = None, memoization_ttl=24 * 3600,
+                 storage_config=None, executor: Executor = None, log_file='logfile.log') -> None:
+        """
+        Parameters
+        ----------
+        auth : (str, str)
+            auth tuple for openwhisk, use `wsk property get --auth` to get it.
+        url : str
+            base url of the openwhisk namespaces api.
+        poll_mode : str
+            'list' polls all recently completed activations with a single list query and falls back to a GET per activation
+            only for stragglers. 'id' makes one GET per outstanding activation on every poll.
+        list_max_pages : int
+            maximum number of pages of the activations list fetched on a single poll.
+        straggler_interval : int
+            seconds after which an activation that was not found in the list is fetched directly by its id.
+        adaptive_polling : bool
+            places the first check of an activation at the runtime predicted from earlier orchestrations
+            by InterpolatedPredictor. Without a prediction the first check is made after min_poll_interval.
+        min_poll_interval : float
+            seconds before the first check of an activation without prediction, checks then back off exponentially.
+        max_poll_interval : float
+            maximum seconds between two checks of the same activation.
+        retry_backoff : float
+            seconds after which a failed action is retried, doubling with every retry of the same action.
+        max_retry_backoff : float
+            maximum seconds before a retry.
+        action_timeout : float
+            seconds after which an activation that has not completed is given up as timed out, when its runtime can not be predicted.
+        deadline_factor : float
+            an activation whose runtime is predicted times out after deadline_factor times the predicted runtime.
+        min_action_timeout : float
+            minimum seconds before an activation whose runtime is predicted times out.
+        speculation_percentile : float
+            percentile of the runtimes of earlier attempts of an action used for detecting stragglers, when speculation is asked for.
+        speculation_factor : float
+            a copy of an activation is invoked once it has run for speculation_factor times that percentile.
+        min_speculation_samples : int
+            minimum number of earlier attempts of an action needed for speculating on it.
+        adaptive_concurrency : bool
+            adapts the number of actions running at a time to the capacity of the namespace with an AdaptiveSemaphore,
+            the parallelisation of a call is then its upper bound. Invocations throttled by openwhisk are made again
+            after a jittered backoff either way.
+        limiter : NamespaceLimiter
+            limits shared with the other orchestrations invoking actions in the namespace from this host, None for no shared limit.
+        memoization_ttl : float
+            seconds for which the result of a successful action can be reused by a memoized call, None for no expiry.
+        storage_config : dict
+            configuration of the object store used by the actions (STORAGE_ENDPOINT, AWS_ACCESS_KEY_ID and AWS_SECRET_ACCESS_KEY).
+            Memoization needs it for checking that the objects of an earlier action have not changed. The object store
+            configured in constants, which the actions use too, by default.
+        executor : Executor
+            runs the actions, an OpenwhiskExecutor for url by default. Pass a LocalExecutor to run them in local worker
+            processes instead, auth and the polling parameters are not used then.
+        log_file : str
+            file the orchestrator logs to.
+        """
         self.auth = auth
-        self.url = "https://localhost:31001/api/v1/namespaces"
-        self.logger = get_logger('transcoder')
-        self.store = store.ObjectStore(
-            db_config={'MONGO_HOST': MONGO_HOST, 'MONGO_PORT': MONGO_PORT})
-        self.orch_id = None
-        self.actions_ids = set()
-        self.orch_collection: collection.Collection = client['openwhisk']['orchestrations']
-        self.db_collection: collection.Collection = client['openwhisk']['actions']
+        self.url = url
+        self.adaptive_polling = adaptive_polling
+        self.retry_backoff = retry_backoff
+        self.max_retry_backoff = max_retry_backoff
+        self.action_timeout = action_timeout
+        self.deadline_factor = deadline_factor
+        self.min_action_timeout = min_action_timeout
+        self.speculation_percentile = speculation_percentile
+        self.speculation_factor = speculation_factor
+        self.min_speculation_samples = min_speculation_samples
+        self.max_poll_interval = max_poll_interval
+        self.adaptive_concurrency = adaptive_concurrency
+        self.limiter = limiter
+        self.memoization_ttl = memoization_ttl
+        self.predictor = None
+        self.logger = get_logger('transcoder', log_file)
+        # runs the actions, on openwhisk a single polling service tracks every activation of the orchestrator,
+        # whichever call or orchestration it belongs to
+        self.executor = executor or OpenwhiskExecutor(auth, url, self.logger, poll_mode=poll_mode, list_max_pages=list_max_pages,
+                                                      straggler_interval=straggler_interval, min_poll_interval=min_poll_interval,
+                                                      max_poll_interval=max_poll_interval)
+        if storage_config is None:
+            storage_config = dict(STORAGE_ENDPOINT=MINIO_ENDPOINT,
+                                  AWS_ACCESS_KEY_ID=AWS_ACCESS_KEY_ID,
+                                  AWS_SECRET_ACCESS_KEY=AWS_SECRET_ACCESS_KEY)
+        self.store = store.ObjectStore(storage_config,
+                                       db_config={'MONGO_HOST': MONGO_HOST, 'MONGO_PORT': MONGO_PORT})
+        # every task that calls start gets its own orchestration, so one orchestrator (along with its connection pool)
+        # can run many orchestrations concurrently, e.g. with asyncio.gather
+        self.__orchestration = contextvars.ContextVar(
+            'orchestration', default=None)
+        # coroutines use the awaitable collections of the metadata store, synchronous methods like stop use the collections directly
+        self.metadata = MetadataStore(
+            {'MONGO_HOST': MONGO_HOST, 'MONGO_PORT': MONGO_PORT})
+        self.actions = self.metadata.collection('actions')
+        self.orch_collection: collection.Collection = self.metadata.collection(
+            'orchestrations').sync
+        self.db_collection: collection.Collection = self.actions.sync
+        # instrumentation of the actions made while they run is written in batches off the event loop
+        self.instrumentation = InstrumentationWriter(
+            self.db_collection, self.logger)
+
+    @property
+    def orchestration(self) -> OrchestrationContext:
+        """
+        The orchestration started in the current task, or in the task that created it.
+        """
+        return self.__orchestration.get()
+
+    @property
+    def orch_id(self) -> ObjectId:
+        orchestration = self.orchestration
+        return orchestration.orch_id if orchestration else None
 
-    def start(self, name: str):
+    def start(self, name: str, input_size=0, weight=1):
         """
         Creates an orhcestration id for associating to every action that is made.
+        The orchestration belongs to the current task and the tasks it creates, so independent orchestrations
+        can be run concurrently by starting each of them in its own task.
+
+        Parameters
+        ----------
+        name : str
+            name of the orchestration
+        input_size : int
+            size of the input to the orchestration, used for predicting the runtime of its actions.
+        weight : float
+            share of the namespace given to the orchestration by the shared limiter, relative to the other orchestrations.
+
+        Returns
+        -------
+        OrchestrationContext
+            the started orchestration
+
         """
-        self.orch_id = self.orch_collection.insert_one({
+        # the lookups made for recovering and memoizing actions use these indexes
+        self.store.create_indexes()
+        orch_id = self.orch_collection.insert_one({
             'name': name,
             'creation_ts': datetime.utcnow(),
+            # kept apart from input_size, which is only set by stop
+            'start_input_size': input_size,
+            'weight': weight,
         }).inserted_id
-        self.orch_start = datetime.utcnow()
-        print(f"Orchestration {self.orch_id} started")
+        orchestration = OrchestrationContext(
+            orch_id, name, input_size, weight)
+        self.__orchestration.set(orchestration)
+        print(f"Orchestration {orch_id} started")
+        return orchestration
 
-    def __get_call(self, api_url):
+    def resume(self, orch_id):
         """
-        Makes a GET api call to the given url with insecure flag as true.
-        Used for polling and getting the data.
+        Resumes an orchestration whose orchestrator stopped before it was done, e.g. after a crash, instead of starting a new one.
+        Run the orchestrator again after calling it: every action it makes again with the same name and parameters is matched
+        with the action recorded for the orchestration. An action that had succeeded is not run again and its recorded result
+        is returned, an activation that was still running is adopted and polled, and only the other actions are invoked.
+
         Parameters
         ----------
-        api_url : str
-            Url to fetch
+        orch_id : ObjectId
+            id of the orchestration to resume
 
         Returns
         -------
-        dict
-            json response from the api call
+        OrchestrationContext
+            the resumed orchestration
 
         """
-        response = requests.get(api_url, auth=self.auth, verify=False)
-        return response.json()
+        if not isinstance(orch_id, ObjectId):
+            orch_id = ObjectId(orch_id)
+
+        orch_details = self.get_orch_details(orch_id)
+        orchestration = OrchestrationContext(orch_id, orch_details['name'], orch_details.get(
+            'start_input_size', 0), orch_details.get('weight', 1))
+        orchestration.start_ts = orch_details['creation_ts']
+        for info in self.db_collection.find({'orch_id': orch_id}, sort=[('creation_ts', 1)]):
+            orchestration.action_ids.add(info['_id'])
+            orchestration.recorded_actions[(info['action_name'], get_params_key(
+                info['action_params']))].append(info['_id'])
 
-    def __post_call(self, api_url, action_id, params):
+        self.orch_collection.update_one(
+            {'_id': orch_id}, {'$push': {'resume_ts': datetime.utcnow()}})
+        self.__orchestration.set(orchestration)
+        print(
+            f"Orchestration {orch_id} resumed with {len(orchestration.action_ids)} recorded actions")
+        return orchestration
+
+    async def __invoke_call(self, action_name, action_id, params):
         """
-        Makes a POST api call to the given url with insecure flag as true.
-        Used for invoking openwhisk action.
+        Invokes an action with the executor, passing the context of the orchestration to it.
         Parameters
         ----------
-        api_url : str
-            Url to use
+        action_name : str
+            name of the action
         action_id: ObjectId
             to be passed as a context to the action
         params: dict
@@ -87,27 +293,15 @@ class BaseOrchestrator:
 
         Returns
         -------
-        dict
-            json response from the api call
+        str
+            id of the activation
 
         """
-        headers = {"Content-Type": "application/json"}
         context = {"action_id": str(action_id), "orch_id": str(self.orch_id)}
-        self.actions_ids.add(action_id)
-        response = requests.post(
-            api_url, headers=headers, auth=self.auth, verify=False, json={**params, "context": context})
-
-        return response.json()
+        self.orchestration.action_ids.add(action_id)
+        return await self.executor.invoke(action_name, {**params, "context": context})
 
-    def _get_active_ids(self):
-        """    
-        returns non None items in the activation_ids array.
-        Used for finding the number of active actions at the time. 
-        """
-        return list(
-            filter(lambda x: x is not None, self.activation_ids))
-
-    def prepare_action(self, name, params):
+    def prepare_action(self, name, params, memoize=True):
         """
         Creates a request body that can be passed to make_action function
 
@@ -117,6 +311,8 @@ class BaseOrchestrator:
             The name of action
         params : obj
             The parameters which we are supposed to pass to the action.
+        memoize : bool
+            False for an action that is not deterministic, so that it is always run even in a memoized call.
 
         Returns
         -------
@@ -126,142 +322,670 @@ class BaseOrchestrator:
         return {
             'name': name,
             'body': params,
+            'memoize': memoize,
         }
 
-    async def __poller(self, num_to_poll):
+    async def __get_expected_runtime(self, action_name):
         """
-        Polling function that keeps running in the event loop.
+        Predicts the runtime of an action from the earlier runs of this orchestration. The prediction is made once per action name.
 
         Parameters
         ----------
-        num_to_poll : number
-            The number of action that the function will poll before it stops
+        action_name : str
+            Name of the action
 
         Returns
         -------
-        dict[]
-            final response from all the actions that were polled.
+        float
+            predicted runtime in seconds, None if it can not be predicted.
 
         """
-        def _get_url(activation_id):
-            """
-            returns a url that can be used for polling and getting details for a particular activation id.
-            """
-            return "{}/guest/activations/{}".format(self.url, activation_id)
+        if not self.adaptive_polling:
+            return None
+        return await self.__predict_runtime(action_name)
 
-        num_polled = 0
-        results = [None]*num_to_poll
+    async def __predict_runtime(self, action_name):
+        """
+        Predicts the runtime of an action with InterpolatedPredictor, whether adaptive polling is used or not.
+        """
+        expected_runtimes = self.orchestration.expected_runtimes
+        if action_name not in expected_runtimes:
+            # imported here as InterpolatedPredictor depends on this module
+            from InterpolatedPredictor import InterpolatedPredictor
+
+            try:
+                if self.predictor is None:
+                    # the predictor reads the history through this orchestrator
+                    self.predictor = InterpolatedPredictor(self)
+                expected_runtimes[action_name] = float(await asyncio.to_thread(
+                    self.predictor.predict_runtime, self.orchestration.name, action_name, self.orchestration.input_size))
+            except Exception as e:
+                # no history for this action yet
+                self.logger.info(
+                    "Could not predict runtime for {}: {}".format(action_name, e))
+                expected_runtimes[action_name] = None
+
+        return expected_runtimes[action_name]
+
+    async def __predict_action_runtime(self, action):
+        """
+        Predicts the runtime of a single action. Actions of the same name often take different times, e.g. for chunks of
+        different sizes, so the mean runtime of the earlier actions with the same parameters is used when there are some,
+        and the prediction for the action name otherwise.
 
-        while num_polled < num_to_poll:
-            self.logger.info("Polling for: {}".format(self._get_active_ids()))
-            for index, act_id_object in enumerate(self.activation_ids):
-                if act_id_object is None:
-                    continue
+        Parameters
+        ----------
+        action : dict
+            action containing action_id, name and body
 
-                action_id = act_id_object['action_id']
-                activation_id = act_id_object['activation_id']
+        Returns
+        -------
+        float
+            predicted runtime in seconds, None if it can not be predicted.
 
-                url = _get_url(activation_id=activation_id)
+        """
+        params_runtimes = await self.__get_params_runtimes(action['name'])
+        params = get_params_key(action['body'])
+        if params in params_runtimes:
+            return params_runtimes[params]
+        return await self.__predict_name_runtime(action['name'])
 
-                responseData = self.__get_call(url)
-                if responseData.get('end', None) is None:
-                    continue
+    async def __get_params_runtimes(self, action_name):
+        """
+        Returns the mean runtime of the recent actions of a name for each of their parameters, looked up once per action name.
+        """
+        params_runtimes = self.orchestration.params_runtimes
+        if action_name not in params_runtimes:
+            actions_info = await self.actions.find({'action_name': action_name, 'attempts.0': {'$exists': True}},
+                                                   {'action_params': 1, 'attempts': 1}, sort=[('creation_ts', -1)], limit=DISPATCH_HISTORY_LIMIT)
+            runtimes = defaultdict(list)
+            for info in actions_info:
+                runtimes[get_params_key(info['action_params'])].extend(
+                    attempt['time'] for attempt in info['attempts'] if not attempt.get('timed_out', False) and not attempt.get('ignored', False) and not attempt.get('cancelled', False))
+            params_runtimes[action_name] = {
+                params: sum(times) / len(times) for params, times in runtimes.items() if times}
+
+        return params_runtimes[action_name]
+
+    async def __predict_name_runtime(self, action_name):
+        """
+        Predicts the runtime of an action name with InterpolatedPredictor, or from the mean runtime of its recent actions
+        when the orchestrations they ran in can not be used for interpolation.
+        """
+        runtime = await self.__predict_runtime(action_name)
+        if runtime is None:
+            params_runtimes = await self.__get_params_runtimes(action_name)
+            if params_runtimes:
+                runtime = sum(params_runtimes.values()) / len(params_runtimes)
+        return runtime
+
+    async def __get_downstream_lengths(self):
+        """
+        Finds, for every action name, the seconds of work that followed it on the critical path of the last completed run of this
+        orchestration. The lineage of that run is taken from OrchestrationDAG, and the runtimes are predicted for this run.
 
-                result = responseData.get('response').get('result')
-                print(result)
-                time_taken = datetime.utcnow(
-                ) - self.start_times[activation_id]
-                update_changes = {
-                    '$push': {'attempts': {'start': self.start_times[activation_id], 'end': datetime.utcnow(), 'time': time_taken.total_seconds(), 'orch_id': self.orch_id}}
-                }
-                self.db_collection.update_one(
-                    {'_id': action_id}, update_changes)
-                if result.get('error', None) is not None:
-                    self.logger.info(
-                        "[{}] Poll completed with error for: {} in: {}".format(action_id, activation_id, time_taken))
-                    results[index] = {
-                        'success': False,
-                        'error': result.get('error'),
-                        'action_id': action_id,
-                    }
-                else:
-                    self.logger.info(
-                        "[{}] Poll completed for: {} in: {}".format(action_id, activation_id, time_taken))
-                    results[index] = {
-                        'success': True,
-                        'result': result,
-                        'action_id': action_id,
-                    }
+        Returns
+        -------
+        dict[str, float]
+            seconds of work after each action name, empty if there is no earlier run.
 
-                num_polled = num_polled+1
-                self.activation_ids[index] = None
+        """
+        orchestration = self.orchestration
+        if orchestration.downstream_lengths is None:
+            orchestration.downstream_lengths = {}
+            try:
+                last_runs = await self.metadata.collection('orchestrations').find(
+                    {'name': orchestration.name, 'finish_ts': {'$exists': True}}, {'_id': 1}, sort=[('finish_ts', -1)], limit=1)
+                if not last_runs:
+                    return orchestration.downstream_lengths
+
+                dag = OrchestrationDAG()
+                await self.metadata.run(dag.construct_dag, last_runs[0]['_id'])
+                action_names = {str(info['_id']): info['action_name'] for info in await self.actions.find(
+                    {'_id': {'$in': [ObjectId(action_id) for action_id in dag.memograph]}}, {'action_name': 1})}
+
+                # the dag points from the reader of an object to its writer, the dependents of a writer are its readers
+                dependents = defaultdict(set)
+                for action_id, node in dag.memograph.items():
+                    for prerequisite in node.children:
+                        if prerequisite in action_names and action_id in action_names:
+                            dependents[action_names[prerequisite]].add(
+                                action_names[action_id])
+                runtimes = {name: await self.__predict_name_runtime(name)
+                            for name in set(action_names.values())}
+                orchestration.downstream_lengths = get_downstream_lengths(
+                    runtimes, dependents)
+            except Exception as e:
+                self.logger.info(
+                    "Could not find the critical path of {}: {}".format(orchestration.name, e))
+
+        return orchestration.downstream_lengths
+
+    async def __get_dispatch_priorities(self, actions, dispatch_order):
+        """
+        Returns the priority of every action for the dispatch order, the higher the earlier it is invoked.
+        'longest_first' uses the predicted runtime of the action, and 'critical_path' adds the work that follows
+        the action in the lineage of the last run. None for the actions without any prediction.
+        """
+        downstream_lengths = await self.__get_downstream_lengths() if dispatch_order == 'critical_path' else {}
+        priorities = []
+        for action in actions:
+            runtime = await self.__predict_action_runtime(action)
+            downstream_length = downstream_lengths.get(action['name'], None)
+            if runtime is None and downstream_length is None:
+                priorities.append(None)
+            else:
+                priorities.append((runtime or 0) + (downstream_length or 0))
 
-            await asyncio.sleep(1)
+        return priorities
 
-        return results
+    def __get_action_timeout(self, expected_runtime, action_timeout=None):
+        """
+        Returns the seconds after which an activation times out, a multiple of its predicted runtime unless action_timeout is given.
+        """
+        if action_timeout is not None:
+            return action_timeout
+        if expected_runtime is None:
+            return self.action_timeout
+        return max(self.deadline_factor * expected_runtime, self.min_action_timeout)
 
-    async def __make_action(self, actions, parallelisation=2):
+    async def __get_speculation_threshold(self, action_name):
         """
-        Invokes openwhisk actions considering parallelisation into account. Note that this has nothing to do with retry mechanisms.
-        This is like a lower level of caller. This is also responsible for invoking the poller.
+        Seconds after which a running action is treated as a straggler and gets a speculative copy. It is speculation_factor times
+        the speculation_percentile of the runtimes of the earlier attempts of the action. The threshold is found once per action name.
+
         Parameters
         ----------
-        actions : dict[]
-            A array of multiple actions each containing action_id, action_name, and action_params
-        parallelisation: int
-            The maximum concurrency that is allowed
+        action_name : str
+            Name of the action
+
+        Returns
+        -------
+        float
+            threshold in seconds, None if there are not enough earlier attempts.
+
+        """
+        thresholds = self.orchestration.speculation_thresholds
+        if action_name not in thresholds:
+            actions_info = await self.actions.find({'action_name': action_name, 'attempts.0': {'$exists': True}},
+                                                   {'attempts': 1}, sort=[('creation_ts', -1)], limit=SPECULATION_HISTORY_LIMIT)
+            runtimes = sorted(attempt['time'] for info in actions_info for attempt in info['attempts']
+                              if not attempt.get('timed_out', False) and not attempt.get('ignored', False) and not attempt.get('cancelled', False))
+            if len(runtimes) < self.min_speculation_samples:
+                thresholds[action_name] = None
+            else:
+                percentile = runtimes[min(int(len(runtimes) * self.speculation_percentile),
+                                          len(runtimes) - 1)]
+                thresholds[action_name] = percentile * self.speculation_factor
+
+        return thresholds[action_name]
+
+    def __is_memoized_result_valid(self, action_id):
+        """
+        Checks that the result of an earlier action still holds: every object it read is at the version it read,
+        and every object it wrote still exists as it wrote it. An object without recorded version can not be checked.
+
+        Parameters
+        ----------
+        action_id : ObjectId
+            id of the earlier action
+
+        Returns
+        -------
+        bool
+            True if the result of the action can be reused.
+
+        """
+        objects = self.store.get_objects_for_action(action_id)
+        # an object the action read and then wrote over is checked against what it wrote
+        expected = {**objects['read'], **objects['written']}
+        if not expected:
+            return True
+        versions = self.store.get_object_versions(list(expected))
+        if versions is None:
+            return False
+        for object_path, obj in expected.items():
+            current = versions.get(object_path, None)
+            if current is None or obj.get('etag', None) is None:
+                return False
+            if current['etag'] != obj['etag'] or current['size'] != obj['size']:
+                return False
+
+        return True
+
+    async def __get_memoized_actions(self, infos):
+        """
+        Finds for each action the most recent successful action with the same name and parameters, made within
+        memoization_ttl, whose result is still valid. Results reused by a memoized call are not reused again,
+        so the ttl runs from when the action was actually run.
+
+        Parameters
+        ----------
+        infos : dict[]
+            records of the actions
 
         Returns
         -------
         dict[]
-            response from all the actions.
+            record of the earlier action for every action, None if there is none to reuse.
 
         """
-        self.start_times = dict()
-        start = datetime.utcnow()
+        query = {'result': {'$exists': True}, 'error': None,
+                 'memoized_from': {'$exists': False}}
+        if self.memoization_ttl is not None:
+            query['creation_ts'] = {
+                '$gte': datetime.utcnow() - timedelta(seconds=self.memoization_ttl)}
+        # (action name, parameters) -> earlier actions, the most recent first
+        candidates = defaultdict(list)
+        for action_name in {info['action_name'] for info in infos}:
+            for prior in await self.actions.find({**query, 'action_name': action_name}, {'action_params': 1, 'result': 1},
+                                                 sort=[('creation_ts', -1)], limit=MEMOIZATION_HISTORY_LIMIT):
+                candidates[(action_name, get_params_key(
+                    prior['action_params']))].append(prior)
+
+        # actions with the same parameters share the check of an earlier action
+        checks = {}
+
+        async def _find(info):
+            for prior in candidates.get((info['action_name'], get_params_key(info['action_params'])), []):
+                if prior['_id'] == info['_id']:
+                    continue
+                if prior['_id'] not in checks:
+                    checks[prior['_id']] = asyncio.ensure_future(self.metadata.run(
+                        self.__is_memoized_result_valid, prior['_id']))
+                if await checks[prior['_id']]:
+                    return prior
+            return None
 
-        self.logger.info('Invoking Action requested for {} with {} in parallel'.format(
-            len(actions), parallelisation))
+        return await asyncio.gather(*[_find(info) for info in infos])
+
+    async def __invoke(self, action):
+        """
+        Invokes an action and registers its activation with the executor. A concurrency slot has to be taken for it first.
+
+        Parameters
+        ----------
+        action : dict
+            action containing action_id, action_name, and action_params
+
+        Returns
+        -------
+        (str, datetime, float, asyncio.Future)
+            activation id, time of invocation, predicted runtime and the future returned by the executor.
 
-        self.activation_ids = [None] * len(actions)
+        """
+        print(f"Performing action for: {action}")
+        activation_id = await self.__invoke_call(
+            action['name'], action['action_id'], action['body'])
+        attempt_ts = datetime.utcnow()
+        update_changes = {
+            '$set': {'last_attempt_ts': attempt_ts},
+            '$push': {'activation_ids': activation_id}
+        }
+        await self.instrumentation.write(UpdateOne({'_id': action['action_id']}, update_changes))
+        expected_runtime = await self.__get_expected_runtime(action['name'])
+        completion_future = self.executor.track(
+            activation_id, attempt_ts, expected_runtime)
+        return activation_id, attempt_ts, expected_runtime, completion_future
+
+    async def __record_attempt(self, action_id, activation_id, start_ts, completion, speculative=False, ignored=False, missed_deadline=None, num_checks=0,
+                               cancelled=False, poll_error=None):
+        """
+        Pushes an attempt of an action. completion is None if the activation was given up before it completed, if the
+        executor stopped waiting for it, in which case it is cancelled, or if the executor could not poll it, in which case
+        poll_error is the exception it failed with.
+        """
+        attempt = {'start': start_ts, 'orch_id': self.orch_id, 'activation_id': activation_id,
+                   'speculative': speculative, 'ignored': ignored}
+        if completion is None:
+            detected_ts = datetime.utcnow()
+            attempt.update({'poll_lag': None, 'poll_checks': num_checks,
+                            'timed_out': missed_deadline is not None, 'missed_deadline': missed_deadline})
+            if cancelled:
+                attempt.update({'cancelled': True, 'success': False})
+            if poll_error is not None:
+                attempt.update({'poll_error': str(poll_error), 'success': False})
+        else:
+            detected_ts = completion.detected_ts
+            # time between the activation ending on openwhisk and the tracker noticing it
+            poll_lag = detected_ts.replace(tzinfo=timezone.utc).timestamp() - \
+                completion.record['end'] / 1000
+            attempt.update({'poll_lag': poll_lag, 'poll_checks': completion.checks, 'timed_out': False,
+                            'success': completion.record.get('response').get('result').get('error', None) is None})
+        attempt.update(
+            {'end': detected_ts, 'time': (detected_ts - start_ts).total_seconds()})
+        await self.instrumentation.write(UpdateOne({'_id': action_id}, {'$push': {'attempts': attempt}}))
+
+    async def __await_completion(self, slots, activation_id, action, index, start_ts, completion_future, completions, timeout, deadline_at=None,
+                                 speculate_after=None, lease=None):
+        """
+        Waits for the executor to find an activation completed, gives back its concurrency slot and puts its response on completions.
+        An activation which does not complete within timeout seconds, or before the deadline of its batch, is given up and
+        reported as a timed out failure.
+        If the activation is still running after speculate_after seconds, a copy of it is invoked as soon as a slot is free.
+        The first of the two to succeed wins, the other one is recorded as ignored, and so are the objects it writes.
 
-        poller_task = asyncio.create_task(self.__poller(len(actions)))
+        Parameters
+        ----------
+        slots : asyncio.Semaphore
+            semaphore from which the slot of the activation was taken
+        activation_id : str
+            activation to wait for
+        action : dict
+            the action which was invoked
+        index : int
+            index of the action in the actions of the call
+        start_ts : datetime
+            time at which the action was invoked
+        completion_future : asyncio.Future
+            future returned by the executor for the activation
+        completions : asyncio.Queue
+            (index, response, final) of the action is put in this queue, or (index, exception, False) if invoking a copy failed.
+            final is True only if the batch deadline has passed, as the action can not be retried any more. An activation the
+            executor could not poll, e.g. after repeated poll errors, gives a PollError failure which is retried like any other.
+        timeout : float
+            seconds after which the activation times out
+        deadline_at : float
+            event loop time at which the batch times out, None if it has no deadline.
+        speculate_after : float
+            seconds after which a speculative copy is invoked, None for no speculation.
+        lease : str
+            lease of the activation from the shared limiter, released along with its slot.
 
-        def _get_url(action_name):
-            return "{}/guest/actions/{}".format(self.url, action_name)
+        Returns
+        -------
+        None
 
-        i = 0
-        while i < len(actions):
-            action = actions[i]
-            active_ids = self._get_active_ids()
-            if len(active_ids) >= parallelisation:
-                await asyncio.sleep(0.5)
+        """
+        def _succeeded(future):
+            # a cancelled future, e.g. after the executor was closed, has no exception to look at
+            return future.done() and not future.cancelled() and future.exception() is None and \
+                future.result().record.get('response').get('result').get('error', None) is None
+
+        action_id = action['action_id']
+        loop = asyncio.get_running_loop()
+        wait_until = loop.time() + timeout
+        missed_deadline = 'action'
+        if deadline_at is not None and deadline_at < wait_until:
+            wait_until = deadline_at
+            missed_deadline = 'batch'
+        speculate_at = loop.time() + speculate_after if speculate_after is not None else None
+
+        # activation id -> (invocation time, executor future) of the activation and of its speculative copy
+        runs = {activation_id: (start_ts, completion_future)}
+        num_slots = 1
+        leases = [lease]
+        final_id = None
+        try:
+            while final_id is None:
+                running = [future for _, future in runs.values()
+                           if not future.done()]
+                if not running:
+                    # every run has failed, the failure of the last one is reported
+                    final_id = list(runs)[-1]
+                    break
+                wake_at = wait_until if speculate_at is None else min(
+                    wait_until, speculate_at)
+                await asyncio.wait(running, timeout=max(wake_at - loop.time(), 0), return_when=asyncio.FIRST_COMPLETED)
+                for run_id, (_, future) in runs.items():
+                    # a cancelled run, or one that could not be polled, counts as failed, it is reported below if no other run succeeds
+                    if _succeeded(future):
+                        final_id = run_id
+                        break
+                if final_id is not None or loop.time() >= wait_until:
+                    break
+                if speculate_at is not None and loop.time() >= speculate_at:
+                    if slots.locked():
+                        # the copy only uses a free slot, so it is tried again later
+                        speculate_at = loop.time() + self.max_poll_interval
+                        continue
+                    await slots.acquire()
+                    copy_lease = None
+                    if self.limiter is not None:
+                        copy_lease = await self.limiter.try_acquire(str(self.orch_id), self.orchestration.weight)
+                        if copy_lease is None:
+                            # the shared limits of the namespace are reached, so it is tried again later
+                            slots.release()
+                            speculate_at = loop.time() + self.max_poll_interval
+                            continue
+                    self.logger.info("[{}] Speculatively invoking a copy of straggler: {}".format(
+                        action_id, activation_id))
+                    speculate_at = None
+                    try:
+                        copy_id, copy_ts, _, copy_future = await self.__invoke(action)
+                    except ThrottledException:
+                        # the namespace is already at its limit, the straggler is left to finish on its own
+                        slots.release()
+                        await self.__release_lease(copy_lease)
+                        self.__on_throttled(slots)
+                        continue
+                    num_slots += 1
+                    leases.append(copy_lease)
+                    runs[copy_id] = (copy_ts, copy_future)
+
+            # openwhisk has no way of cancelling an activation, the runs still going on are only not waited for any more
+            num_checks = {run_id: self.executor.untrack(run_id) for run_id, (_, future) in runs.items()
+                          if not future.done()}
+        except Exception as e:
+            for run_id in runs:
+                self.executor.untrack(run_id)
+            completions.put_nowait((index, e, False))
+            return
+        finally:
+            # lets the dispatcher invoke the next action right away
+            for _ in range(num_slots):
+                slots.release()
+            for run_lease in leases:
+                await self.__release_lease(run_lease)
+
+        won = final_id is not None and _succeeded(runs[final_id][1])
+        for run_id, (run_ts, future) in runs.items():
+            if run_id == final_id:
                 continue
-            print(f"Performing action for: {action}")
-            action_response = self.__post_call(
-                _get_url(action['name']), action['action_id'], action['body'])
-            activation_id = action_response['activationId']
-            self.activation_ids[i] = {
-                'activation_id': activation_id, 'action_id': action['action_id']}
-            attempt_ts = datetime.utcnow()
-            update_changes = {
-                '$set': {'last_attempt_ts': attempt_ts},
-                '$push': {'activation_ids': activation_id}
-            }
-            self.db_collection.update_one(
-                {'_id': action['action_id']}, update_changes)
-            self.start_times[activation_id] = attempt_ts
-            i += 1
+            completion = future.result() if future.done() and not future.cancelled() and future.exception() is None else None
+            poll_error = future.exception() if future.done() and not future.cancelled() else None
+            await self.__record_attempt(action_id, run_id, run_ts, completion, speculative=run_id != activation_id, ignored=won,
+                                        missed_deadline=None if won or poll_error is not None else missed_deadline,
+                                        num_checks=num_checks.get(run_id, 0), poll_error=poll_error)
+            if won:
+                # the objects written by the losing run are kept but not used for lookups
+                await self.metadata.run(self.store.ignore_activation, action_id, run_id)
+
+        if final_id is None:
+            time_taken = datetime.utcnow() - start_ts
+            self.logger.info(
+                "[{}] Timed out after: {} waiting for: {}".format(action_id, time_taken, activation_id))
+            completions.put_nowait((index, {
+                'success': False,
+                'error': {'code': 'Timeout', 'message': 'Activation {} did not complete before the {} deadline'.format(activation_id, missed_deadline)},
+                'action_id': action_id,
+            }, missed_deadline == 'batch'))
+            return
+
+        run_ts, future = runs[final_id]
+        if future.cancelled():
+            await self.__record_attempt(action_id, final_id, run_ts, None, speculative=final_id != activation_id, cancelled=True)
+            self.logger.info(
+                "[{}] Stopped waiting for: {} as it was cancelled".format(action_id, final_id))
+            completions.put_nowait((index, {
+                'success': False,
+                'error': {'code': 'Cancelled', 'message': 'Waiting for activation {} was cancelled'.format(final_id)},
+                'action_id': action_id,
+            }, False))
+            return
+        if future.exception() is not None:
+            await self.__record_attempt(action_id, final_id, run_ts, None, speculative=final_id != activation_id, poll_error=future.exception())
+            self.logger.info(
+                "[{}] Could not poll: {} as: {}".format(action_id, final_id, future.exception()))
+            completions.put_nowait((index, {
+                'success': False,
+                'error': {'code': 'PollError', 'message': 'Activation {} could not be polled: {}'.format(final_id, future.exception())},
+                'action_id': action_id,
+            }, False))
+            return
+        completion = future.result()
+        await self.__record_attempt(action_id, final_id, run_ts, completion, speculative=final_id != activation_id)
+        result = completion.record.get('response').get('result')
+        if isinstance(slots, AdaptiveSemaphore) and result.get('error', None) is None:
+            slots.on_completed(self.__get_queue_wait(completion.record))
+        print(result)
+        time_taken = completion.detected_ts - start_ts
+        if result.get('error', None) is not None:
+            self.logger.info(
+                "[{}] Poll completed with error for: {} in: {}".format(action_id, final_id, time_taken))
+            completions.put_nowait((index, {
+                'success': False,
+                'error': result.get('error'),
+                'action_id': action_id,
+            }, False))
+        else:
+            self.logger.info(
+                "[{}] Poll completed for: {} in: {}".format(action_id, final_id, time_taken))
+            completions.put_nowait((index, {
+                'success': True,
+                'result': result,
+                'action_id': action_id,
+            }, False))
+
+    async def __acquire_lease(self):
+        """
+        Waits for the shared limiter to allow an invocation for the orchestration, returns the lease or None without a limiter.
+        """
+        if self.limiter is None:
+            return None
+        return await self.limiter.acquire(str(self.orch_id), self.orchestration.weight)
 
-        await poller_task
-        results = poller_task.result()
+    async def __release_lease(self, lease):
+        if self.limiter is not None and lease is not None:
+            await self.limiter.release(lease)
 
-        end = datetime.utcnow()
-        self.logger.info(
-            'All the actions for this request completed in: {}'.format(end-start))
-        return results
+    def __on_throttled(self, slots):
+        if isinstance(slots, AdaptiveSemaphore):
+            slots.on_backpressure('throttled invocation')
+
+    def __get_queue_wait(self, record):
+        """
+        Returns the seconds an activation waited in the openwhisk queue before running, None if the record does not have it.
+        """
+        for annotation in record.get('annotations', []):
+            if annotation.get('key', None) == 'waitTime':
+                return annotation.get('value', 0) / 1000
+        return None
 
-    async def __make_action_with_id_for_object_issues(self, action_key_map, retries=3, parallelisation=2, ignore_objects_error=[]):
+    def create_slots(self, parallelisation, dispatch_order='fifo'):
+        """
+        Creates the semaphore bounding the number of actions running at a time, which can be passed to several calls to
+        make_action as their semaphore.
+
+        Parameters
+        ----------
+        parallelisation : int
+            maximum number of actions running at a time
+        dispatch_order : str
+            order in which the actions of the calls are invoked, one of DISPATCH_ORDERS.
+
+        Returns
+        -------
+        asyncio.Semaphore | PrioritySemaphore
+            an AdaptiveSemaphore when adaptive concurrency is used.
+
+        """
+        if self.adaptive_concurrency:
+            return AdaptiveSemaphore(parallelisation, self.logger)
+        if dispatch_order == 'fifo':
+            return asyncio.Semaphore(parallelisation)
+        return PrioritySemaphore(parallelisation)
+
+    async def __adopt_activation(self, slots, index, action, activation_id, start_ts, completions, waiters, action_timeout=None, deadline_at=None):
+        """
+        Takes a slot for an activation invoked before the orchestration was resumed, and waits for it like for an activation
+        invoked by the dispatcher.
+        """
+        await slots.acquire()
+        lease = None
+        try:
+            lease = await self.__acquire_lease()
+            expected_runtime = await self.__get_expected_runtime(action['name'])
+        except BaseException:
+            slots.release()
+            await self.__release_lease(lease)
+            raise
+        self.logger.info("[{}] Adopting activation: {}".format(
+            action['action_id'], activation_id))
+        completion_future = self.executor.track(
+            activation_id, start_ts, expected_runtime)
+        timeout = self.__get_action_timeout(expected_runtime, action_timeout)
+        waiter = asyncio.create_task(self.__await_completion(
+            slots, activation_id, action, index, start_ts, completion_future, completions, timeout, deadline_at, lease=lease))
+        waiters.add(waiter)
+        waiter.add_done_callback(waiters.discard)
+
+    async def __dispatcher(self, slots, pending, completions, waiters, action_timeout=None, deadline_at=None, speculative=False, priorities=None):
+        """
+        Invokes the actions put in pending one after the other, each after taking a slot from the semaphore which is given back on completion.
+        Every activation is registered with the executor, and a waiter task is started for it. It keeps running until it is cancelled,
+        so that failed actions can be put back in pending for a retry.
+
+        Parameters
+        ----------
+        slots : asyncio.Semaphore
+            semaphore bounding the number of running actions
+        pending : asyncio.Queue
+            (index, action) of the actions to be invoked, where action contains action_id, action_name, and action_params
+        completions : asyncio.Queue
+            (index, response, False) of every action is put in this queue as soon as it completes, or as soon as its invocation
+            is throttled, with an error whose code is Throttled.
+        waiters : set
+            the waiter tasks are added to it, so that they can be cancelled along with the call.
+        action_timeout : float
+            seconds after which an activation times out, by default a multiple of its predicted runtime.
+        deadline_at : float
+            event loop time at which the batch times out, None if it has no deadline.
+        speculative : bool
+            invokes a copy of the actions running for much longer than their earlier attempts.
+        priorities : float[]
+            dispatch priority of the actions by index, used for taking a slot of a PrioritySemaphore shared with other calls.
+
+        Returns
+        -------
+        None
+
+        """
+        while True:
+            i, action = await pending.get()
+            if priorities is not None and isinstance(slots, PrioritySemaphore):
+                await slots.acquire(priorities[i])
+            else:
+                await slots.acquire()
+            lease = None
+            try:
+                lease = await self.__acquire_lease()
+                activation_id, attempt_ts, expected_runtime, completion_future = await self.__invoke(action)
+                speculate_after = await self.__get_speculation_threshold(action['name']) if speculative else None
+            except ThrottledException as e:
+                # the action was not run, it is handed back to be invoked again after a backoff
+                slots.release()
+                await self.__release_lease(lease)
+                self.__on_throttled(slots)
+                completions.put_nowait((i, {
+                    'success': False,
+                    'error': {'code': 'Throttled', 'message': str(e), 'meta': {'retry_after': e.retry_after}},
+                    'action_id': action['action_id'],
+                }, False))
+                continue
+            except BaseException:
+                slots.release()
+                await self.__release_lease(lease)
+                raise
+            timeout = self.__get_action_timeout(
+                expected_runtime, action_timeout)
+            waiter = asyncio.create_task(self.__await_completion(
+                slots, activation_id, action, i, attempt_ts, completion_future, completions, timeout, deadline_at, speculate_after, lease))
+            waiters.add(waiter)
+            waiter.add_done_callback(waiters.discard)
+
+    async def __make_action_with_id_for_object_issues(self, action_key_map, retries=3, parallelisation=2, ignore_objects_error=None, semaphore=None, parent_runs=None,
+                                                      action_timeout=None):
         """
         When an action throws NoSuchKeyException this retry handler is called. It gets the action_id which was responsible for writing the object
         with that particular key and retries those actions to recreate the objects before returning the control for the main function to retry the 
@@ -277,20 +1001,23 @@ class BaseOrchestrator:
             Number of retries for the parent
 
         parallelisation: number
-            maximum number of concurrency for parent objects to run
+            maximum number of concurrency for parent objects to run, the upper bound of the limit when adaptive_concurrency is used.
 
         ignore_object_errors: str[]
             It stores the key of all the objects for which retries have been done. This is kept as a check so that an issue for the same key should not be
             solved again and again.
 
+        parent_runs: dict[ObjectId, asyncio.Task]
+            runs of parent actions shared by the recoveries of a call, so that a parent which wrote several missing objects is run once.
+
         Returns
         -------
         dict[]
             response from all the parent actions.
 
         """
-        parent_actions = self.store.get_action_ids_for_objects(
-            list(map(lambda mp: mp['key'], action_key_map)))
+        parent_actions = await self.metadata.run(self.store.get_action_ids_for_objects,
+                                                 list(map(lambda mp: mp['key'], action_key_map)))
         results = [None] * len(action_key_map)
         action_parent_map = {}
         action_index_map = {}
@@ -301,12 +1028,16 @@ class BaseOrchestrator:
 
         # calling parents to create those objects
         print("action_parent_map: ", action_parent_map)
-        parent_results = await self.__make_action_with_id(
-            list(set(parent_actions)), retries, parallelisation, ignore_objects_error, object_ownership=True)
+        if parent_runs is None:
+            parent_runs = {}
+        for parent_action_id in set(parent_actions):
+            if parent_action_id not in parent_runs:
+                parent_runs[parent_action_id] = asyncio.ensure_future(self.__make_action_with_id(
+                    [parent_action_id], retries, parallelisation, ignore_objects_error, object_ownership=True, semaphore=semaphore,
+                    action_timeout=action_timeout))
         parent_results_dict = {}
-        for result in parent_results:
-            parent_action_id = result['action_id']
-            parent_results_dict[parent_action_id] = result
+        for parent_action_id in set(parent_actions):
+            parent_results_dict[parent_action_id] = (await parent_runs[parent_action_id])[0]
         retry_action_ids = []
         for action_key in action_key_map:
             action_id = action_key['action_id']
@@ -318,7 +1049,7 @@ class BaseOrchestrator:
 
         # retrying actions for which parents were successful
         retry_results = await self.__make_action_with_id(
-            retry_action_ids, 0, parallelisation, ignore_objects_error, object_ownership=True)
+            retry_action_ids, 0, parallelisation, ignore_objects_error, object_ownership=True, semaphore=semaphore, action_timeout=action_timeout)
         for result in retry_results:
             action_id = result['action_id']
             index = action_index_map[action_id]
@@ -326,7 +1057,8 @@ class BaseOrchestrator:
 
         return results
 
-    async def __make_action_with_id_for_multiparent_object_issues(self, action_key_map, retries=3, parallelisation=2, ignore_objects_error=[]):
+    async def __make_action_with_id_for_multiparent_object_issues(self, action_key_map, retries=3, parallelisation=2, ignore_objects_error=None, semaphore=None,
+                                                                 action_timeout=None):
         """
         Same as __make_action_with_id_for_object_issues. This function is used when object_ownership is false and is less optimal to handle lesser edge cases.
 
@@ -339,7 +1071,7 @@ class BaseOrchestrator:
             Number of retries for the parent
 
         parallelisation: number
-            maximum number of concurrency for parent objects to run
+            maximum number of concurrency for parent objects to run, the upper bound of the limit when adaptive_concurrency is used.
 
         ignore_object_errors: str[]
             It stores the key of all the objects for which retries have been done. This is kept as a check so that an issue for the same key should not be
@@ -353,8 +1085,8 @@ class BaseOrchestrator:
         """
 
         # finding parents
-        parent_actions = self.store.get_all_action_ids_for_objects(
-            list(map(lambda mp: mp['key'], action_key_map)))
+        parent_actions = await self.metadata.run(self.store.get_all_action_ids_for_objects,
+                                                 list(map(lambda mp: mp['key'], action_key_map)))
 
         parent_action_result_map = {}
         retry_action_ids = []
@@ -372,7 +1104,8 @@ class BaseOrchestrator:
                         execute_child = False
                         break
                 else:  # if executing this parent for the first time
-                    action_result = await self.__make_action_with_id([parent_action_id], retries, parallelisation, ignore_objects_error, object_ownership=False)
+                    action_result = await self.__make_action_with_id([parent_action_id], retries, parallelisation, ignore_objects_error, object_ownership=False, semaphore=semaphore,
+                                                                     action_timeout=action_timeout)
                     action_success = action_result[0]['success']
                     parent_action_result_map[parent_action_id] = action_success
                     if not action_success:
@@ -388,7 +1121,7 @@ class BaseOrchestrator:
         # we can use the hashing by parent_action_result_map here - however not useful,
         # because in parent that implies it should not have been failed section as it has run once already
         retry_results = await self.__make_action_with_id(
-            retry_action_ids, 0, parallelisation, ignore_objects_error, object_ownership=False)
+            retry_action_ids, 0, parallelisation, ignore_objects_error, object_ownership=False, semaphore=semaphore, action_timeout=action_timeout)
 
         action_index_map = {}
         for i, action_key in enumerate(action_key_map):
@@ -401,9 +1134,45 @@ class BaseOrchestrator:
 
         return results
 
-    async def __make_action_with_id(self, action_ids, retries=3, parallelisation=2, ignore_objects_error=[], object_ownership=True):
+    async def __requeue(self, pending, item, delay, wait_for=None):
+        """
+        Puts an action back in pending after delay seconds, or once wait_for is done when it is given.
+        """
+        if wait_for is not None:
+            await asyncio.wait([wait_for])
+        else:
+            await asyncio.sleep(delay)
+        pending.put_nowait(item)
+
+    async def __recover_object_issue(self, index, action_id, key, completions, retries, parallelisation, ignore_objects_error,
+                                     object_ownership, semaphore, parent_runs, action_timeout=None):
+        """
+        Recreates a missing object by running its parent actions, and retries the action that could not find it.
+        Its final response is put in completions. If the parents could not be run, the final response is the NoSuchKey failure
+        that is passed in its place.
+        """
+        try:
+            action_key_map = [{'action_id': action_id, 'key': key}]
+            if not object_ownership:
+                results = await self.__make_action_with_id_for_multiparent_object_issues(
+                    action_key_map, retries, parallelisation, ignore_objects_error, semaphore, action_timeout)
+            else:
+                results = await self.__make_action_with_id_for_object_issues(
+                    action_key_map, retries, parallelisation, ignore_objects_error, semaphore, parent_runs, action_timeout)
+            completions.put_nowait((index, results[0], True))
+        except Exception as e:
+            completions.put_nowait((index, e, True))
+
+    async def __make_action_with_id_stream(self, action_ids, retries=3, parallelisation=2, ignore_objects_error=None, object_ownership=True, semaphore=None,
+                                           action_timeout=None, batch_timeout=None, speculative=False, dispatch_order='fifo', memoize=False):
         """
-        This function handles retries and invoking the openwhisk action.
+        This function handles retries and invoking the openwhisk action. The result of an action is yielded as soon as it is final,
+        i.e. when it succeeds, or when it fails after its retries are exhausted or its objects could not be recovered.
+        A failed action is retried on its own as soon as it fails, after a backoff, without waiting for the other actions, and its retries
+        take slots from the same semaphore. An action failing with NoSuchKey starts the recovery of the object right away.
+        An activation that does not complete in time fails with a Timeout error, which is retried like any other failure. Once the batch
+        deadline has passed nothing more is invoked, and the actions which have not completed fail with a Timeout error.
+        An invocation throttled by openwhisk is made again after a jittered backoff, without using up a retry.
 
         Parameters
         ----------
@@ -414,129 +1183,322 @@ class BaseOrchestrator:
             Number of retries for the parent
 
         parallelisation: number
-            maximum number of concurrency for parent objects to run
+            maximum number of concurrency for parent objects to run, the upper bound of the limit when adaptive_concurrency is used.
 
         ignore_object_errors: str[]
             It stores the key of all the objects for which retries have been done. This is kept as a check so that an issue for the same key should not be
-            solved again and again.
+            solved again and again. A new list is used when it is not given, so the keys are only shared by the recoveries of one call.
 
         object_ownership: boolean
             This signifies whether there are multiple actions that write onto a single key or if a single ownership exists.
 
-        Returns
+        semaphore: asyncio.Semaphore
+            shared by several calls to bound their total concurrency, parallelisation is not used when it is given.
+
+        action_timeout: float
+            seconds after which an activation times out, by default a multiple of the runtime predicted for the action.
+
+        batch_timeout: float
+            seconds after which the call stops, including retries and object recoveries. None for no deadline.
+
+        speculative: boolean
+            invokes a copy of the actions running for much longer than their earlier attempts, the first one to succeed is used.
+
+        dispatch_order: str
+            order in which the actions are invoked, one of DISPATCH_ORDERS. Retries are invoked in the order of the failures.
+
+        memoize: boolean
+            reuses the result of an earlier action with the same name, parameters and objects instead of invoking the action,
+            unless memoization was turned off for the action.
+
+        Yields
         -------
-        dict[]
-            response from all the parent actions.
+        (int, dict)
+            index of the action in action_ids and its final response.
 
         """
-        actions_info = list(self.db_collection.find(
-            {'_id': {'$in': action_ids}}))
-        actions = [{
-            'action_id': info['_id'],
-            'name': info['action_name'],
-            'body': info['action_params']} for info in actions_info
-        ]
-        results = [{"success": False, "action_id": id} for id in action_ids]
+        if dispatch_order not in DISPATCH_ORDERS:
+            raise Exception('Unknown dispatch order: {}'.format(dispatch_order))
+        if ignore_objects_error is None:
+            ignore_objects_error = []
+
+        actions_info = {info['_id']: info for info in await self.actions.find(
+            {'_id': {'$in': action_ids}})}
+        # keeps actions in the order of action_ids, as find does not guarantee any order
+        actions = []
+        action_indexes = []
+        for i, action_id in enumerate(action_ids):
+            if action_id not in actions_info:
+                yield i, {"success": False, "action_id": action_id}
+                continue
+            info = actions_info[action_id]
+            actions.append({
+                'action_id': info['_id'],
+                'name': info['action_name'],
+                'body': info['action_params']})
+            action_indexes.append(i)
+
+        if not actions:
+            return
+
+        # retries and object recoveries of this call take their slots from the same semaphore as the actions
+        slots = semaphore or self.create_slots(
+            parallelisation, dispatch_order)
+        loop = asyncio.get_running_loop()
+        deadline_at = loop.time() + batch_timeout if batch_timeout is not None else None
+        start = datetime.utcnow()
+        self.logger.info('Invoking Action requested for {} with {} in parallel'.format(
+            len(actions), parallelisation))
 
-        curr_original_map = [i for i in range(len(actions))]
-        next_actions = [*actions]
-
-        count = 0
-        while next_actions and count <= retries:
-            curr_result = await self.__make_action(next_actions, parallelisation)
-            next_iteration = []
-            action_results = []  # used for updating details in DB
-            object_issues = []
-
-            for i, res in enumerate(curr_result):
-                original_index = curr_original_map[i]
-                if not res['success']:
-                    error = res['error']
-                    action_results.append({
-                        'error': error,
-                        'success': False,
-                        'action_id': res['action_id']
-                    })
-                    results[original_index] = res
-                    # if no such key need to retry in a different way by adding it to object_issues list
-                    if isinstance(error, dict) and error.get('code', 500) == 'NoSuchKey' and 'key' in error.get('meta', {}) and error['meta']['key'] not in ignore_objects_error:
-                        # ignore the error for the next time
-                        ignore_objects_error.append(error['meta']['key'])
-                        object_issues.append(
-                            {
-                                'index': original_index,
-                                'key': error['meta']['key']
-                            }
-                        )
-                    else:
-                        next_iteration.append(original_index)
+        pending = asyncio.Queue()
+        # (index, response, final), final is True for responses which are not to be retried any more
+        completions = asyncio.Queue()
+        waiters = set()
+        helpers = set()
+        # key -> task recovering the object, parent action id -> task running it
+        recoveries = {}
+        parent_runs = {}
+        # index -> NoSuchKey failure of the actions whose object is being recovered
+        object_failures = {}
+        num_retries = [0] * len(actions)
+        num_throttles = [0] * len(actions)
+        finished = [False] * len(actions)
+
+        def _start_helper(coroutine):
+            helper = asyncio.create_task(coroutine)
+            helpers.add(helper)
+            helper.add_done_callback(helpers.discard)
+            return helper
+
+        priorities = None
+        if dispatch_order != 'fifo':
+            priorities = await self.__get_dispatch_priorities(actions, dispatch_order)
+            self.logger.info('Dispatching in {} order with priorities: {}'.format(
+                dispatch_order, priorities))
+        # actions recorded before a resume either succeeded, are still running, or are invoked again
+        num_final = 0
+        adopted = set()
+        for i, action in enumerate(actions):
+            if action['action_id'] not in self.orchestration.resumed_ids:
+                continue
+            self.orchestration.resumed_ids.discard(action['action_id'])
+            info = actions_info[action['action_id']]
+            if 'result' in info and info.get('error', None) is None:
+                num_final += 1
+                finished[i] = True
+                yield action_indexes[i], {'success': True, 'result': info['result'], 'action_id': action['action_id']}
+                continue
+            attempted = {attempt.get('activation_id', None)
+                         for attempt in info.get('attempts', [])}
+            running = [activation_id for activation_id in info.get('activation_ids', [])
+                       if activation_id not in attempted]
+            if running:
+                await self.__adopt_activation(slots, i, action, running[-1], info.get('last_attempt_ts', info['creation_ts']),
+                                              completions, waiters, action_timeout, deadline_at)
+                adopted.add(i)
+
+        if memoize:
+            memoizable = [i for i, action in enumerate(actions) if not finished[i] and i not in adopted
+                          and actions_info[action['action_id']].get('memoize', True)]
+            memoized = await self.__get_memoized_actions([actions_info[actions[i]['action_id']] for i in memoizable])
+            for i, prior in zip(memoizable, memoized):
+                if prior is None:
+                    continue
+                action_id = actions[i]['action_id']
+                self.logger.info('Reusing the result of action {} for {}'.format(
+                    prior['_id'], action_id))
+                await self.instrumentation.write(UpdateOne({'_id': action_id}, {'$set': {
+                    'error': None, 'result': prior['result'], 'memoized_from': prior['_id']}}))
+                num_final += 1
+                finished[i] = True
+                yield action_indexes[i], {'success': True, 'result': prior['result'], 'action_id': action_id, 'memoized_from': prior['_id']}
+
+        for i in (get_dispatch_order(priorities) if priorities is not None else range(len(actions))):
+            if not finished[i] and i not in adopted:
+                pending.put_nowait((i, actions[i]))
+        dispatcher = asyncio.create_task(self.__dispatcher(
+            slots, pending, completions, waiters, action_timeout, deadline_at, speculative, priorities))
+
+        num_failed = 0
+        expired = False
+        try:
+            while num_final < len(actions):
+                if expired and not waiters and completions.empty():
+                    break
+                get_task = asyncio.create_task(completions.get())
+                if expired:
+                    # activations that were running at the deadline report their own deadline miss
+                    await asyncio.wait([get_task, *waiters], return_when=asyncio.FIRST_COMPLETED)
                 else:
-                    results[original_index] = res
-                    action_results.append(
-                        {'error': None, 'success': True, 'action_id': res['action_id']})
-
-            # if object issues need to retry the parent action to create the object again
-            if object_issues:
-                object_issues_actions = [
-                    {
-                        'action_id': actions[object['index']]['action_id'],
-                        'key': object['key']
-                    } for object in object_issues
-                ]
-
-                object_issue_retry_func = self.__make_action_with_id_for_multiparent_object_issues if not object_ownership \
-                    else self.__make_action_with_id_for_object_issues
-
-                object_issue_retry_result = await object_issue_retry_func(
-                    object_issues_actions, retries, parallelisation, ignore_objects_error)
-                for i, res in enumerate(object_issue_retry_result):
-                    if not res:  # if issue from parent, does nothing
-                        continue
-                    action_id = res['action_id']
+                    timeout = max(deadline_at - loop.time(),
+                                  0) if deadline_at is not None else None
+                    await asyncio.wait([get_task, dispatcher], timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                    # if the dispatcher has failed, raises its exception instead of waiting forever
+                    if dispatcher.done():
+                        get_task.cancel()
+                        raise dispatcher.exception() or Exception('Dispatcher stopped')
+                if not get_task.done():
+                    get_task.cancel()
+                    if not expired and deadline_at is not None and loop.time() >= deadline_at:
+                        expired = True
+                        self.logger.info('Batch deadline of {}s exceeded with {} actions left'.format(
+                            batch_timeout, len(actions) - num_final))
+                        # nothing more is invoked, retries and object recoveries waiting for their turn are dropped
+                        dispatcher.cancel()
+                        for task in [*helpers, *parent_runs.values()]:
+                            task.cancel()
+                    continue
+                i, res, final = get_task.result()
+                if isinstance(res, Exception):
+                    raise res
+
+                if final and not res:  # if issue from parent, the NoSuchKey failure is final
+                    res = object_failures[i]
+                if res['success'] and not final:
+                    # the result is kept so that a resumed orchestration does not have to run the action again
+                    await self.instrumentation.write(UpdateOne({'_id': res['action_id']}, {'$set': {'error': None, 'result': res['result']}}))
+                if final or res['success'] or expired:
                     if not res['success']:
-                        action_result = {
-                            'error': res['error'],
-                            'success': False,
-                            'action_id': action_id
-                        }
-                    else:
-                        action_result = {
-                            'error': None,
-                            'success': True,
-                            'action_id': action_id
-                        }
-                    for j, result in enumerate(action_results):
-                        if result['action_id'] == action_id:
-                            action_results[j] = action_result
-
-                    results[object_issues[i]['index']] = res
-
-            update_operations = []
-            for item in action_results:
-                filter_criteria = {'_id': item['action_id']}
-                update_operations.append(
-                    UpdateOne(filter_criteria, {'$set': {'error': item['error']}}))
-            self.db_collection.bulk_write(update_operations)
-
-            curr_original_map = []
-            next_actions = []
-            for unsuccessful in next_iteration:
-                curr_original_map.append(unsuccessful)
-                next_actions.append(actions[unsuccessful])
-            if next_actions:
-                print("Exhausted: {} retries. Have {} actions left".format(
-                    count, len(next_actions)))
-            count = count + 1
-
-        if next_actions:
+                        num_failed += 1
+                        await self.instrumentation.write(UpdateOne({'_id': res['action_id']}, {'$set': {'error': res.get('error', None)}}))
+                    num_final += 1
+                    finished[i] = True
+                    yield action_indexes[i], res
+                    continue
+
+                error = res['error']
+                if isinstance(error, dict) and error.get('code', None) == 'Throttled':
+                    # a throttled invocation never ran, so it does not use up a retry
+                    num_throttles[i] += 1
+                    delay = random.uniform(0, min(self.retry_backoff * (2 ** (num_throttles[i] - 1)),
+                                                  self.max_retry_backoff))
+                    delay = max(delay, error['meta']['retry_after'] or 0)
+                    _start_helper(self.__requeue(
+                        pending, (i, actions[i]), delay))
+                    continue
+                await self.instrumentation.write(UpdateOne({'_id': res['action_id']}, {'$set': {'error': error}}))
+                is_object_issue = isinstance(error, dict) and error.get('code', 500) == 'NoSuchKey' and 'key' in error.get('meta', {})
+                # if no such key need to retry in a different way by recreating the object
+                if is_object_issue and error['meta']['key'] not in ignore_objects_error:
+                    key = error['meta']['key']
+                    # ignore the error for the next time
+                    ignore_objects_error.append(key)
+                    object_failures[i] = res
+                    recoveries[key] = _start_helper(self.__recover_object_issue(
+                        i, res['action_id'], key, completions, retries, parallelisation, ignore_objects_error, object_ownership, slots, parent_runs,
+                        action_timeout))
+                elif num_retries[i] < retries:
+                    num_retries[i] += 1
+                    print("Retrying action {}, retry {} of {}".format(
+                        res['action_id'], num_retries[i], retries))
+                    delay = min(self.retry_backoff * (2 ** (num_retries[i] - 1)),
+                                self.max_retry_backoff)
+                    # an object that is being recreated by this call can only be found once its recovery is done
+                    recovery = recoveries.get(
+                        error['meta']['key'], None) if is_object_issue else None
+                    _start_helper(self.__requeue(
+                        pending, (i, actions[i]), delay, recovery))
+                else:
+                    # retries are exhausted, this failure is final
+                    num_failed += 1
+                    num_final += 1
+                    finished[i] = True
+                    yield action_indexes[i], res
+
+            # actions that were waiting to be invoked, retried or recovered when the batch deadline passed
+            for i, action in enumerate(actions):
+                if finished[i]:
+                    continue
+                error = {'code': 'Timeout',
+                         'message': 'Batch deadline of {}s exceeded'.format(batch_timeout)}
+                await self.instrumentation.write(UpdateOne({'_id': action['action_id']}, {'$set': {'error': error}}))
+                num_failed += 1
+                yield action_indexes[i], {'success': False, 'error': error, 'action_id': action['action_id']}
+        finally:
+            dispatcher.cancel()
+            for task in [*waiters, *helpers, *parent_runs.values()]:
+                task.cancel()
+
+        if num_failed:
             print("Retries exceeded, still have {} actions with error".format(
-                len(next_actions)))
+                num_failed))
         else:
             print("All actions completed successfully")
 
+        end = datetime.utcnow()
+        self.logger.info(
+            'All the actions for this request completed in: {}'.format(end-start))
+
+    async def __make_action_with_id(self, action_ids, retries=3, parallelisation=2, ignore_objects_error=None, object_ownership=True, semaphore=None,
+                                    action_timeout=None, batch_timeout=None, speculative=False, dispatch_order='fifo', memoize=False):
+        """
+        Same as __make_action_with_id_stream, but returns once the results of all the actions are final.
+
+        Returns
+        -------
+        dict[]
+            response from all the parent actions.
+
+        """
+        results = [{"success": False, "action_id": id} for id in action_ids]
+        async for index, result in self.__make_action_with_id_stream(action_ids, retries, parallelisation, ignore_objects_error, object_ownership, semaphore,
+                                                                     action_timeout, batch_timeout, speculative, dispatch_order, memoize):
+            results[index] = result
+
         return results
 
-    async def make_action(self, actions, retries=3, parallelisation=2, object_ownership=True):
+    async def __create_actions(self, actions):
+        """
+        Writes action records to document store.
+
+        Parameters
+        ----------
+        actions : dict[]
+            List of actions (name and parameters) which are to be invoked.
+
+        Returns
+        -------
+        ObjectId[]
+            ids of the action records
+
+        """
+        if not self.orch_id:
+            print('Orchestrator not started')
+            raise Exception('Orchestrator not started')
+
+        orchestration = self.orchestration
+        action_ids = []
+        new_actions = []
+        for action in actions:
+            recorded_ids = orchestration.recorded_actions.get(
+                (action['name'], get_params_key(action['body'])), None)
+            if recorded_ids:
+                # made again after a resume, the recorded action is used instead of a new one
+                action_id = recorded_ids.pop(0)
+                orchestration.resumed_ids.add(action_id)
+                action_ids.append(action_id)
+            else:
+                action_ids.append(None)
+                new_actions.append(action)
+
+        if new_actions:
+            result = await self.actions.insert_many([{
+                'orch_id': self.orch_id,
+                'action_name': action['name'],
+                'action_params': action['body'],
+                'creation_ts': datetime.utcnow(),
+                'memoize': action.get('memoize', True),
+                'num_attempts': 0,
+                'activation_ids': []
+            } for action in new_actions])
+            inserted_ids = iter(result.inserted_ids)
+            action_ids = [action_id if action_id is not None else next(inserted_ids)
+                          for action_id in action_ids]
+
+        return action_ids
+
+    async def make_action(self, actions, retries=3, parallelisation=2, object_ownership=True, semaphore=None, action_timeout=None, batch_timeout=None,
+                          speculative=False, dispatch_order='fifo', memoize=False):
         """
         This writes action records to document store and calls __make_action_with_id.
 
@@ -549,46 +1511,129 @@ class BaseOrchestrator:
             Number of retries for the parent
 
         parallelisation: number
-            maximum number of concurrency for parent objects to run
+            maximum number of concurrency for parent objects to run, the upper bound of the limit when adaptive_concurrency is used.
 
         object_ownership: boolean
             This signifies whether there are multiple actions that write onto a single key or if a single ownership exists.
 
+        semaphore: asyncio.Semaphore
+            shared by several concurrent calls to bound their total concurrency, parallelisation is not used when it is given.
+
+        action_timeout: float
+            seconds after which an activation is given up and fails with a Timeout error, which is retried like any other failure.
+            By default it is a multiple (deadline_factor) of the runtime predicted for the action.
+
+        batch_timeout: float
+            seconds after which the call stops, including retries and object recoveries. The actions which have not completed by then
+            fail with a Timeout error. None for no deadline.
+
+        speculative: boolean
+            once an action has run for speculation_factor times the speculation_percentile of the runtimes of its earlier attempts,
+            a copy of it is invoked if a slot is free. The first of the two to succeed is used, the other one and the objects it
+            writes are recorded as ignored.
+
+        dispatch_order: str
+            order in which the actions are invoked when they can not all run at once. 'fifo' keeps the order of actions,
+            'longest_first' starts the actions with the longest predicted runtime first, and 'critical_path' starts first the
+            actions with the most work predicted on and after them, following the lineage of the last run of the orchestration.
+            A PrioritySemaphore passed as semaphore keeps the order across the calls sharing it.
+
+        memoize: boolean
+            reuses the result of the most recent successful action with the same name and parameters, made within memoization_ttl,
+            instead of invoking the action again, as long as every object it read is unchanged (same etag and size) and every
+            object it wrote still exists. Actions prepared with memoize=False are always run. The response of a reused result
+            has the id of the earlier action in memoized_from.
+
         Returns
         -------
         dict[]
             response from all the parent actions.
 
         """
-        if not self.orch_id:
-            print('Orchestrator not started')
-            raise Exception('Orchestrator not started')
+        action_ids = await self.__create_actions(actions)
+        results = await self.__make_action_with_id(action_ids, retries, parallelisation, object_ownership=object_ownership, semaphore=semaphore,
+                                                   action_timeout=action_timeout, batch_timeout=batch_timeout, speculative=speculative,
+                                                   dispatch_order=dispatch_order, memoize=memoize)
+        return results
 
-        action_ids = self.db_collection.insert_many([{
-            'orch_id': self.orch_id,
-            'action_name': action['name'],
-            'action_params': action['body'],
-            'creation_ts': datetime.utcnow(),
-            'num_attempts': 0,
-            'activation_ids': []
-        } for action in actions]).inserted_ids
+    async def make_action_stream(self, actions, retries=3, parallelisation=2, object_ownership=True, semaphore=None, action_timeout=None, batch_timeout=None,
+                                 speculative=False, dispatch_order='fifo', memoize=False):
+        """
+        Same as make_action, with the same retry and NoSuchKey recovery, but yields the final result of each action
+        as soon as it is known instead of waiting for the whole batch. Use it as:
+        `async for index, result in orch.make_action_stream(actions)`
 
-        results = await self.__make_action_with_id(action_ids, retries, parallelisation, object_ownership=object_ownership)
-        return results
+        Parameters
+        ----------
+        actions : ObjectId[]
+            List of actions (name and parameters) which are to be invoked.
+
+        retries: number
+            Number of retries for the parent
+
+        parallelisation: number
+            maximum number of concurrency for parent objects to run, the upper bound of the limit when adaptive_concurrency is used.
+
+        object_ownership: boolean
+            This signifies whether there are multiple actions that write onto a single key or if a single ownership exists.
+
+        semaphore: asyncio.Semaphore
+            shared by several concurrent calls to bound their total concurrency, parallelisation is not used when it is given.
+
+        action_timeout: float
+            seconds after which an activation is given up and fails with a Timeout error, which is retried like any other failure.
+            By default it is a multiple (deadline_factor) of the runtime predicted for the action.
+
+        batch_timeout: float
+            seconds after which the call stops, including retries and object recoveries. The actions which have not completed by then
+            fail with a Timeout error. None for no deadline.
+
+        speculative: boolean
+            invokes a copy of the actions running for much longer than their earlier attempts, as in make_action.
+
+        dispatch_order: str
+            order in which the actions are invoked, as in make_action.
+
+        memoize: boolean
+            reuses the results of earlier actions with the same name, parameters and objects, as in make_action.
+
+        Yields
+        -------
+        (int, dict)
+            index of the action in actions and its final response.
+
+        """
+        action_ids = await self.__create_actions(actions)
+        async for index, result in self.__make_action_with_id_stream(action_ids, retries, parallelisation, object_ownership=object_ownership, semaphore=semaphore,
+                                                                     action_timeout=action_timeout, batch_timeout=batch_timeout, speculative=speculative,
+                                                                     dispatch_order=dispatch_order, memoize=memoize):
+            yield index, result
+
+    async def close(self):
+        """
+        Closes the executor, i.e. the activation tracker and the pooled connections to openwhisk, and flushes the instrumentation.
+        Call this once all the actions have been made.
+        """
+        await self.executor.close()
+        await self.instrumentation.close()
 
     def stop(self):
         """
         This marks the end of the orchestrator. It prints a few metrics that have been instrumented throughout and stores a few more details
         to the document store.
         """
+        # metrics are read back from the document store, so every buffered update has to be written first
+        self.instrumentation.flush()
+        orchestration = self.orchestration
         orch_finish_ts = datetime.utcnow()
-        self.time_taken = (orch_finish_ts - self.orch_start).total_seconds()
+        orchestration.time_taken = (
+            orch_finish_ts - orchestration.start_ts).total_seconds()
 
-        self.action_time_taken = 0
+        orchestration.action_time_taken = 0
         print(
-            f'\nOrchestrator {self.orch_id} stopped. It ran for: {self.time_taken}s')
+            f'\nOrchestrator {self.orch_id} stopped. It ran for: {orchestration.time_taken}s')
 
-        action_ids = list(self.actions_ids)
+        action_ids = list(orchestration.action_ids)
         actions_info = list(self.db_collection.find(
             {'_id': {'$in': action_ids}}))
         action_object_metrics = self.store.get_metrics_for_actions(
@@ -606,15 +1651,15 @@ class BaseOrchestrator:
             print(f"Name - {info['action_name']}")
             print(f"Body - {str(info['action_params'])}")
             attempts = list(
-                filter(lambda attempt: attempt['orch_id'] == self.orch_id, info['attempts']))
+                filter(lambda attempt: attempt['orch_id'] == self.orch_id, info.get('attempts', [])))
             print(f"Number of attempts - {len(attempts)}")
             if len(attempts) == 1:
                 print(f"Time taken - {attempts[0]['time']}")
-                self.action_time_taken += attempts[0]['time']
+                orchestration.action_time_taken += attempts[0]['time']
             else:
                 for i, attempt in enumerate(attempts):
                     print(f"Attempt {(i+1)} - Time Taken: {attempt['time']}")
-                    self.action_time_taken += attempt['time']
+                    orchestration.action_time_taken += attempt['time']
             if action_id in action_object_metrics['metrics']:
                 print("Data read: {}".format(
                     action_object_metrics['metrics'][action_id]['object_read_sz']))
@@ -663,12 +1708,20 @@ class BaseOrchestrator:
         self.orch_collection.update_one(
             {'_id': self.orch_id}, {'$set': {
                 'finish_ts': orch_finish_ts,
-                'time_taken': self.time_taken,
-                'action_time_taken': self.action_time_taken,
+                'time_taken': orchestration.time_taken,
+                'action_time_taken': orchestration.action_time_taken,
                 'object_metrics': output_object_metrics,
-                'input_size': input_object.get('get_size', 0)
+                'input_size': input_object.get('get_size', 0) if input_object else 0
             }})
 
+    async def stop_async(self):
+        """
+        Same as stop, but the metrics are gathered in a worker thread, so that the other orchestrations running
+        on the event loop keep polling and dispatching meanwhile.
+        """
+        # the worker thread runs in a copy of the current context, so it stops the orchestration of the calling task
+        await self.metadata.run(self.stop)
+
     def get_orch_details(self, orch_id):
         """
         This returns details that were saved at the orchestration level in the document store.
@@ -766,7 +1819,8 @@ class BaseOrchestrator:
 
         for info in actions_info:
             action_id = info['_id']
-            for attempt in info['attempts']:
+            # actions that never completed have no attempts
+            for attempt in info.get('attempts', []):
                 orch_id = attempt['orch_id']
                 if orch_ids and orch_id not in orch_ids:
                     continue
@@ -0,0 +1,112 @@
+import asyncio
+import heapq
+import itertools
+
+
+# order in which the actions of a call are invoked when they can not all run at once
+DISPATCH_ORDERS = ('fifo', 'longest_first', 'critical_path')
+
+
+def get_downstream_lengths(runtimes, dependents):
+    """
+    Finds the length of the longest chain of actions that has to run after each action, i.e. the part of the critical path
+    which follows it. Actions are nodes keyed by name, so the lineage of one orchestration can be applied to the next.
+
+    Parameters
+    ----------
+    runtimes : dict[str, float]
+        predicted runtime of every node, nodes without prediction count as 0.
+    dependents : dict[str, set[str]]
+        nodes that read the objects written by each node.
+
+    Returns
+    -------
+    dict[str, float]
+        seconds of work on the longest chain after each node, 0 for the nodes nothing depends on.
+
+    """
+    lengths = dict()
+
+    def _length(node, visiting):
+        if node in lengths:
+            return lengths[node]
+        longest = 0
+        for dependent in dependents.get(node, []):
+            # an action may read what an action of the same name wrote, the lineage is not a DAG by name then
+            if dependent == node or dependent in visiting:
+                continue
+            longest = max(longest, (runtimes.get(dependent, None) or 0) +
+                          _length(dependent, visiting | {node}))
+        lengths[node] = longest
+        return longest
+
+    for node in [*runtimes, *dependents]:
+        _length(node, frozenset())
+
+    return lengths
+
+
+def get_dispatch_order(priorities):
+    """
+    Returns the indexes of the actions from the highest to the lowest priority. Actions without priority keep their
+    list order after the others, and so do actions with equal priority.
+
+    Parameters
+    ----------
+    priorities : float[]
+        priority of every action, None if it is not known.
+
+    Returns
+    -------
+    int[]
+        indexes of the actions in the order in which they are to be invoked.
+
+    """
+    return sorted(range(len(priorities)), key=lambda i: (priorities[i] is None, -(priorities[i] or 0)))
+
+
+class PrioritySemaphore:
+    """
+    A semaphore which hands a freed slot to the waiter with the highest priority, and to the oldest waiter among equals.
+    It is used in place of asyncio.Semaphore when several calls share their concurrency, like the nodes of a workflow,
+    so that the order of dispatch holds across the calls too.
+    """
+
+    def __init__(self, value=1) -> None:
+        self.value = value
+        # (-priority, sequence, future) of the waiting acquires
+        self.waiters = []
+        self.sequence = itertools.count()
+
+    def locked(self):
+        return self.value == 0
+
+    async def acquire(self, priority=0):
+        if self.value > 0 and not self.waiters:
+            self.value -= 1
+            return True
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self.waiters, (-(priority or 0), next(self.sequence), future))
+        try:
+            await future
+        except asyncio.CancelledError:
+            # the slot is passed on if it had already been handed to the cancelled waiter
+            if future.done() and not future.cancelled():
+                self.release()
+            raise
+        return True
+
+    def release(self):
+        while self.waiters:
+            _, _, future = heapq.heappop(self.waiters)
+            if not future.done():
+                future.set_result(True)
+                return
+        self.value += 1
+
+    async def __aenter__(self):
+        await self.acquire()
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self.release()
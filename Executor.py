@@ -0,0 +1,68 @@
+import asyncio
+
+
+class Executor:
+    """
+    Runs the actions invoked by the orchestrator. An activation is started with invoke, and the future returned by track
+    is resolved with a Completion once it has completed. The record of a Completion has the shape of an openwhisk activation
+    record: 'activationId', 'start' and 'end' in epoch milliseconds, 'response' with the 'result' returned by the action,
+    and 'annotations', where 'waitTime' is the milliseconds the activation waited before it started.
+    """
+
+    async def invoke(self, action_name, params) -> str:
+        """
+        Starts an activation of an action.
+
+        Parameters
+        ----------
+        action_name : str
+            name of the action
+        params : dict
+            parameters passed to the action, along with the context of the orchestration.
+
+        Returns
+        -------
+        str
+            id of the activation
+
+        Raises
+        ------
+        ThrottledException
+            if the activation can not be started now because of the limits of the executor.
+
+        """
+        raise NotImplementedError
+
+    def track(self, activation_id, start_ts, expected_runtime=None) -> asyncio.Future:
+        """
+        Registers an activation to be waited for.
+
+        Parameters
+        ----------
+        activation_id : str
+            activation to wait for
+        start_ts : datetime
+            time at which the activation was invoked
+        expected_runtime : float
+            predicted runtime in seconds, None if it is not known.
+
+        Returns
+        -------
+        asyncio.Future
+            resolved with a Completion once the activation has completed.
+
+        """
+        raise NotImplementedError
+
+    def untrack(self, activation_id):
+        """
+        Stops waiting for an activation, its future is cancelled if it is still pending.
+        Returns the number of checks that were made for it.
+        """
+        raise NotImplementedError
+
+    async def close(self):
+        """
+        Releases the resources of the executor, the activations still being waited for are cancelled.
+        """
+        raise NotImplementedError
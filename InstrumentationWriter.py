@@ -0,0 +1,184 @@
+import asyncio
+import threading
+import time
+
+from pymongo import collection
+from pymongo.errors import BulkWriteError
+
+
+class InstrumentationWriter:
+    """
+    Buffers the instrumentation updates made by the orchestrator while actions are running and writes them with periodic
+    bulk_write calls in a worker thread, so that Mongo round trips are not made on the event loop between dispatches and completions.
+    The buffer is bounded, writers wait for a flush when it is full.
+    The updates are written in the order in which they were made, a single batch being written at a time.
+    """
+
+    def __init__(self, db_collection: collection.Collection, logger, flush_interval=0.2, max_batch=500, max_pending=10000,
+                 max_retries=3, retry_backoff=0.5) -> None:
+        """
+        Parameters
+        ----------
+        db_collection : collection.Collection
+            collection to which the updates are written
+        logger : logging.Logger
+            logger of the orchestrator
+        flush_interval : float
+            maximum seconds for which an update is buffered
+        max_batch : int
+            maximum number of updates written in a single bulk_write, a flush is started as soon as these many are buffered.
+        max_pending : int
+            maximum number of buffered updates, after which writers wait for a flush.
+        max_retries : int
+            number of times a batch is written again after failing with an error other than an update error, e.g. a
+            connection error, after which it is dropped.
+        retry_backoff : float
+            seconds before the first retry of a batch, doubled with every retry.
+
+        Returns
+        -------
+        None
+
+        """
+        self.db_collection = db_collection
+        self.logger = logger
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        self.max_pending = max_pending
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        # updates that have not been handed to a bulk_write yet, in the order in which they were made
+        self.pending = []
+        # batches are taken and written by the flushing task and by flush, which may be called from another thread,
+        # holding the lock from taking a batch until it is written keeps the writes in order
+        self.write_lock = threading.Lock()
+        self.task = None
+        self.task_loop = None
+
+    def __ensure_running(self):
+        """
+        Starts the flushing task in the running event loop if it is not running already.
+        """
+        loop = asyncio.get_running_loop()
+        if self.task is not None and not self.task.done() and self.task_loop is loop:
+            return
+
+        self.wakeup = asyncio.Event()
+        self.space = asyncio.Event()
+        self.closing = False
+        self.task = loop.create_task(self.__run())
+        self.task_loop = loop
+
+    async def write(self, operations):
+        """
+        Buffers updates to be written with the next flush.
+
+        Parameters
+        ----------
+        operations : UpdateOne | UpdateOne[]
+            pymongo write operations for the collection
+
+        Returns
+        -------
+        None
+
+        """
+        if not isinstance(operations, list):
+            operations = [operations]
+        self.__ensure_running()
+        while len(self.pending) >= self.max_pending:
+            self.space.clear()
+            self.wakeup.set()
+            await self.space.wait()
+
+        self.pending.extend(operations)
+        if len(self.pending) >= self.max_batch:
+            self.wakeup.set()
+
+    def __take_batch(self):
+        batch = self.pending[:self.max_batch]
+        del self.pending[:self.max_batch]
+        return batch
+
+    def __write_next(self):
+        """
+        Takes the next batch of buffered updates and writes it.
+        """
+        with self.write_lock:
+            self.__write_batch(self.__take_batch())
+
+    def __write_batch(self, batch):
+        """
+        Writes a batch with an ordered bulk_write. An update that fails is skipped and the updates after it, which the
+        bulk_write has not attempted, are written again. Other errors are retried with backoff before the batch is dropped.
+        """
+        retries = 0
+        # the batch is empty if another caller has taken the last updates in the meantime
+        while batch:
+            try:
+                self.db_collection.bulk_write(batch, ordered=True)
+                return
+            except BulkWriteError as e:
+                write_errors = e.details.get('writeErrors', [])
+                if not write_errors:
+                    # every update was applied, only the write concern was not satisfied
+                    self.logger.info("Writing {} instrumentation updates failed with: {}".format(
+                        len(batch), e.details.get('writeConcernErrors', e)))
+                    return
+                failed = write_errors[0]['index']
+                self.logger.info("Writing instrumentation update {} failed with: {}".format(
+                    batch[failed], write_errors[0].get('errmsg', e)))
+                batch = batch[failed + 1:]
+            except Exception as e:
+                if retries >= self.max_retries:
+                    self.logger.info("Writing {} instrumentation updates failed with: {}, they are dropped".format(
+                        len(batch), e))
+                    return
+                self.logger.info("Writing {} instrumentation updates failed with: {}, retrying".format(
+                    len(batch), e))
+                time.sleep(self.retry_backoff * (2 ** retries))
+                retries += 1
+
+    async def __run(self):
+        """
+        Flushing loop that keeps running in the event loop. Buffered updates are written every flush_interval seconds,
+        or as soon as a batch is full.
+        """
+        while not self.closing:
+            try:
+                await asyncio.wait_for(self.wakeup.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self.wakeup.clear()
+
+            while self.pending and not self.closing:
+                await asyncio.to_thread(self.__write_next)
+                self.space.set()
+
+    def flush(self):
+        """
+        Writes every buffered update, and returns once all the writes started before have finished too.
+        It blocks, so that it can be used from synchronous code like stop, and is safe to call from a worker thread.
+        """
+        # a batch being written by the flushing task is finished before the lock is acquired
+        with self.write_lock:
+            while self.pending:
+                self.__write_batch(self.__take_batch())
+
+        if self.task is not None and not self.task_loop.is_closed():
+            self.task_loop.call_soon_threadsafe(self.space.set)
+
+    async def close(self):
+        """
+        Flushes the buffered updates and stops the flushing task.
+        """
+        self.flush()
+        if self.task is None:
+            return
+        # the task is asked to return rather than cancelled, as wait_for can swallow a cancellation that races with the wakeup
+        if self.task_loop is asyncio.get_running_loop():
+            self.closing = True
+            self.wakeup.set()
+            await self.task
+        self.task = None
+        self.task_loop = None
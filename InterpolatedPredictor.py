@@ -40,8 +40,19 @@ class InterpolatedPredictor:
     This class has a couple of functions used to predict things using the existing data stored in mongoDB
     """
 
-    def __init__(self) -> None:
-        self.orch = BaseOrchestrator(auth)
+    def __init__(self, orch: BaseOrchestrator = None) -> None:
+        """
+        Parameters
+        ----------
+        orch : BaseOrchestrator
+            orchestrator whose document store has the history used for the predictions, a new one by default.
+
+        Returns
+        -------
+        None
+
+        """
+        self.orch = orch or BaseOrchestrator(auth)
 
     def __fetch_all_details(self, orch_name, action_name):
         """
@@ -91,10 +102,14 @@ class InterpolatedPredictor:
         input_size_X = []
         runtime_Y = []
         for orch_id, orch_action_details in details.items():
-            input_size = self.orch.get_orch_details(orch_id)['input_size']
+            # orchestrations that have not been stopped yet do not have an input size
+            orch_input_size = self.orch.get_orch_details(
+                orch_id).get('input_size', None)
+            if orch_input_size is None:
+                continue
             for action_metrics in orch_action_details.values():
                 runtime = action_metrics['runtime']
-                input_size_X.append(input_size)
+                input_size_X.append(orch_input_size)
                 runtime_Y.append(runtime)
 
         X, Y = reorder_arrays(input_size_X, runtime_Y)
@@ -0,0 +1,218 @@
+import asyncio
+import importlib
+import importlib.util
+import json
+import os
+import sys
+import time
+import uuid
+
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+
+from ActivationTracker import Completion
+from Executor import Executor
+
+
+# functions of the actions already loaded in this process, keyed by their target
+loaded_actions = dict()
+
+
+def load_action(target):
+    """
+    Loads the function of an action. The target is a module name ('transcoder.actions') or the absolute path of a python
+    file, optionally followed by ':function', the function being main by default.
+    """
+    if target in loaded_actions:
+        return loaded_actions[target]
+
+    module_name, _, function_name = target.partition(':')
+    if module_name.endswith('.py'):
+        path = module_name
+        # the files deployed along with the action can be imported by it, as on openwhisk
+        sys.path.insert(0, os.path.dirname(path))
+        spec = importlib.util.spec_from_file_location(
+            os.path.splitext(os.path.basename(path))[0].replace('-', '_'), path)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+    else:
+        module = importlib.import_module(module_name)
+
+    loaded_actions[target] = getattr(module, function_name or 'main')
+    return loaded_actions[target]
+
+
+def resolve_target(target):
+    """
+    Makes the path of an action given as a python file absolute, so that it does not depend on the working directory.
+    """
+    module_name, separator, function_name = target.partition(':')
+    if not module_name.endswith('.py'):
+        return target
+    return os.path.abspath(module_name) + separator + function_name
+
+
+def get_record(activation_id, start, end, result, wait_time=0):
+    """
+    Builds an openwhisk like activation record, start and end are epoch seconds.
+    """
+    success = isinstance(result, dict) and 'error' not in result
+    return {
+        'activationId': activation_id,
+        'start': int(start * 1000),
+        'end': int(end * 1000),
+        'duration': int((end - start) * 1000),
+        'response': {
+            'result': result,
+            'status': 'success' if success else 'application error',
+            'success': success
+        },
+        'annotations': [{'key': 'waitTime', 'value': int(wait_time * 1000)}]
+    }
+
+
+def run_action(target, activation_id, params, submit_ts, in_worker_process=True):
+    """
+    Runs an action in a worker and returns its activation record. An exception raised by the action, or a result that is
+    not a dict, gives an error result as openwhisk does.
+    In a worker process, an action given as a python file runs in the directory of the file, where it finds the files
+    deployed along with it, like in its openwhisk container.
+    """
+    start = time.time()
+    working_dir = os.getcwd()
+    if in_worker_process:
+        os.environ['__OW_ACTIVATION_ID'] = activation_id
+        module_name = target.partition(':')[0]
+        if module_name.endswith('.py'):
+            os.chdir(os.path.dirname(module_name))
+    try:
+        result = load_action(target)(params)
+        if not isinstance(result, dict):
+            result = {'error': 'The action did not return a dictionary.'}
+        # results go through json like on openwhisk, so an action can not pass on what openwhisk could not
+        result = json.loads(json.dumps(result))
+    except Exception as e:
+        result = {'error': 'An error has occurred: {}'.format(e)}
+    finally:
+        os.chdir(working_dir)
+
+    return get_record(activation_id, start, time.time(), result, start - submit_ts)
+
+
+class LocalExecutor(Executor):
+    """
+    Runs the actions on this host by calling their main(args) in a pool of worker processes, with the same context in the
+    parameters and the same result and error shape as on openwhisk. Whole pipelines, including the NoSuchKey recovery,
+    can so be run without an openwhisk deployment, with as many actions at a time as there are cores.
+    The working directory of the orchestrator is shared by the actions, unlike with openwhisk containers.
+    """
+
+    def __init__(self, actions, max_workers=None, processes=True) -> None:
+        """
+        Parameters
+        ----------
+        actions : dict[str, str]
+            action name -> module name or python file of the action, optionally followed by ':function' when it is not main.
+            e.g. {'transcoder': 'transcoder.actions', 'split-action': 'chatbot/split-action.py'}
+        max_workers : int
+            number of actions run at a time, the number of cores by default.
+        processes : bool
+            runs the actions in worker processes. False runs them in threads of the orchestrator process, which is handy
+            for debugging, but the activation id seen by the object store is then shared by the actions running at a time.
+
+        Returns
+        -------
+        None
+
+        """
+        self.actions = {action_name: resolve_target(target)
+                        for action_name, target in actions.items()}
+        self.max_workers = max_workers or os.cpu_count()
+        self.processes = processes
+        self.pool = None
+        # activation_id -> concurrent future of the run, and asyncio future of the tracked activations
+        self.runs = dict()
+        self.futures = dict()
+
+    def __get_pool(self):
+        if self.pool is not None and getattr(self.pool, '_broken', False):
+            # a worker process died, e.g. killed for running out of memory, and the pool does not take any more runs.
+            # The runs it still had have already failed with BrokenProcessPool.
+            self.pool.shutdown(wait=False, cancel_futures=True)
+            self.pool = None
+        if self.pool is None:
+            self.pool = ProcessPoolExecutor(self.max_workers) if self.processes else ThreadPoolExecutor(self.max_workers)
+        return self.pool
+
+    async def invoke(self, action_name, params) -> str:
+        if action_name not in self.actions:
+            raise Exception('Invoking {} failed with: no local action of this name'.format(action_name))
+        activation_id = uuid.uuid4().hex
+        args = (run_action, self.actions[action_name], activation_id, json.loads(json.dumps(params)), time.time(), self.processes)
+        try:
+            self.runs[activation_id] = self.__get_pool().submit(*args)
+        except BrokenProcessPool:
+            # the pool broke after it was last checked
+            self.runs[activation_id] = self.__get_pool().submit(*args)
+        return activation_id
+
+    def track(self, activation_id, start_ts, expected_runtime=None) -> asyncio.Future:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        run = self.runs.get(activation_id, None)
+        if run is None:
+            # an activation of an earlier orchestrator, e.g. before a resume, was lost along with its workers
+            now = time.time()
+            future.set_result(Completion(get_record(activation_id, now, now, {
+                'error': 'Activation {} is not running'.format(activation_id)}), datetime.utcnow(), 0))
+            return future
+
+        def _resolve(run):
+            self.runs.pop(activation_id, None)
+            self.futures.pop(activation_id, None)
+            if future.done():
+                return
+            if run.cancelled():
+                future.cancel()
+            elif run.exception() is not None:
+                # the run failed outside of the action, e.g. its worker process died, which is an error of the activation
+                # as an exception of the action is
+                error = run.exception()
+                now = time.time()
+                future.set_result(Completion(get_record(activation_id, now, now, {
+                    'error': 'An error has occurred: {}'.format(str(error) or type(error).__name__)}), datetime.utcnow(), 0))
+            else:
+                future.set_result(Completion(run.result(), datetime.utcnow(), 0))
+
+        def _done(run):
+            try:
+                loop.call_soon_threadsafe(_resolve, run)
+            except RuntimeError:
+                # the event loop was closed before the activation completed
+                pass
+
+        self.futures[activation_id] = future
+        run.add_done_callback(_done)
+        return future
+
+    def untrack(self, activation_id):
+        future = self.futures.pop(activation_id, None)
+        if future is not None and not future.done():
+            future.cancel()
+        run = self.runs.pop(activation_id, None)
+        if run is not None:
+            # only an activation that has not started yet can be cancelled, like on openwhisk the others run to the end
+            run.cancel()
+        return 0
+
+    async def close(self):
+        for future in self.futures.values():
+            if not future.done():
+                future.cancel()
+        self.futures = dict()
+        self.runs = dict()
+        if self.pool is not None:
+            pool = self.pool
+            self.pool = None
+            await asyncio.to_thread(pool.shutdown, True, cancel_futures=True)
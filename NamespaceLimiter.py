@@ -0,0 +1,196 @@
+import asyncio
+import json
+import os
+import tempfile
+import time
+import uuid
+
+try:
+    import fcntl
+except ImportError:
+    # file locks are only available on unix, the limiter can not be used elsewhere
+    fcntl = None
+
+
+class NamespaceLimiter:
+    """
+    Limits the invocations made to an openwhisk namespace by every orchestration on the host, whichever process it runs in:
+    a token bucket bounds the invocations per second, and a lease is held for every activation in flight to bound the
+    concurrent activations. The state is kept in a small file guarded by an exclusive file lock, so every coroutine and
+    every process using a limiter with the same name shares it.
+    Slots are shared fairly: an orchestration waiting for an invocation is only passed over by orchestrations which hold
+    fewer leases for their weight, so a big batch can not starve a small orchestration started after it.
+    """
+
+    def __init__(self, name='guest', rate=None, burst=None, max_concurrent=None, weight_ttl=0.5, retry_interval=0.02,
+                 state_dir=None) -> None:
+        """
+        Parameters
+        ----------
+        name : str
+            name of the limiter, usually the namespace. Limiters with the same name and state_dir share their limits.
+        rate : float
+            invocations allowed per second across the host, None for no rate limit.
+        burst : int
+            maximum number of invocations made at once after an idle period, by default one second worth of rate.
+        max_concurrent : int
+            activations allowed in flight across the host, None for no limit.
+        weight_ttl : float
+            seconds after its last attempt for which a waiting orchestration keeps its claim on a fair share.
+        retry_interval : float
+            seconds between two attempts of a waiting invocation.
+        state_dir : str
+            directory of the state and lock files, the temporary directory by default.
+
+        Returns
+        -------
+        None
+
+        """
+        if fcntl is None:
+            raise Exception('NamespaceLimiter needs fcntl, which is not available on this platform')
+
+        self.name = name
+        self.rate = rate
+        self.burst = burst if burst is not None else max(rate or 1, 1)
+        self.max_concurrent = max_concurrent
+        self.weight_ttl = weight_ttl
+        self.retry_interval = retry_interval
+        state_dir = state_dir or tempfile.gettempdir()
+        self.state_path = os.path.join(
+            state_dir, 'openwhisk-limiter-{}.json'.format(name))
+        self.lock_path = self.state_path + '.lock'
+
+    def __load(self, state_file):
+        state_file.seek(0)
+        content = state_file.read()
+        if not content:
+            return {'tokens': self.burst, 'refilled_at': time.time(), 'leases': {}, 'waiting': {}}
+        return json.loads(content)
+
+    def __save(self, state_file, state):
+        state_file.seek(0)
+        state_file.truncate()
+        state_file.write(json.dumps(state))
+        state_file.flush()
+
+    def __update(self, update):
+        """
+        Applies update to the shared state while holding the file lock, and returns what update returns.
+        """
+        with open(self.lock_path, 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                with open(self.state_path, 'a+') as state_file:
+                    state = self.__load(state_file)
+                    result = update(state)
+                    self.__save(state_file, state)
+                    return result
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def __is_alive(self, pid):
+        try:
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            return False
+        except PermissionError:
+            pass
+        return True
+
+    def __clean(self, state, now):
+        """
+        Refills the token bucket, and drops the leases of processes that have exited and the stale waiting orchestrations.
+        """
+        if self.rate is not None:
+            state['tokens'] = min(self.burst, state['tokens'] +
+                                  (now - state['refilled_at']) * self.rate)
+        state['refilled_at'] = now
+
+        pids = {lease['pid'] for lease in state['leases'].values()}
+        dead = {pid for pid in pids if pid != os.getpid() and not self.__is_alive(pid)}
+        state['leases'] = {lease_id: lease for lease_id, lease in state['leases'].items()
+                           if lease['pid'] not in dead}
+        state['waiting'] = {key: waiting for key, waiting in state['waiting'].items()
+                            if now - waiting['at'] < self.weight_ttl}
+
+    def __try_acquire(self, key, weight, wait):
+        """
+        Takes a token and a lease for key if the limits and the fair share allow it.
+
+        Returns
+        -------
+        (str, float)
+            id of the lease, None if it was not granted, and the seconds after which to try again.
+
+        """
+        def _update(state):
+            now = time.time()
+            self.__clean(state, now)
+            if wait:
+                state['waiting'][key] = {'weight': weight, 'at': now}
+
+            held = {}
+            for lease in state['leases'].values():
+                held[lease['key']] = held.get(lease['key'], 0) + 1
+
+            retry_after = self.retry_interval
+            if self.rate is not None and state['tokens'] < 1:
+                return None, max((1 - state['tokens']) / self.rate, retry_after)
+            if self.max_concurrent is not None and len(state['leases']) >= self.max_concurrent:
+                return None, retry_after
+            share = held.get(key, 0) / weight
+            for other_key, waiting in state['waiting'].items():
+                if other_key != key and held.get(other_key, 0) / waiting['weight'] < share:
+                    # the next slot goes to the orchestration furthest below its fair share
+                    return None, retry_after
+
+            lease_id = uuid.uuid4().hex
+            state['leases'][lease_id] = {
+                'key': key, 'pid': os.getpid(), 'at': now}
+            if self.rate is not None:
+                state['tokens'] -= 1
+            state['waiting'].pop(key, None)
+            return lease_id, 0
+
+        return self.__update(_update)
+
+    async def acquire(self, key, weight=1):
+        """
+        Waits until an invocation can be made for an orchestration and returns the lease for its activation, which has
+        to be released once the activation has completed.
+
+        Parameters
+        ----------
+        key : str
+            orchestration making the invocation, usually its orch_id.
+        weight : float
+            weight of the orchestration in the fair share.
+
+        Returns
+        -------
+        str
+            id of the lease
+
+        """
+        while True:
+            lease_id, retry_after = await asyncio.to_thread(self.__try_acquire, key, weight, True)
+            if lease_id is not None:
+                return lease_id
+            await asyncio.sleep(retry_after)
+
+    async def try_acquire(self, key, weight=1):
+        """
+        Same as acquire, but returns None instead of waiting when the invocation can not be made right away.
+        """
+        lease_id, _ = await asyncio.to_thread(self.__try_acquire, key, weight, False)
+        return lease_id
+
+    async def release(self, lease_id):
+        """
+        Releases the lease of an activation which has completed, or which was never made.
+        """
+        def _update(state):
+            state['leases'].pop(lease_id, None)
+
+        await asyncio.to_thread(self.__update, _update)
@@ -0,0 +1,129 @@
+import asyncio
+import base64
+import aiohttp
+
+
+# statuses with which openwhisk rejects an invocation when the namespace is over its concurrency or rate limit
+THROTTLED_STATUSES = (429, 503)
+
+
+class ThrottledException(Exception):
+    """
+    Raised when openwhisk rejects an invocation because of its limits, the invocation can be made again later.
+    """
+
+    def __init__(self, status, retry_after=None, body=None):
+        self.status = status
+        self.retry_after = retry_after
+        self.body = body
+        super().__init__('Invocation throttled with status {}: {}'.format(status, body))
+
+
+class OpenwhiskClient:
+    """
+    An asyncio client for the openwhisk REST api. Every call goes through a single keep-alive connection pool
+    which is shared by the poller and the invoker, so polling and dispatching actions do not block each other.
+    """
+
+    def __init__(self, auth, pool_size=100, keepalive_timeout=30, timeout=60) -> None:
+        """
+        Initialises the client. The underlying session is only created on first use because it is bound to the
+        running event loop.
+
+        Parameters
+        ----------
+        auth : (str, str)
+            username and password used for authenticating with openwhisk
+        pool_size : int
+            maximum number of connections kept open to the openwhisk controller
+        keepalive_timeout : int
+            seconds for which an idle connection is kept open for reuse
+        timeout : int
+            total seconds allowed for a single api call
+
+        Returns
+        -------
+        None
+
+        """
+        # the header is built here rather than with aiohttp.BasicAuth, which newer aiohttp versions deprecate
+        self.headers = {'Authorization': 'Basic ' + base64.b64encode('{}:{}'.format(*auth).encode()).decode()}
+        self.pool_size = pool_size
+        self.keepalive_timeout = keepalive_timeout
+        self.timeout = aiohttp.ClientTimeout(total=timeout)
+        self.session = None
+        self.session_loop = None
+
+    def __get_session(self) -> aiohttp.ClientSession:
+        """
+        Returns the session for the running event loop, creating it if required.
+        A session can not be used across event loops, so a new one is made if the loop has changed.
+        """
+        loop = asyncio.get_running_loop()
+        if self.session is None or self.session.closed or self.session_loop is not loop:
+            connector = aiohttp.TCPConnector(
+                limit=self.pool_size, keepalive_timeout=self.keepalive_timeout, ssl=False)
+            self.session = aiohttp.ClientSession(
+                connector=connector, headers=self.headers, timeout=self.timeout)
+            self.session_loop = loop
+
+        return self.session
+
+    async def get(self, api_url, params=None):
+        """
+        Makes a GET api call to the given url with insecure flag as true.
+
+        Parameters
+        ----------
+        api_url : str
+            Url to fetch
+        params: dict
+            query parameters to be added to the url
+
+        Returns
+        -------
+        dict
+            json response from the api call
+
+        """
+        async with self.__get_session().get(api_url, params=params) as response:
+            return await response.json(content_type=None)
+
+    async def post(self, api_url, body):
+        """
+        Makes a POST api call to the given url with insecure flag as true.
+
+        Parameters
+        ----------
+        api_url : str
+            Url to use
+        body: dict
+            json body to be sent
+
+        Returns
+        -------
+        dict
+            json response from the api call
+
+        Raises
+        ------
+        ThrottledException
+            if openwhisk rejects the call because of its limits.
+
+        """
+        headers = {"Content-Type": "application/json"}
+        async with self.__get_session().post(api_url, headers=headers, json=body) as response:
+            if response.status in THROTTLED_STATUSES:
+                retry_after = response.headers.get('Retry-After', None)
+                raise ThrottledException(response.status, float(retry_after) if retry_after and retry_after.isdigit() else None,
+                                         await response.text())
+            return await response.json(content_type=None)
+
+    async def close(self):
+        """
+        Closes all the pooled connections. Should be called once the orchestrator is done with the event loop.
+        """
+        if self.session is not None and not self.session.closed:
+            await self.session.close()
+        self.session = None
+        self.session_loop = None
@@ -0,0 +1,55 @@
+import asyncio
+
+from ActivationTracker import ActivationTracker
+from Executor import Executor
+from OpenwhiskClient import OpenwhiskClient
+
+
+class OpenwhiskExecutor(Executor):
+    """
+    Runs the actions on openwhisk through its REST api. Invocations go through a pooled OpenwhiskClient and every activation
+    is polled by a single ActivationTracker.
+    """
+
+    def __init__(self, auth, url, logger, poll_mode='list', list_max_pages=5, straggler_interval=10, min_poll_interval=0.1,
+                 max_poll_interval=8) -> None:
+        """
+        Parameters
+        ----------
+        auth : (str, str)
+            auth tuple for openwhisk, use `wsk property get --auth` to get it.
+        url : str
+            base url of the openwhisk namespaces api.
+        logger : logging.Logger
+            logger of the orchestrator
+        poll_mode, list_max_pages, straggler_interval, min_poll_interval, max_poll_interval
+            passed to the ActivationTracker.
+
+        Returns
+        -------
+        None
+
+        """
+        self.url = url
+        self.http = OpenwhiskClient(auth)
+        self.tracker = ActivationTracker(self.http, url, logger, poll_mode=poll_mode, list_max_pages=list_max_pages,
+                                         straggler_interval=straggler_interval, min_poll_interval=min_poll_interval,
+                                         max_poll_interval=max_poll_interval)
+
+    async def invoke(self, action_name, params) -> str:
+        api_url = "{}/guest/actions/{}".format(self.url, action_name)
+        action_response = await self.http.post(api_url, params)
+        if 'activationId' not in action_response:
+            raise Exception('Invoking {} failed with: {}'.format(
+                action_name, action_response))
+        return action_response['activationId']
+
+    def track(self, activation_id, start_ts, expected_runtime=None) -> asyncio.Future:
+        return self.tracker.track(activation_id, start_ts, expected_runtime)
+
+    def untrack(self, activation_id):
+        return self.tracker.untrack(activation_id)
+
+    async def close(self):
+        await self.tracker.close()
+        await self.http.close()
@@ -47,7 +47,7 @@ class OrchestratorCalculator:
 
     def __init__(self) -> None:
         self.orch = BaseOrchestrator(auth)
-        self.predictor = InterpolatedPredictor()
+        self.predictor = InterpolatedPredictor(self.orch)
         self.dag = OrchestrationDAG()
         self.store = store.ObjectStore(
             db_config={'MONGO_HOST': MONGO_HOST, 'MONGO_PORT': MONGO_PORT})
@@ -0,0 +1,101 @@
+import heapq
+import time
+
+
+class PollScheduler:
+    """
+    Keeps the time at which each outstanding activation has to be checked next in a priority queue.
+    The first check is placed at the expected runtime of the action, after which the checks back off exponentially.
+    """
+
+    def __init__(self, min_interval=0.1, max_interval=8) -> None:
+        """
+        Parameters
+        ----------
+        min_interval : float
+            seconds before the first check when nothing is known about the runtime, and the first backoff interval.
+        max_interval : float
+            maximum seconds between two checks of the same activation.
+
+        Returns
+        -------
+        None
+
+        """
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.queue = []
+        self.checks = {}
+
+    def add(self, activation_id, expected_runtime=None):
+        """
+        Schedules the first check of an activation.
+
+        Parameters
+        ----------
+        activation_id : str
+            activation to be scheduled
+        expected_runtime : float
+            predicted runtime of the action in seconds, None if there is no prediction.
+
+        Returns
+        -------
+        None
+
+        """
+        first_check = max(expected_runtime or 0, self.min_interval)
+        self.checks[activation_id] = 0
+        heapq.heappush(
+            self.queue, (time.monotonic() + first_check, activation_id))
+
+    def reschedule(self, activation_id):
+        """
+        Schedules the next check of an activation which had not completed when it was last checked.
+        The interval doubles with every check until it reaches max_interval.
+        """
+        if activation_id not in self.checks:
+            return
+        interval = min(self.min_interval * (2 ** self.checks[activation_id]),
+                       self.max_interval)
+        self.checks[activation_id] += 1
+        heapq.heappush(
+            self.queue, (time.monotonic() + interval, activation_id))
+
+    def remove(self, activation_id):
+        """
+        Stops scheduling an activation. Returns the number of checks that were made for it.
+        Entries in the queue are dropped lazily when they become due.
+        """
+        return self.checks.pop(activation_id, 0)
+
+    def pop_due(self):
+        """
+        Returns
+        -------
+        str[]
+            all the activations whose check is due now.
+
+        """
+        now = time.monotonic()
+        due = []
+        while self.queue and self.queue[0][0] <= now:
+            _, activation_id = heapq.heappop(self.queue)
+            if activation_id in self.checks:
+                due.append(activation_id)
+
+        return due
+
+    def time_to_next(self):
+        """
+        Returns
+        -------
+        float
+            seconds until the next check is due, None if nothing is scheduled.
+
+        """
+        while self.queue and self.queue[0][1] not in self.checks:
+            heapq.heappop(self.queue)
+        if not self.queue:
+            return None
+
+        return max(self.queue[0][0] - time.monotonic(), 0)
@@ -0,0 +1,242 @@
+import asyncio
+
+from typing import Callable, Dict, List, Union
+from BaseOrchestrator import BaseOrchestrator
+
+
+class WorkflowNode:
+    """
+    A template for the actions of one step of a workflow.
+    A 'single' node makes one action, a 'fan_out' node makes one action per item returned by `items`, and a 'map' node
+    makes one action per action of its parent, each of which starts as soon as the corresponding parent action is done.
+    """
+
+    def __init__(self, name, action_name, kind, params, after, parent=None, items=None, retries=3, object_ownership=True):
+        self.name: str = name
+        self.action_name: str = action_name
+        self.kind: str = kind
+        self.params: Union[dict, Callable] = params
+        self.after: List[str] = after
+        self.parent: str = parent
+        self.items: Callable = items
+        self.retries: int = retries
+        self.object_ownership: bool = object_ownership
+
+    def get_params(self, results, item=None):
+        """
+        Builds the parameters of an action of this node from the results of its dependencies.
+        """
+        if not callable(self.params):
+            return self.params
+        if self.kind == 'fan_out':
+            return self.params(item, results)
+        return self.params(results)
+
+
+class Workflow:
+    """
+    Declares a workflow as a graph of action templates and runs it on a BaseOrchestrator. Every action is launched as soon as
+    the actions it depends on are done, instead of waiting for whole stages, while a single semaphore bounds the total concurrency.
+
+    Example:
+    ```
+    workflow = Workflow(orch, concurrency=4)
+    workflow.action('split', 'splitter', {'type': 'chunk', 'num_chunks': 5, 'input': 'facebook.mp4'})
+    workflow.fan_out('transcode', 'transcoder', parent='split', items=lambda results: results['split']['splits'],
+                     params=lambda chunk, results: {'type': 'transcode', 'input': chunk, 'resolution': '360p'})
+    workflow.action('combine', 'combiner', after=['transcode'],
+                    params=lambda results: {'type': 'combine', 'input': [res['output_file'] for res in results['transcode']]})
+    results = await workflow.run()
+    ```
+    """
+
+    def __init__(self, orch: BaseOrchestrator, concurrency=2, dispatch_order='fifo') -> None:
+        """
+        Parameters
+        ----------
+        orch : BaseOrchestrator
+            a started orchestrator which will make the actions.
+        concurrency : int
+            maximum number of actions of the workflow running at a time.
+        dispatch_order : str
+            order in which the actions of the workflow get a free slot, see make_action. With 'critical_path', actions of the
+            nodes with more work after them go first, whichever node they belong to.
+
+        Returns
+        -------
+        None
+
+        """
+        self.orch = orch
+        self.concurrency = concurrency
+        self.dispatch_order = dispatch_order
+        self.nodes: Dict[str, WorkflowNode] = dict()
+
+    def __add(self, node: WorkflowNode):
+        """
+        Adds a node after checking its dependencies. As dependencies have to be declared first, the graph can not have cycles.
+        """
+        if node.name in self.nodes:
+            raise Exception(f'Node {node.name} already exists')
+        for dependency in node.after:
+            if dependency not in self.nodes:
+                raise Exception(
+                    f'Node {node.name} depends on {dependency} which has not been declared')
+        if node.kind == 'map' and self.nodes[node.parent].kind == 'single':
+            raise Exception(
+                f'Node {node.name} can only map over a fan_out or a map node')
+
+        self.nodes[node.name] = node
+        return node
+
+    def action(self, name, action_name, params, after=[], retries=3, object_ownership=True):
+        """
+        Declares a node which makes a single action.
+
+        Parameters
+        ----------
+        name : str
+            name of the node, its result is available to other nodes by this name.
+        action_name : str
+            openwhisk action to be invoked.
+        params : dict | Callable[[dict], dict]
+            parameters of the action, or a function building them from the results of the nodes in after.
+        after : str[]
+            nodes that have to be completed before this one. The result of a fan_out or map node is the list of
+            the results of its actions.
+        retries : int
+            Number of retries for the action
+        object_ownership: boolean
+            This signifies whether there are multiple actions that write onto a single key or if a single ownership exists.
+
+        Returns
+        -------
+        WorkflowNode
+
+        """
+        return self.__add(WorkflowNode(name, action_name, 'single', params, [*after],
+                                       retries=retries, object_ownership=object_ownership))
+
+    def fan_out(self, name, action_name, parent, items, params, after=[], retries=3, object_ownership=True):
+        """
+        Declares a node which makes one action for every item returned by items, once parent and after are completed.
+
+        Parameters
+        ----------
+        parent : str
+            node whose result gives the items.
+        items : Callable[[dict], list]
+            function returning the items from the results of parent and after.
+        params : Callable[[Any, dict], dict]
+            function building the parameters of the action for an item from the item and the results of parent and after.
+
+        Returns
+        -------
+        WorkflowNode
+
+        """
+        return self.__add(WorkflowNode(name, action_name, 'fan_out', params, [parent, *after], parent=parent,
+                                       items=items, retries=retries, object_ownership=object_ownership))
+
+    def map(self, name, action_name, parent, params, after=[], retries=3, object_ownership=True):
+        """
+        Declares a node which makes one action for every action of parent. Each of them starts as soon as its parent action is done,
+        so there is no barrier between the two nodes.
+
+        Parameters
+        ----------
+        parent : str
+            fan_out or map node to map over.
+        params : Callable[[dict], dict]
+            function building the parameters of the action, where the result of parent is the result of the corresponding parent action.
+
+        Returns
+        -------
+        WorkflowNode
+
+        """
+        return self.__add(WorkflowNode(name, action_name, 'map', params, [parent, *after], parent=parent,
+                                       retries=retries, object_ownership=object_ownership))
+
+    async def __make_actions(self, node: WorkflowNode, params_list, futures):
+        """
+        Makes the actions of a node in a single call to make_action_stream, and resolves the future of each action
+        as soon as its result is final.
+        """
+        actions = [self.orch.prepare_action(node.action_name, params)
+                   for params in params_list]
+        async for index, res in self.orch.make_action_stream(actions, retries=node.retries,
+                                                             object_ownership=node.object_ownership, semaphore=self.semaphore,
+                                                             dispatch_order=self.dispatch_order):
+            if not res['success']:
+                raise Exception(
+                    f"Node {node.name} failed with: {res.get('error', None)}")
+            futures[index].set_result(res['result'])
+
+    async def __run_node(self, node: WorkflowNode):
+        """
+        Waits for the dependencies of a node and makes its actions.
+        """
+        loop = asyncio.get_running_loop()
+
+        if node.kind == 'map':
+            parent_futures = await self.instances[node.parent]
+            futures = [loop.create_future() for _ in parent_futures]
+            self.instances[node.name].set_result(futures)
+            other_results = {dependency: await self.done[dependency]
+                             for dependency in node.after if dependency != node.parent}
+
+            async def _run_instance(index):
+                results = {**other_results,
+                           node.parent: await parent_futures[index]}
+                await self.__make_actions(node, [node.get_params(results)], [futures[index]])
+
+            await asyncio.gather(*[_run_instance(i) for i in range(len(futures))])
+            self.done[node.name].set_result([future.result() for future in futures])
+            return
+
+        results = {dependency: await self.done[dependency] for dependency in node.after}
+        if node.kind == 'fan_out':
+            items = list(node.items(results))
+            params_list = [node.get_params(results, item) for item in items]
+        else:
+            params_list = [node.get_params(results)]
+
+        futures = [loop.create_future() for _ in params_list]
+        self.instances[node.name].set_result(futures)
+        if params_list:
+            await self.__make_actions(node, params_list, futures)
+
+        if node.kind == 'fan_out':
+            self.done[node.name].set_result([future.result() for future in futures])
+        else:
+            self.done[node.name].set_result(futures[0].result())
+
+    async def run(self):
+        """
+        Runs the workflow. If any action fails after its retries, the remaining actions are cancelled and the error is raised.
+
+        Returns
+        -------
+        dict[str, Any]
+            result of every node. For fan_out and map nodes it is the list of the results of their actions.
+
+        """
+        loop = asyncio.get_running_loop()
+        # one set of slots for the whole workflow, handed out by priority when the actions are not dispatched in the order they are ready
+        self.semaphore = self.orch.create_slots(
+            self.concurrency, self.dispatch_order)
+        # resolved with the results of the node once all its actions are done
+        self.done = {name: loop.create_future() for name in self.nodes}
+        # resolved with the futures of the actions of the node once their number is known
+        self.instances = {name: loop.create_future() for name in self.nodes}
+
+        tasks = [asyncio.create_task(self.__run_node(node))
+                 for node in self.nodes.values()]
+        try:
+            await asyncio.gather(*tasks)
+        finally:
+            for task in tasks:
+                task.cancel()
+
+        return {name: future.result() for name, future in self.done.items()}
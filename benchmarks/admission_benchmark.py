@@ -0,0 +1,153 @@
+import argparse
+import asyncio
+import math
+import os
+import statistics
+import tempfile
+import time
+
+from BaseOrchestrator import BaseOrchestrator
+from OpenwhiskClient import OpenwhiskClient
+from benchmarks.fake_openwhisk import FakeOpenwhisk
+
+
+auth = ("guest", "guest")
+
+# intervals of the busy-wait admission BaseOrchestrator used before the semaphore: the dispatcher slept while every slot
+# was taken, and the poller checked every activation in flight and slept between rounds
+BUSY_WAIT_INTERVAL = 0.5
+BUSY_WAIT_POLL_INTERVAL = 1
+
+
+def get_dispatch_gaps(invocation_times, end_times, parallelisation):
+    """
+    With `parallelisation` slots, invocation number parallelisation+j can only be made after j+1 activations have ended.
+    The gap is the time for which the freed slot stayed idle, which includes the time taken to notice the completion.
+
+    Parameters
+    ----------
+    invocation_times : float[]
+        epoch at which each invocation reached openwhisk
+    end_times : float[]
+        epoch at which each activation ended, in increasing order
+    parallelisation: int
+        The maximum concurrency that was allowed
+
+    Returns
+    -------
+    float[]
+        dispatch gap in seconds for every invocation that had to wait for a slot.
+
+    """
+    invocation_times = sorted(invocation_times)
+    return [invocation_times[parallelisation + j] - end_times[j]
+            for j in range(len(invocation_times) - parallelisation)]
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(int(len(values) * p), len(values) - 1)]
+
+
+async def make_action_busy_wait(url, num_actions, parallelisation):
+    """
+    Invokes the actions the way BaseOrchestrator did before admitting them through a semaphore, as the baseline of the
+    benchmark. Nothing is recorded in MongoDB, so only the admission is compared.
+
+    Parameters
+    ----------
+    url : str
+        url of the openwhisk namespaces api
+    num_actions : int
+        number of actions to invoke
+    parallelisation: int
+        The maximum concurrency that is allowed
+
+    Returns
+    -------
+    dict[]
+        a result with the success of every action.
+
+    """
+    http = OpenwhiskClient(auth)
+    active_ids = set()
+    results = []
+
+    async def poller():
+        while len(results) < num_actions:
+            for activation_id in list(active_ids):
+                response = await http.get("{}/guest/activations/{}".format(url, activation_id))
+                if response.get('end', None) is None:
+                    continue
+                active_ids.remove(activation_id)
+                results.append({'success': response['response']['result'].get('error', None) is None})
+            await asyncio.sleep(BUSY_WAIT_POLL_INTERVAL)
+
+    poller_task = asyncio.create_task(poller())
+    i = 0
+    while i < num_actions:
+        if len(active_ids) >= parallelisation:
+            await asyncio.sleep(BUSY_WAIT_INTERVAL)
+            continue
+        response = await http.post("{}/guest/actions/benchmark".format(url), {'index': i})
+        active_ids.add(response['activationId'])
+        i += 1
+
+    await poller_task
+    await http.close()
+    return results
+
+
+async def run(num_actions, parallelisation, runtime, poll_mode, log_file, admission='semaphore'):
+    fake = FakeOpenwhisk(runtime)
+    url = await fake.start()
+
+    if admission == 'busy-wait':
+        start = time.time()
+        results = await make_action_busy_wait(url, num_actions, parallelisation)
+        makespan = time.time() - start
+    else:
+        orch = BaseOrchestrator(auth, url=url, poll_mode=poll_mode, log_file=log_file)
+        orch.start('admission-benchmark')
+        actions = [orch.prepare_action('benchmark', {'index': i})
+                   for i in range(num_actions)]
+        start = time.time()
+        results = await orch.make_action(actions, retries=0, parallelisation=parallelisation)
+        makespan = time.time() - start
+        await orch.close()
+
+    await fake.stop()
+
+    gaps = get_dispatch_gaps(
+        fake.invocation_times, fake.end_times(), parallelisation)
+    ideal_makespan = math.ceil(num_actions / parallelisation) * runtime
+
+    print()
+    print("** Admission benchmark **")
+    print("=========================")
+    print(f"Actions: {num_actions}, parallelisation: {parallelisation}, "
+          f"runtime: {runtime}s, admission: {admission}, poll mode: {poll_mode}")
+    print(f"Successful: {sum(1 for res in results if res['success'])}")
+    print(f"Makespan: {makespan:.3f}s (ideal {ideal_makespan:.3f}s)")
+    if gaps:
+        print(f"Dispatch gap mean: {statistics.mean(gaps) * 1000:.1f}ms, "
+              f"p50: {percentile(gaps, 0.5) * 1000:.1f}ms, "
+              f"p99: {percentile(gaps, 0.99) * 1000:.1f}ms, "
+              f"max: {max(gaps) * 1000:.1f}ms")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='Measures dispatch gap and makespan of BaseOrchestrator against a fake openwhisk.')
+    parser.add_argument('--actions', type=int, default=1000)
+    parser.add_argument('--parallelisation', type=int, default=50)
+    parser.add_argument('--runtime', type=float, default=0.05)
+    parser.add_argument('--poll-mode', default='list', choices=['list', 'id'])
+    parser.add_argument('--admission', default='semaphore', choices=['semaphore', 'busy-wait'],
+                        help='busy-wait runs the admission loop of the orchestrator before the semaphore, as a baseline')
+    parser.add_argument('--log', default=os.path.join(tempfile.gettempdir(), 'admission_benchmark.log'),
+                        help='file the orchestrator logs to')
+    args = parser.parse_args()
+
+    asyncio.run(run(args.actions, args.parallelisation,
+                args.runtime, args.poll_mode, args.log, args.admission))
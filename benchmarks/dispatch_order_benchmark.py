@@ -0,0 +1,193 @@
+import argparse
+import heapq
+import json
+import statistics
+
+from collections import defaultdict
+
+from constants import MONGO_HOST, MONGO_PORT
+from DispatchOrder import DISPATCH_ORDERS, get_dispatch_order, get_downstream_lengths
+from object_store.store import get_mongo_client
+from OrchestrationDAG import OrchestrationDAG
+
+
+def simulate_makespan(runtimes, prerequisites, order, parallelisation):
+    """
+    Simulates list scheduling of recorded actions: whenever a slot is free, the first action in order whose prerequisites
+    have completed is started. Dispatch and polling overheads are left out, so only the order makes a difference.
+
+    Parameters
+    ----------
+    runtimes : float[]
+        recorded runtime of every action
+    prerequisites : set[int][]
+        indexes of the actions each action has to wait for
+    order : int[]
+        indexes of the actions in the order of dispatch
+    parallelisation: int
+        The maximum concurrency that is allowed
+
+    Returns
+    -------
+    float
+        seconds from the first dispatch to the last completion.
+
+    """
+    rank = {index: position for position, index in enumerate(order)}
+    waiting_on = [len(prerequisites[i]) for i in range(len(runtimes))]
+    dependents = defaultdict(list)
+    for i, prerequisite_ids in enumerate(prerequisites):
+        for prerequisite in prerequisite_ids:
+            dependents[prerequisite].append(i)
+
+    ready = [(rank[i], i) for i in range(len(runtimes)) if not waiting_on[i]]
+    heapq.heapify(ready)
+    # (end time, index) of the running actions
+    running = []
+    now = 0
+    while ready or running:
+        while ready and len(running) < parallelisation:
+            _, i = heapq.heappop(ready)
+            heapq.heappush(running, (now + runtimes[i], i))
+        now, done = heapq.heappop(running)
+        for dependent in dependents[done]:
+            waiting_on[dependent] -= 1
+            if not waiting_on[dependent]:
+                heapq.heappush(ready, (rank[dependent], dependent))
+
+    return now
+
+
+def get_attempt_runtime(info, orch_id):
+    """
+    Runtime of the attempt which gave the final result of an action in an orchestration, None if it has no such attempt.
+    """
+    attempts = [attempt for attempt in info.get('attempts', []) if attempt['orch_id'] == orch_id
+                and not attempt.get('timed_out', False) and not attempt.get('ignored', False)]
+    if not attempts:
+        return None
+    return attempts[-1]['time']
+
+
+def load_runs(db, orch_name, num_runs):
+    """
+    Loads the actions, runtimes and object lineage of the last completed runs of an orchestration.
+
+    Returns
+    -------
+    dict[]
+        one dict per run with the actions (in the order they were created), their runtimes and their prerequisites.
+
+    """
+    runs = []
+    for orch in db['orchestrations'].find({'name': orch_name, 'finish_ts': {'$exists': True}},
+                                          sort=[('finish_ts', -1)], limit=num_runs):
+        actions = []
+        for info in db['actions'].find({'orch_id': orch['_id']}, sort=[('creation_ts', 1)]):
+            runtime = get_attempt_runtime(info, orch['_id'])
+            if runtime is not None:
+                actions.append({'action_id': str(info['_id']), 'name': info['action_name'],
+                                'params': json.dumps(info['action_params'], sort_keys=True, default=str), 'runtime': runtime})
+        if not actions:
+            continue
+
+        dag = OrchestrationDAG()
+        dag.construct_dag(orch['_id'])
+        indexes = {action['action_id']: i for i, action in enumerate(actions)}
+        prerequisites = []
+        for action in actions:
+            node = dag.memograph.get(action['action_id'], None)
+            prerequisites.append({indexes[prerequisite] for prerequisite in (node.children if node else [])
+                                  if prerequisite in indexes and prerequisite != action['action_id']})
+        runs.append({'orch_id': orch['_id'], 'actions': actions,
+                    'prerequisites': prerequisites})
+
+    return runs
+
+
+def get_priorities(run, other_runs, dispatch_order):
+    """
+    Priorities the orchestrator would compute for a run, from the runtimes recorded in the other runs only:
+    the mean runtime of the actions with the same parameters, or of the same name, plus for 'critical_path'
+    the work that follows the action name in the lineage of the run.
+    """
+    params_runtimes = defaultdict(list)
+    name_runtimes = defaultdict(list)
+    for other in other_runs:
+        for action in other['actions']:
+            params_runtimes[(action['name'], action['params'])].append(action['runtime'])
+            name_runtimes[action['name']].append(action['runtime'])
+
+    def _predict(name, params=None):
+        times = params_runtimes.get((name, params), None) or name_runtimes.get(name, None)
+        return statistics.mean(times) if times else None
+
+    downstream_lengths = {}
+    if dispatch_order == 'critical_path':
+        dependents = defaultdict(set)
+        for i, prerequisite_ids in enumerate(run['prerequisites']):
+            for prerequisite in prerequisite_ids:
+                dependents[run['actions'][prerequisite]['name']].add(run['actions'][i]['name'])
+        names = {action['name'] for action in run['actions']}
+        downstream_lengths = get_downstream_lengths(
+            {name: _predict(name) for name in names}, dependents)
+
+    priorities = []
+    for action in run['actions']:
+        runtime = _predict(action['name'], action['params'])
+        downstream_length = downstream_lengths.get(action['name'], None)
+        if runtime is None and downstream_length is None:
+            priorities.append(None)
+        else:
+            priorities.append((runtime or 0) + (downstream_length or 0))
+
+    return priorities
+
+
+def run(orch_names, num_runs, parallelisations):
+    db = get_mongo_client(
+        {'MONGO_HOST': MONGO_HOST, 'MONGO_PORT': MONGO_PORT})['openwhisk']
+
+    print()
+    print("** Dispatch order benchmark **")
+    print("==============================")
+    for orch_name in orch_names:
+        runs = load_runs(db, orch_name, num_runs)
+        print(f"Orchestration: {orch_name}, recorded runs: {len(runs)}")
+        if not runs:
+            continue
+
+        for parallelisation in parallelisations:
+            makespans = {dispatch_order: [] for dispatch_order in DISPATCH_ORDERS}
+            for run_index, recorded in enumerate(runs):
+                other_runs = runs[:run_index] + runs[run_index + 1:]
+                runtimes = [action['runtime'] for action in recorded['actions']]
+                for dispatch_order in DISPATCH_ORDERS:
+                    if dispatch_order == 'fifo':
+                        order = list(range(len(runtimes)))
+                    else:
+                        order = get_dispatch_order(get_priorities(
+                            recorded, other_runs, dispatch_order))
+                    makespans[dispatch_order].append(simulate_makespan(
+                        runtimes, recorded['prerequisites'], order, parallelisation))
+
+            fifo_makespan = statistics.mean(makespans['fifo'])
+            summary = []
+            for dispatch_order in DISPATCH_ORDERS:
+                makespan = statistics.mean(makespans[dispatch_order])
+                change = (makespan - fifo_makespan) / fifo_makespan * 100 if fifo_makespan else 0
+                summary.append(f"{dispatch_order}: {makespan:.3f}s ({change:+.1f}%)")
+            print(f"  parallelisation {parallelisation}: " + ", ".join(summary))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='Compares the makespan of the dispatch orders by simulating recorded orchestrations.')
+    parser.add_argument('--orchestrations', nargs='+',
+                        default=['video-transcoding', 'chatbot'])
+    parser.add_argument('--runs', type=int, default=10)
+    parser.add_argument('--parallelisation', type=int,
+                        nargs='+', default=[1, 2, 4])
+    args = parser.parse_args()
+
+    run(args.orchestrations, args.runs, args.parallelisation)
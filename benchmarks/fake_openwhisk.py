@@ -0,0 +1,293 @@
+import argparse
+import asyncio
+import heapq
+import math
+import random
+import time
+import uuid
+
+from aiohttp import web
+
+
+# distributions of the runtime of the fake activations, runtime being their mean
+RUNTIME_DISTRIBUTIONS = ('constant', 'uniform', 'exponential', 'lognormal')
+
+
+class FakeOpenwhisk:
+    """
+    A stand-in for the openwhisk controller which implements the apis used by BaseOrchestrator.
+    Every activation just sleeps for its runtime and returns its parameters back. The runtime is drawn from a distribution,
+    and failures, NoSuchKey errors, cold starts, queueing and 429 rejections can be injected to see how the orchestrator copes with them.
+    """
+
+    def __init__(self, runtime=0.05, distribution='constant', spread=0.5, failure_rate=0, no_such_key_rate=0, cold_start=0,
+                 keep_warm=60, max_concurrent=None, rate=None, queue=False, seed=None) -> None:
+        """
+        Parameters
+        ----------
+        runtime : float
+            mean runtime of an activation in seconds. A 'runtime' parameter in the body of an invocation overrides it.
+        distribution : str
+            distribution of the runtimes, one of RUNTIME_DISTRIBUTIONS.
+        spread : float
+            relative spread of the runtimes: the half width of 'uniform' and the sigma of 'lognormal', as a fraction of runtime.
+        failure_rate : float
+            fraction of the activations which fail with an application error.
+        no_such_key_rate : float
+            fraction of the activations which fail with a NoSuchKey error for the object in their 'input' parameter.
+        cold_start : float
+            seconds added to an activation which finds no warm container for its action.
+        keep_warm : float
+            seconds for which a container stays warm after its activation ends.
+        max_concurrent : int
+            activations allowed in flight, invocations over it are rejected with 429. None for no limit.
+        rate : int
+            invocations allowed per second, invocations over it are rejected with 429. None for no limit.
+        queue : bool
+            accepts the invocations over max_concurrent and starts each of them once an activation in flight ends, as the
+            invokers of openwhisk queue activations. The time spent queued is reported as the waitTime of the activation.
+        seed : int
+            seed of the random draws, for repeatable runs.
+
+        Returns
+        -------
+        None
+
+        """
+        if distribution not in RUNTIME_DISTRIBUTIONS:
+            raise Exception('Unknown runtime distribution: {}'.format(distribution))
+        self.runtime = runtime
+        self.distribution = distribution
+        self.spread = spread
+        self.failure_rate = failure_rate
+        self.no_such_key_rate = no_such_key_rate
+        self.cold_start = cold_start
+        self.keep_warm = keep_warm
+        self.max_concurrent = max_concurrent
+        self.rate = rate
+        self.queue = queue
+        self.random = random.Random(seed)
+        self.activations = {}
+        # arrival time of every invocation, used for measuring dispatch gaps
+        self.invocation_times = []
+        # action name -> times at which its idle containers were freed
+        self.warm_containers = {}
+        # arrival times of the invocations of the last second, for the rate limit
+        self.recent_invocations = []
+        # end times of the activations in flight and queued, for the concurrency limit
+        self.running = []
+        self.num_throttled = 0
+        self.num_cold_starts = 0
+        self.num_failures = 0
+        self.runner = None
+
+    def __record(self, activation):
+        """
+        Returns the activation record in the same shape openwhisk returns it.
+        """
+        success = 'error' not in activation['result']
+        return {
+            'activationId': activation['activationId'],
+            'name': activation['name'],
+            'start': int(activation['start'] * 1000),
+            'end': int(activation['end'] * 1000),
+            'duration': int((activation['end'] - activation['start']) * 1000),
+            'response': {
+                'result': activation['result'],
+                'status': 'success' if success else 'application error',
+                'success': success
+            },
+            'annotations': [{'key': 'waitTime', 'value': int(activation['wait_time'] * 1000)},
+                            {'key': 'initTime', 'value': int(activation['init_time'] * 1000)}]
+        }
+
+    def __completed(self):
+        now = time.time()
+        return [activation for activation in self.activations.values() if activation['end'] <= now]
+
+    def __draw_runtime(self, mean):
+        if self.distribution == 'uniform':
+            return max(self.random.uniform(mean * (1 - self.spread), mean * (1 + self.spread)), 0)
+        if self.distribution == 'exponential':
+            return self.random.expovariate(1 / mean) if mean > 0 else 0
+        if self.distribution == 'lognormal':
+            # mu is chosen so that the mean of the distribution stays at mean
+            sigma = self.spread
+            return self.random.lognormvariate(0, sigma) * mean / math.exp(sigma * sigma / 2)
+        return mean
+
+    def __draw_result(self, body, activation_id):
+        draw = self.random.random()
+        if draw < self.failure_rate:
+            self.num_failures += 1
+            return {'error': {'code': None, 'message': 'Injected failure of {}'.format(activation_id), 'meta': None}}
+        if draw < self.failure_rate + self.no_such_key_rate:
+            self.num_failures += 1
+            key = body.get('input', 'benchmark/{}'.format(activation_id))
+            return {'error': {'code': 'NoSuchKey', 'message': 'The specified key does not exist.', 'meta': {'key': key}}}
+        return body
+
+    def __get_throttle_error(self, now):
+        """
+        Returns the error openwhisk would reject an invocation with because of its limits, None if it is accepted.
+        """
+        self.recent_invocations = [
+            arrival for arrival in self.recent_invocations if now - arrival < 1]
+        while self.running and self.running[0] <= now:
+            heapq.heappop(self.running)
+        if self.rate is not None and len(self.recent_invocations) >= self.rate:
+            return 'Too many requests in the last second (count: {}, allowed: {}).'.format(
+                len(self.recent_invocations), self.rate)
+        if self.max_concurrent is not None and len(self.running) >= self.max_concurrent and not self.queue:
+            return 'Too many concurrent requests in flight (count: {}, allowed: {}).'.format(
+                len(self.running), self.max_concurrent)
+        return None
+
+    def __take_container(self, name, now):
+        """
+        Takes a warm container of the action if there is one, and returns the seconds spent initialising the activation.
+        """
+        containers = self.warm_containers.setdefault(name, [])
+        containers[:] = [freed_at for freed_at in containers if now - freed_at < self.keep_warm]
+        for i, freed_at in enumerate(containers):
+            if freed_at <= now:
+                containers.pop(i)
+                return 0
+        self.num_cold_starts += 1
+        return self.cold_start
+
+    async def invoke(self, request):
+        body = await request.json()
+        now = time.time()
+        throttle_error = self.__get_throttle_error(now)
+        if throttle_error is not None:
+            self.num_throttled += 1
+            return web.json_response({'error': throttle_error}, status=429)
+        if self.rate is not None:
+            self.recent_invocations.append(now)
+        self.invocation_times.append(now)
+        start = now
+        if self.max_concurrent is not None and len(self.running) >= self.max_concurrent:
+            # only reached when queueing: the activation takes the slot of the first one in flight to end
+            start = heapq.heappop(self.running)
+        name = request.match_info['name']
+        activation_id = uuid.uuid4().hex
+        init_time = self.__take_container(name, start)
+        end = start + init_time + \
+            self.__draw_runtime(float(body.get('runtime', self.runtime)))
+        self.activations[activation_id] = {
+            'activationId': activation_id,
+            'name': name,
+            'start': start,
+            'end': end,
+            'wait_time': start - now,
+            'init_time': init_time,
+            'result': self.__draw_result(body, activation_id),
+        }
+        # the container is free for the next activation of the action once this one ends
+        self.warm_containers[name].append(end)
+        heapq.heappush(self.running, end)
+        return web.json_response({'activationId': activation_id})
+
+    async def get_activation(self, request):
+        activation = self.activations.get(request.match_info['activation_id'])
+        if activation is None or activation['end'] > time.time():
+            # openwhisk does not know about an activation until it has completed
+            return web.json_response({'error': 'The requested resource does not exist.'}, status=404)
+        return web.json_response(self.__record(activation))
+
+    async def list_activations(self, request):
+        since = int(request.query.get('since', 0)) / 1000
+        limit = int(request.query.get('limit', 30))
+        skip = int(request.query.get('skip', 0))
+        completed = sorted([activation for activation in self.__completed() if activation['start'] >= since],
+                           key=lambda activation: activation['start'], reverse=True)
+        return web.json_response([self.__record(activation) for activation in completed[skip:skip + limit]])
+
+    def end_times(self):
+        """
+        Returns the end time of every activation in increasing order.
+        """
+        return sorted(activation['end'] for activation in self.activations.values())
+
+    def stats(self):
+        """
+        Returns the counters of the fake along with the invocation and end times, for the benchmarks.
+        """
+        return {
+            'invocation_times': sorted(self.invocation_times),
+            'end_times': self.end_times(),
+            'num_throttled': self.num_throttled,
+            'num_cold_starts': self.num_cold_starts,
+            'num_failures': self.num_failures,
+        }
+
+    async def start(self, host='127.0.0.1', port=31002):
+        """
+        Starts serving the fake api, returns the url to be passed to BaseOrchestrator.
+        """
+        app = web.Application()
+        app.router.add_post(
+            '/api/v1/namespaces/guest/actions/{name}', self.invoke)
+        app.router.add_get(
+            '/api/v1/namespaces/guest/activations', self.list_activations)
+        app.router.add_get(
+            '/api/v1/namespaces/guest/activations/{activation_id}', self.get_activation)
+        self.runner = web.AppRunner(app)
+        await self.runner.setup()
+        await web.TCPSite(self.runner, host, port).start()
+        return f"http://{host}:{port}/api/v1/namespaces"
+
+    async def stop(self):
+        if self.runner is not None:
+            await self.runner.cleanup()
+
+
+def serve(connection, host='127.0.0.1', port=31002, **options):
+    """
+    Runs a FakeOpenwhisk in its own process, so that it does not take cpu from the orchestrator being measured.
+    The url is sent on connection once the fake is serving, and its stats are sent back once anything is received.
+    Use it as the target of a multiprocessing.Process.
+    """
+    async def _serve():
+        fake = FakeOpenwhisk(**options)
+        connection.send(await fake.start(host, port))
+        await asyncio.to_thread(connection.recv)
+        connection.send(fake.stats())
+        await fake.stop()
+
+    asyncio.run(_serve())
+
+
+async def main(args):
+    fake = FakeOpenwhisk(args.runtime, args.distribution, args.spread, args.failure_rate, args.no_such_key_rate,
+                         args.cold_start, args.keep_warm, args.max_concurrent, args.rate, args.queue, args.seed)
+    url = await fake.start(args.host, args.port)
+    print(f"Fake openwhisk serving at {url}")
+    await asyncio.Event().wait()
+
+
+def add_arguments(parser):
+    parser.add_argument('--runtime', type=float, default=0.05)
+    parser.add_argument('--distribution', default='constant',
+                        choices=RUNTIME_DISTRIBUTIONS)
+    parser.add_argument('--spread', type=float, default=0.5)
+    parser.add_argument('--failure-rate', type=float, default=0)
+    parser.add_argument('--no-such-key-rate', type=float, default=0)
+    parser.add_argument('--cold-start', type=float, default=0)
+    parser.add_argument('--keep-warm', type=float, default=60)
+    parser.add_argument('--max-concurrent', type=int, default=None)
+    parser.add_argument('--rate', type=int, default=None)
+    parser.add_argument('--queue', action='store_true',
+                        help='queue the invocations over --max-concurrent instead of rejecting them')
+    parser.add_argument('--seed', type=int, default=None)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='Serves a fake openwhisk controller for running orchestrators without a cluster.')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=31002)
+    add_arguments(parser)
+
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,115 @@
+import argparse
+import asyncio
+import multiprocessing
+import os
+import statistics
+import tempfile
+import time
+
+from BaseOrchestrator import BaseOrchestrator
+from benchmarks.admission_benchmark import percentile
+from benchmarks.fake_openwhisk import add_arguments, serve
+from constants import MONGO_HOST, MONGO_PORT
+from object_store.store import get_mongo_client
+
+
+auth = ("guest", "guest")
+
+
+def get_mongo_writes():
+    """
+    Returns the number of documents inserted, updated and deleted by the mongo server so far, None if it can not tell.
+    """
+    try:
+        status = get_mongo_client({'MONGO_HOST': MONGO_HOST, 'MONGO_PORT': MONGO_PORT}).admin.command(
+            'serverStatus')
+    except Exception:
+        return None
+    counters = status['opcounters']
+    return counters['insert'] + counters['update'] + counters['delete']
+
+
+async def run_fan_out(num_actions, parallelisation, retries, poll_mode, fake_options, log_file):
+    """
+    Runs one batch of num_actions actions against a fake openwhisk running in its own process, and prints the
+    dispatch rate, poll lag, orchestrator cpu per action and mongo writes per action.
+    """
+    # the fake is spawned rather than forked, as a fork would copy the running event loop
+    context = multiprocessing.get_context('spawn')
+    connection, fake_connection = context.Pipe()
+    fake = context.Process(target=serve, args=(
+        fake_connection,), kwargs=fake_options)
+    fake.start()
+    url = await asyncio.to_thread(connection.recv)
+
+    orch = BaseOrchestrator(auth, url=url, poll_mode=poll_mode, log_file=log_file)
+    orch.start('load-benchmark')
+    actions = [orch.prepare_action('benchmark', {'index': i})
+               for i in range(num_actions)]
+
+    writes_before = get_mongo_writes()
+    cpu_start = time.process_time()
+    start = time.time()
+    results = await orch.make_action(actions, retries=retries, parallelisation=parallelisation)
+    makespan = time.time() - start
+    # closing flushes the instrumentation, which is part of the cost of every action
+    await orch.close()
+    cpu = time.process_time() - cpu_start
+    writes_after = get_mongo_writes()
+
+    connection.send('stop')
+    stats = await asyncio.to_thread(connection.recv)
+    fake.join()
+
+    poll_lags = [attempt['poll_lag'] for info in orch.db_collection.find({'orch_id': orch.orch_id}, {'attempts': 1})
+                 for attempt in info.get('attempts', []) if attempt.get('poll_lag', None) is not None]
+    invocation_times = stats['invocation_times']
+
+    print()
+    print(f"Fan-out: {num_actions}, parallelisation: {parallelisation}, poll mode: {poll_mode}")
+    print(f"Successful: {sum(1 for res in results if res['success'])}, invocations: {len(invocation_times)}, "
+          f"throttled: {stats['num_throttled']}, cold starts: {stats['num_cold_starts']}, "
+          f"injected failures: {stats['num_failures']}")
+    print(f"Makespan: {makespan:.3f}s")
+    if len(invocation_times) > 1 and invocation_times[-1] > invocation_times[0]:
+        print(f"Dispatch rate: {(len(invocation_times) - 1) / (invocation_times[-1] - invocation_times[0]):.1f} invocations/s")
+    if poll_lags:
+        print(f"Poll lag mean: {statistics.mean(poll_lags) * 1000:.1f}ms, "
+              f"p50: {percentile(poll_lags, 0.5) * 1000:.1f}ms, "
+              f"p99: {percentile(poll_lags, 0.99) * 1000:.1f}ms")
+    print(f"CPU per action: {cpu / num_actions * 1000:.3f}ms")
+    if writes_before is not None and writes_after is not None:
+        print(f"Mongo writes per action: {(writes_after - writes_before) / num_actions:.2f}")
+    else:
+        print("Mongo writes per action: not available, serverStatus could not be read")
+
+
+async def run(fan_outs, parallelisation, retries, poll_mode, fake_options, log_file):
+    print()
+    print("** Load benchmark **")
+    print("====================")
+    print(f"Fake openwhisk: {fake_options}")
+    for num_actions in fan_outs:
+        await run_fan_out(num_actions, parallelisation, retries, poll_mode, fake_options, log_file)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='Measures the dispatch rate, poll lag, cpu and mongo writes of BaseOrchestrator against a fake openwhisk.')
+    parser.add_argument('--fan-outs', type=int, nargs='+',
+                        default=[10, 1000, 10000])
+    parser.add_argument('--parallelisation', type=int, default=100)
+    parser.add_argument('--retries', type=int, default=1)
+    parser.add_argument('--poll-mode', default='list', choices=['list', 'id'])
+    parser.add_argument('--port', type=int, default=31002)
+    parser.add_argument('--log', default=os.path.join(tempfile.gettempdir(), 'load_benchmark.log'),
+                        help='file the orchestrator logs to')
+    add_arguments(parser)
+    args = parser.parse_args()
+
+    fake_options = {'port': args.port, 'runtime': args.runtime, 'distribution': args.distribution, 'spread': args.spread,
+                    'failure_rate': args.failure_rate, 'no_such_key_rate': args.no_such_key_rate,
+                    'cold_start': args.cold_start, 'keep_warm': args.keep_warm, 'max_concurrent': args.max_concurrent,
+                    'rate': args.rate, 'queue': args.queue, 'seed': args.seed}
+    asyncio.run(run(args.fan_outs, args.parallelisation,
+                args.retries, args.poll_mode, fake_options, args.log))
@@ -1,13 +1,26 @@
 import asyncio
+import os
 from BaseOrchestrator import BaseOrchestrator
+from LocalExecutor import LocalExecutor
+from Workflow import Workflow
+from constants import MINIO_ENDPOINT, AWS_ACCESS_KEY_ID, AWS_SECRET_ACCESS_KEY
 
 auth = ("23bc46b1-71f6-4ed5-8c54-816aa4f8c502",
         "123zO3xZCLrMN6v2BKK1dXYFpXlPkccOFqm12CdAsMgRU4VrNZ9lyGVCGuMDGIwP")
-orch = BaseOrchestrator(auth)
+# with LOCAL_EXECUTOR set, the actions run in local worker processes instead of openwhisk
+LOCAL_ACTIONS = {
+    'split-action': 'chatbot/split-action.py',
+    'train-classifier': 'chatbot/train-intent-classifier.py',
+}
+# the object store of the actions, the orchestrator checks the objects of memoized actions in it
+config = dict(STORAGE_ENDPOINT=MINIO_ENDPOINT,
+              AWS_ACCESS_KEY_ID=AWS_ACCESS_KEY_ID,
+              AWS_SECRET_ACCESS_KEY=AWS_SECRET_ACCESS_KEY)
+orch = BaseOrchestrator(auth, storage_config=config, executor=LocalExecutor(
+    LOCAL_ACTIONS) if os.environ.get('LOCAL_EXECUTOR') else None)
 
 
 async def main():
-    print("** Split Action **")
     params = {
         "skew": 4,
         "bundle_size": 1,
@@ -16,38 +29,23 @@ async def main():
 
     orch.start('chatbot')
 
-    split_action = orch.prepare_action('split-action', params)
-    split_results = (await orch.make_action([split_action]))[0]
-    if not split_results['success']:
-        raise Exception('Error splitting in chunks')
+    # a classifier action is made for every bundle of intents returned by the split action
+    workflow = Workflow(orch, concurrency=3)
+    workflow.action('split', 'split-action', params)
+    workflow.fan_out('classify', 'train-classifier', parent='split',
+                     items=lambda results: results['split']['results']['detail']['indeces'],
+                     params=lambda chunk, results: chunk)
 
-    split_results = (split_results['result']['results']['detail']['indeces'])
+    print("** Running Split and Classifier Actions **")
+    results = await workflow.run()
 
-    print("** Classifier Action **")
-
-    classifying_actions = []
-    for i, chunk in enumerate(split_results):
-        params = chunk
-        # if i % 2 == 0:
-        #     params["type"] = "transcodes"
-        classifying_actions.append(
-            orch.prepare_action('train-classifier', params))
-
-    results = await orch.make_action(classifying_actions, parallelisation=3)
-    for res in results:
-        if not res['success']:
-            raise Exception('Error in classification')
-
-    print(res)
+    print(results['classify'][-1])
     print("** Done **")
-    # print("Output available at: {}".format(
-    #     combine_results['result']['output_file']))
 
     orch.stop()
+    await orch.close()
 
 
 if __name__ == "__main__":
     asyncio.run(main())
     # poller(['22b0335cebae4d4fb0335cebaefd4fff'])
-
-# had to remove svd part
@@ -1,3 +1,4 @@
+import io
 import json
 import numpy as np
 import time
@@ -16,16 +17,14 @@ store = store.ObjectStore(config, [bucket_name],
 
 
 def upload_matrix(context, A, filename):
-    np.savetxt("chatbdat/" + filename, A)
-    store.put_sync(context, bucket_name, filename)
+    buffer = io.BytesIO()
+    np.savetxt(buffer, A)
+    store.put_bytes(context, bucket_name, filename, buffer.getvalue())
 
 
 def upload_BOW(context, BOW):
-    with open('chatbdat/bos.txt', 'w') as f:
-        for word in BOW:
-            f.write(word + '\n')
-    f.close()
-    store.put_sync(context, bucket_name, 'bos.txt')
+    store.put_bytes(context, bucket_name, 'bos.txt',
+                    ''.join(word + '\n' for word in BOW))
 
 
 def handler(filename, event):
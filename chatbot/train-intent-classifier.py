@@ -1,3 +1,4 @@
+import io
 import json
 # from scipy.linalg import svd
 import numpy as np
@@ -13,23 +14,20 @@ config = dict(STORAGE_ENDPOINT=MINIO_ENDPOINT,
 bucket_name = "chatbdat"
 store = store.ObjectStore(config, [bucket_name],
                           db_config={'MONGO_HOST': MONGO_HOST,
-                                     'MONGO_PORT': MONGO_PORT}
+                                     'MONGO_PORT': MONGO_PORT},
+                          # the bag of words is read by every activation
+                          cache_size=64 * 1024 * 1024
                           )
 
 
 def download_matrix(context, intent_name):
-    filename = f"{bucket_name}/{intent_name}"
-    store.get_sync(context, bucket_name, intent_name)
-    return np.loadtxt(filename)
+    return np.loadtxt(io.BytesIO(store.get_bytes(context, bucket_name, intent_name)))
 
 
 def load_bow(context):
     filename = "bos.txt"
-    file_path = f"{bucket_name}/{filename}"
-    store.get_sync(context, bucket_name, filename)
-    BOW = []
-    with open(file_path, 'r') as f:
-        BOW = f.readlines()
+    BOW = store.get_bytes(context, bucket_name,
+                          filename).decode().splitlines(keepends=True)
     # print("Bag of words:")
     # print(BOW)
     return BOW
@@ -219,8 +217,9 @@ def predict(X, params):
 
 
 def upload_matrix(context, A, filename):
-    np.savetxt("chatbdat/" + filename, A)
-    store.put_sync(context, bucket_name, filename)
+    buffer = io.BytesIO()
+    np.savetxt(buffer, A)
+    store.put_bytes(context, bucket_name, filename, buffer.getvalue())
 
 
 # def get_svd(A, intent_name):
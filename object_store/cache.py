@@ -0,0 +1,176 @@
+import contextlib
+import hashlib
+import os
+import shutil
+import threading
+import uuid
+
+try:
+    import fcntl
+except ImportError:
+    # without file locks the cache is only safe for the threads of a single process
+    fcntl = None
+
+
+# suffix of the copies kept in the cache directory, only files with it are ever removed from it
+CACHED_SUFFIX = '.cached'
+
+
+class ObjectCache:
+    """
+    Copies of the objects downloaded by an ObjectStore, kept on the local disk of a warm container so that an object that
+    has not changed since an earlier activation is not downloaded again. The least recently used copies are evicted once
+    the copies take more than max_bytes.
+
+    A copy is named after the object and its etag, so it is only ever found for the version it was downloaded as, and the
+    directory can be shared by processes, e.g. the workers of a LocalExecutor: a copy is complete before it gets its name,
+    and eviction holds a file lock on the directory.
+
+    Copies are separate files, made read-only, and the files got through the cache are copied from them, so an action
+    can modify the files it gets without changing the cached copies.
+    """
+
+    def __init__(self, cache_dir, max_bytes) -> None:
+        """
+        Parameters
+        ----------
+        cache_dir : str
+            directory the copies are kept in.
+        max_bytes : int
+            total size of the copies kept.
+
+        Returns
+        -------
+        None
+
+        """
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.lock_path = os.path.join(cache_dir, '.lock')
+        self.lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+
+    @contextlib.contextmanager
+    def __locked(self):
+        with self.lock, open(self.lock_path, 'a') as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def __get_key(self, bucket, file_name):
+        return hashlib.sha1(f"{bucket}/{file_name}".encode()).hexdigest()
+
+    def __get_path(self, bucket, file_name, etag):
+        version = hashlib.sha1(str(etag).encode()).hexdigest()
+        return os.path.join(self.cache_dir, f"{self.__get_key(bucket, file_name)}-{version}{CACHED_SUFFIX}")
+
+    def __get_temp_path(self):
+        return os.path.join(self.cache_dir, f".{uuid.uuid4().hex}.tmp")
+
+    def __lookup(self, bucket, file_name, etag):
+        """
+        Returns the path of the copy of the object with the given etag, marked as the most recently used, None if
+        there is none.
+        """
+        path = self.__get_path(bucket, file_name, etag)
+        try:
+            os.utime(path)
+        except OSError:
+            return None
+        return path
+
+    def copy_to(self, bucket, file_name, etag, object_path):
+        """
+        Copies the cached object into object_path if there is a copy with the given etag.
+
+        Returns
+        -------
+        bool
+            whether the object was found in the cache.
+
+        """
+        path = self.__lookup(bucket, file_name, etag)
+        if path is None:
+            return False
+        temp_path = f"{object_path}.{uuid.uuid4().hex}"
+        try:
+            shutil.copyfile(path, temp_path)
+        except OSError:
+            # evicted in the meantime
+            self.__remove(temp_path)
+            return False
+        os.replace(temp_path, object_path)
+        return True
+
+    def read(self, bucket, file_name, etag):
+        """
+        Returns the content of the cached object if there is a copy with the given etag, None otherwise.
+        """
+        path = self.__lookup(bucket, file_name, etag)
+        if path is None:
+            return None
+        try:
+            with open(path, 'rb') as cached_file:
+                return cached_file.read()
+        except OSError:
+            return None
+
+    def add_file(self, bucket, file_name, etag, source_path):
+        """
+        Keeps a copy of the downloaded file at source_path as the copy of the object with the given etag, source_path
+        itself is left as it is.
+        """
+        if os.path.getsize(source_path) > self.max_bytes:
+            return
+        temp_path = self.__get_temp_path()
+        shutil.copyfile(source_path, temp_path)
+        self.__add(bucket, file_name, etag, temp_path)
+
+    def add_bytes(self, bucket, file_name, etag, data):
+        """
+        Keeps the downloaded data as the copy of the object with the given etag.
+        """
+        if len(data) > self.max_bytes:
+            return
+        temp_path = self.__get_temp_path()
+        with open(temp_path, 'wb') as temp_file:
+            temp_file.write(data)
+        self.__add(bucket, file_name, etag, temp_path)
+
+    def __add(self, bucket, file_name, etag, temp_path):
+        # temp_path is a file of the cache only, making it read-only does not affect the files of the action
+        os.chmod(temp_path, 0o444)
+        path = self.__get_path(bucket, file_name, etag)
+        key = self.__get_key(bucket, file_name)
+        with self.__locked():
+            os.replace(temp_path, path)
+            copies = []
+            for name in os.listdir(self.cache_dir):
+                if not name.endswith(CACHED_SUFFIX):
+                    continue
+                copy_path = os.path.join(self.cache_dir, name)
+                # the copies of the earlier versions of the object are not used anymore
+                if name.startswith(key) and copy_path != path:
+                    self.__remove(copy_path)
+                    continue
+                try:
+                    stat = os.stat(copy_path)
+                except OSError:
+                    continue
+                copies.append((stat.st_mtime, stat.st_size, copy_path))
+            size = sum(copy_size for _, copy_size, _ in copies)
+            for _, copy_size, copy_path in sorted(copies):
+                if size <= self.max_bytes:
+                    break
+                self.__remove(copy_path)
+                size -= copy_size
+
+    def __remove(self, path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
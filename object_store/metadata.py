@@ -0,0 +1,140 @@
+import asyncio
+
+from pymongo import collection
+
+from object_store.store import get_mongo_client
+
+try:
+    from motor.motor_asyncio import AsyncIOMotorClient
+except ImportError:
+    # motor is optional: without it, which is the default, the awaitable calls are made with the synchronous client in a worker thread
+    AsyncIOMotorClient = None
+
+
+# event loop -> motor client, as a motor client can only be used from the event loop it was first used in
+async_clients = {}
+
+
+def get_async_mongo_client(config):
+    """
+    Returns the motor client for the running event loop, None if motor is not installed.
+    """
+    if AsyncIOMotorClient is None:
+        return None
+
+    loop = asyncio.get_running_loop()
+    if loop not in async_clients:
+        for stale_loop in [stale for stale in async_clients if stale.is_closed()]:
+            async_clients.pop(stale_loop).close()
+        async_clients[loop] = AsyncIOMotorClient(
+            config.get('MONGO_HOST'), config.get('MONGO_PORT'))
+
+    return async_clients[loop]
+
+
+class MetadataCollection:
+    """
+    A collection of the document store which can be used both from synchronous code, through `sync`, and from coroutines,
+    through the awaitable methods which do not block the event loop.
+    """
+
+    def __init__(self, db_config, database, name) -> None:
+        self.db_config = db_config
+        self.database = database
+        self.name = name
+        self.sync: collection.Collection = get_mongo_client(db_config)[
+            database][name]
+
+    def __get_async_collection(self):
+        client = get_async_mongo_client(self.db_config)
+        if client is None:
+            return None
+        return client[self.database][self.name]
+
+    async def find(self, query, projection=None, sort=None, limit=0):
+        """
+        Parameters
+        ----------
+        sort : (str, int)[]
+            keys and directions to sort the documents by
+        limit : int
+            maximum number of documents, 0 for no limit.
+
+        Returns
+        -------
+        dict[]
+            all the documents matching the query
+        """
+        async_collection = self.__get_async_collection()
+        if async_collection is not None:
+            return await async_collection.find(query, projection, sort=sort, limit=limit).to_list(None)
+        return await asyncio.to_thread(lambda: list(self.sync.find(query, projection, sort=sort, limit=limit)))
+
+    async def find_one(self, query, projection=None):
+        async_collection = self.__get_async_collection()
+        if async_collection is not None:
+            return await async_collection.find_one(query, projection)
+        return await asyncio.to_thread(self.sync.find_one, query, projection)
+
+    async def insert_one(self, document):
+        async_collection = self.__get_async_collection()
+        if async_collection is not None:
+            return await async_collection.insert_one(document)
+        return await asyncio.to_thread(self.sync.insert_one, document)
+
+    async def insert_many(self, documents):
+        async_collection = self.__get_async_collection()
+        if async_collection is not None:
+            return await async_collection.insert_many(documents)
+        return await asyncio.to_thread(self.sync.insert_many, documents)
+
+    async def update_one(self, query, update, upsert=False):
+        async_collection = self.__get_async_collection()
+        if async_collection is not None:
+            return await async_collection.update_one(query, update, upsert=upsert)
+        return await asyncio.to_thread(self.sync.update_one, query, update, upsert=upsert)
+
+    async def bulk_write(self, operations, ordered=True):
+        async_collection = self.__get_async_collection()
+        if async_collection is not None:
+            return await async_collection.bulk_write(operations, ordered=ordered)
+        return await asyncio.to_thread(self.sync.bulk_write, operations, ordered=ordered)
+
+
+class MetadataStore:
+    """
+    Access layer for the metadata kept in the document store by the orchestrator and the object store.
+    Coroutines of the orchestrator await its collections, with motor when it is installed and otherwise with the synchronous
+    client in a worker thread, so that queries do not stall polling and dispatching. Code running inside actions keeps using
+    the synchronous client.
+    """
+
+    def __init__(self, db_config={}, database='openwhisk') -> None:
+        """
+        Parameters
+        ----------
+        db_config : dict
+            contains configuration details (MONGO_HOST, MONGO_PORT) for the document store.
+        database : str
+            name of the database
+
+        Returns
+        -------
+        None
+
+        """
+        self.db_config = db_config
+        self.database = database
+        self.collections = dict()
+
+    def collection(self, name) -> MetadataCollection:
+        if name not in self.collections:
+            self.collections[name] = MetadataCollection(
+                self.db_config, self.database, name)
+        return self.collections[name]
+
+    async def run(self, func, *args, **kwargs):
+        """
+        Runs a synchronous helper which makes several queries, like the metric helpers of ObjectStore, in a worker thread.
+        """
+        return await asyncio.to_thread(func, *args, **kwargs)
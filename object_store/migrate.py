@@ -0,0 +1,71 @@
+import argparse
+
+from bson import ObjectId
+
+from constants import MONGO_HOST, MONGO_PORT
+from object_store.store import EVENT_METHODS, create_event_indexes, get_mongo_client
+
+
+def migrate(db_config, keep_arrays=False, batch_size=100):
+    """
+    Moves the objects_get, objects_put and error_get entries of the action_store documents into object events.
+    It can be run again after being interrupted: the events migrated from a document are replaced until the
+    entries of the document have been removed, which is the last step for it.
+
+    Parameters
+    ----------
+    db_config : dict
+        contains configuration details for the document store.
+    keep_arrays : bool
+        leaves the entries in the action_store documents. Running it again then migrates them again.
+    batch_size : int
+        number of action_store documents read at a time.
+
+    Returns
+    -------
+    (int, int)
+        number of action_store documents migrated and of events written.
+
+    """
+    database = get_mongo_client(db_config)['openwhisk']
+    action_store = database['action_store']
+    events_collection = database['object_events']
+    create_event_indexes(events_collection)
+
+    num_actions = 0
+    num_events = 0
+    query = {'$or': [{field: {'$exists': True}} for field in EVENT_METHODS]}
+    for info in action_store.find(query, batch_size=batch_size):
+        action_id = info['_id']
+        events = [{**entry, 'action_id': action_id, 'method': method, 'migrated': True}
+                  for field, method in EVENT_METHODS.items() for entry in info.get(field, [])]
+        for event in events:
+            # older entries have the orchestration only in the context of the document
+            if 'orch_id' not in event and 'orch_id' in info:
+                event['orch_id'] = ObjectId(info['orch_id'])
+        # events left by an interrupted run
+        events_collection.delete_many({'action_id': action_id, 'migrated': True})
+        if events:
+            events_collection.insert_many(events, ordered=False)
+        if not keep_arrays:
+            # the context of the document was only used by the lookups of the entries
+            action_store.update_one({'_id': action_id}, {'$unset': {
+                **{field: '' for field in EVENT_METHODS}, 'action_id': '', 'orch_id': ''}})
+        num_actions += 1
+        num_events += len(events)
+
+    return num_actions, num_events
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='Migrates the objects recorded in the action_store documents to the object_events collection.')
+    parser.add_argument('--mongo-host', default=MONGO_HOST)
+    parser.add_argument('--mongo-port', type=int, default=MONGO_PORT)
+    parser.add_argument('--keep-arrays', action='store_true',
+                        help='leave the migrated entries in the action_store documents')
+    args = parser.parse_args()
+
+    num_actions, num_events = migrate(
+        {'MONGO_HOST': args.mongo_host, 'MONGO_PORT': args.mongo_port}, args.keep_arrays)
+    print(f"Migrated {num_events} object events of {num_actions} actions")
@@ -1,14 +1,34 @@
 from collections import defaultdict, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import io
+import json
 import os
+import threading
+import time
 from typing import Any
 import minio
+from minio.datatypes import Part
+import urllib3
 from pymongo import MongoClient, collection
 from bson import ObjectId
 
+from object_store.cache import ObjectCache
+
 from datetime import datetime
 
 client = None
 
+# minimum size of every part but the last of a multipart upload, set by S3
+MIN_PART_SIZE = 5 * 1024 * 1024
+# bytes read at a time from a download stream
+STREAM_CHUNK_SIZE = 1024 * 1024
+
+# method of the object events recorded for each of the fields the entries used to be pushed to
+EVENT_METHODS = {'objects_get': 'get', 'objects_put': 'put', 'error_get': 'error_get'}
+# collections whose event indexes were already created by this process
+indexed_collections = set()
+
 
 def get_mongo_client(config):
     global client
@@ -25,6 +45,25 @@ def get_mongo_client(config):
     return client
 
 
+def create_event_indexes(events_collection):
+    """
+    Creates the indexes of the object events used by the lookups of ObjectStore, once per process.
+    """
+    if events_collection.full_name in indexed_collections:
+        return
+    # the history of an object, in an orchestration or across them
+    events_collection.create_index(
+        [('object', 1), ('orch_id', 1), ('time', 1)])
+    # the writes, or reads, of an object across orchestrations in the order they happened
+    events_collection.create_index(
+        [('object', 1), ('method', 1), ('time', 1)])
+    # the objects used by an action
+    events_collection.create_index([('action_id', 1)])
+    # the objects used in an orchestration
+    events_collection.create_index([('orch_id', 1)])
+    indexed_collections.add(events_collection.full_name)
+
+
 class ObjectStore:
     """
     A simple class that is used connecting to the object store while also storing some metrics in MongoDB.
@@ -34,7 +73,8 @@ class ObjectStore:
     access_key = None
     secret_key = None
 
-    def __init__(self, config={}, buckets=[], db_config={}):
+    def __init__(self, config={}, buckets=[], db_config={}, max_workers=8, part_size=64 * 1024 * 1024, part_workers=4,
+                 cache_size=0, cache_dir='.object_cache'):
         """
         Initialises object store
 
@@ -45,6 +85,17 @@ class ObjectStore:
             The buckets that you want to create, if it does not already exists.
         db_config : str
             contains configuration details for the document store where metrics will be stored.
+        max_workers : int
+            number of objects transferred at a time by get_many and put_many, the connection pool is sized for it.
+        part_size : int
+            bytes per part of the objects larger than it, which are uploaded and downloaded in parts. At least 5MiB.
+        part_workers : int
+            number of parts transferred at a time, shared by every transfer of the store.
+        cache_size : int
+            bytes of downloaded objects kept in cache_dir for the later activations of a warm container, 0 disables the
+            cache. A cached object is only used while its etag is unchanged.
+        cache_dir : str
+            directory of the cache.
 
         Returns
         -------
@@ -54,18 +105,37 @@ class ObjectStore:
         self.endpoint = config.get("STORAGE_ENDPOINT")
         self.access_key = config.get("AWS_ACCESS_KEY_ID")
         self.secret_key = config.get("AWS_SECRET_ACCESS_KEY")
+        # one document per action, for the activations of the action that are ignored
         self.db_collection: collection.Collection = get_mongo_client(db_config)[
             'openwhisk']['action_store']
+        # one document per object read, written or not found
+        self.events_collection: collection.Collection = get_mongo_client(db_config)[
+            'openwhisk']['object_events']
+        if part_size < MIN_PART_SIZE:
+            raise Exception('part_size has to be at least {} bytes'.format(MIN_PART_SIZE))
+        self.max_workers = max_workers
+        self.part_size = part_size
+        self.part_workers = part_workers
+        self.pool = None
+        self.part_pool = None
+        self.cache = None
 
         if not self.endpoint:
             return
         print('Initialising Minio client')
 
+        if cache_size:
+            self.cache = ObjectCache(cache_dir, cache_size)
+
         for bucket in buckets:
             os.makedirs(bucket, exist_ok=True)
         try:
+            # same settings as the default client of minio, with a connection for every worker of the batch and part transfers
+            http_client = urllib3.PoolManager(
+                timeout=urllib3.Timeout(connect=300, read=300), maxsize=max(max_workers + part_workers, 10),
+                retries=urllib3.Retry(total=5, backoff_factor=0.2, status_forcelist=[500, 502, 503, 504]))
             self.client = minio.Minio(
-                self.endpoint, access_key=self.access_key, secret_key=self.secret_key, secure=False)
+                self.endpoint, access_key=self.access_key, secret_key=self.secret_key, secure=False, http_client=http_client)
             for bucket in buckets:
                 try:
                     self.client.make_bucket(bucket)
@@ -78,45 +148,359 @@ class ObjectStore:
         except Exception as e:
             print('Some issue with minio client: ' + e)
 
-    def __mark_object(self, context, object_path, object_size, method):
-        action_id = ObjectId(context['action_id'])
-        orch_id = ObjectId(context['orch_id'])
-        update_changes = {
-            '$set': {**context},
-            '$push': {
-                f"objects_{method}": {
-                    'orch_id': orch_id,
-                    'object': object_path,
-                    'size': object_size,
-                    'time': datetime.utcnow()
-                }
-            }
+    def __get_object_entry(self, context, object_path, object_size, etag=None, transfer=None):
+        return {
+            'orch_id': ObjectId(context['orch_id']),
+            'object': object_path,
+            'size': object_size,
+            # version of the object, used for finding out whether it changed since
+            'etag': etag,
+            'time': datetime.utcnow(),
+            'activation_id': os.environ.get('__OW_ACTIVATION_ID', None),
+            # duration, throughput and parts of the transfer
+            **(transfer or {})
+        }
+
+    def __get_error_entry(self, context, object_path):
+        return {
+            'orch_id': ObjectId(context['orch_id']),
+            'object': object_path,
+            'time': datetime.utcnow(),
+            'activation_id': os.environ.get('__OW_ACTIVATION_ID', None)
         }
-        self.db_collection.update_one(
-            {'_id': action_id},
-            update_changes,
-            upsert=True
-        )
+
+    def __mark_objects(self, context, entries):
+        """
+        Records the entries of an action as object events, with a single write.
+
+        Parameters
+        ----------
+        context: contains details for orchestration and action
+        entries : dict
+            field (objects_get, objects_put or error_get) -> entries of the field.
+
+        Returns
+        -------
+        None
+
+        """
+        events = [{**entry, 'action_id': ObjectId(context['action_id']), 'method': EVENT_METHODS[field]}
+                  for field, field_entries in entries.items() for entry in field_entries]
+        if not events:
+            return
+        self.events_collection.insert_many(events, ordered=False)
+
+    def __mark_object(self, context, object_path, object_size, method, etag=None, transfer=None):
+        self.__mark_objects(context, {f"objects_{method}": [
+            self.__get_object_entry(context, object_path, object_size, etag, transfer)]})
 
     def __mark_error_get(self, context, object_path):
-        action_id = ObjectId(context['action_id'])
-        orch_id = ObjectId(context['orch_id'])
-        update_changes = {
-            '$set': {**context},
-            '$push': {
-                'error_get': {
-                    'orch_id': orch_id,
-                    'object': object_path,
-                    'time': datetime.utcnow()
-                }
-            }
+        self.__mark_objects(context, {'error_get': [
+            self.__get_error_entry(context, object_path)]})
+
+    def __get_pool(self):
+        if self.pool is None:
+            self.pool = ThreadPoolExecutor(self.max_workers)
+        return self.pool
+
+    def __get_part_pool(self):
+        # kept apart from the pool of get_many and put_many, whose workers wait for the parts
+        if self.part_pool is None:
+            self.part_pool = ThreadPoolExecutor(self.part_workers)
+        return self.part_pool
+
+    def __get_parts(self, size):
+        """
+        Splits an object of size bytes in (part number, offset, length) parts, an empty object has a single empty part.
+        """
+        return [(number, offset, min(self.part_size, size - offset))
+                for number, offset in enumerate(range(0, size, self.part_size), 1)] or [(1, 0, 0)]
+
+    def __get_transfer(self, size, start, num_parts, resumed_parts):
+        duration = time.time() - start
+        return {
+            'duration': duration,
+            # bytes per second
+            'throughput': size / duration if duration > 0 else None,
+            'parts': num_parts,
+            'resumed_parts': resumed_parts,
         }
+
+    def __read_state(self, state_path):
+        """
+        Returns the state saved by an interrupted transfer, None if there is none.
+        """
+        try:
+            with open(state_path) as state_file:
+                return json.load(state_file)
+        except (OSError, ValueError):
+            return None
+
+    def __is_same_transfer(self, state, expected):
+        return state is not None and all(state.get(key, None) == value for key, value in expected.items())
+
+    def __load_state(self, state_path, expected):
+        """
+        Returns the state saved by an interrupted transfer if it was a transfer of the same object, None otherwise.
+        """
+        state = self.__read_state(state_path)
+        return state if self.__is_same_transfer(state, expected) else None
+
+    def __save_state(self, state_path, state):
+        with open(state_path + '.tmp', 'w') as state_file:
+            json.dump(state, state_file)
+        os.replace(state_path + '.tmp', state_path)
+
+    def __list_uploaded_parts(self, bucket, file_name, upload_id):
+        """
+        Returns part number -> (etag, size) of the parts of a multipart upload that are already on the server.
+        """
+        parts = dict()
+        marker = None
+        while True:
+            result = self.client._list_parts(
+                bucket, file_name, upload_id, part_number_marker=marker)
+            for part in result.parts:
+                # minio 7.1 parses the part numbers as str, 7.2 as int
+                parts[int(part.part_number)] = (part.etag, part.size)
+            if not result.is_truncated:
+                return parts
+            marker = result.next_part_number_marker
+
+    def __abort_upload(self, object_path, state_path, state):
+        """
+        Aborts the multipart upload of an interrupted transfer which is not resumed, as the file changed since, so that
+        the server does not keep its parts.
+        """
+        try:
+            self.client._abort_multipart_upload(
+                state['bucket'], state['object'], state['upload_id'])
+        except Exception as e:
+            print('Could not abort stale upload of {}: {}'.format(object_path, e))
+        os.remove(state_path)
+
+    def __upload(self, bucket, file_name, object_path):
+        """
+        Uploads a file, in parts uploaded in parallel when it is larger than part_size. The state of a multipart upload
+        is kept next to the file until it completes, so that uploading the same unchanged file again, e.g. in a retry
+        of the action, only uploads the parts which are missing on the server.
+
+        Returns
+        -------
+        (str, dict)
+            etag of the object and the metrics of the transfer.
+
+        """
+        start = time.time()
+        size = os.path.getsize(object_path)
+        state_path = f"{object_path}.upload"
+        saved = self.__read_state(state_path)
+        if size <= self.part_size:
+            if saved is not None:
+                self.__abort_upload(object_path, state_path, saved)
+            result = self.client.fput_object(bucket, file_name, object_path)
+            return result.etag, self.__get_transfer(size, start, 1, 0)
+
+        # minio has no public api for resuming a multipart upload, so its multipart calls are used directly
+        expected = {'bucket': bucket, 'object': file_name, 'size': size,
+                    'mtime': os.path.getmtime(object_path), 'part_size': self.part_size}
+        state = saved if self.__is_same_transfer(saved, expected) else None
+        if saved is not None and state is None:
+            self.__abort_upload(object_path, state_path, saved)
+        uploaded = dict()
+        if state is not None:
+            try:
+                uploaded = self.__list_uploaded_parts(
+                    bucket, file_name, state['upload_id'])
+            except Exception as e:
+                # the upload was completed or aborted in the meantime
+                print('Not resuming upload of {}: {}'.format(object_path, e))
+                state = None
+        if state is None:
+            state = {**expected, 'upload_id': self.client._create_multipart_upload(
+                bucket, file_name, {'Content-Type': 'application/octet-stream'})}
+            self.__save_state(state_path, state)
+
+        parts = self.__get_parts(size)
+        missing = [part for part in parts
+                   if part[0] not in uploaded or uploaded[part[0]][1] != part[2]]
+        etags = {number: etag for number, (etag, _) in uploaded.items()}
+
+        def _upload_part(part):
+            number, offset, length = part
+            with open(object_path, 'rb') as input_file:
+                input_file.seek(offset)
+                data = input_file.read(length)
+            return number, self.client._upload_part(bucket, file_name, data, None, state['upload_id'], number)
+
+        for number, etag in self.__get_part_pool().map(_upload_part, missing):
+            etags[number] = etag
+        result = self.client._complete_multipart_upload(bucket, file_name, state['upload_id'], [
+            Part(number, etags[number]) for number, _, _ in parts])
+        os.remove(state_path)
+        return result.etag, self.__get_transfer(size, start, len(parts), len(parts) - len(missing))
+
+    def __download(self, bucket, file_name, object_path, stat=None):
+        """
+        Downloads an object into object_path, in ranged parts downloaded in parallel when it is larger than part_size.
+        The parts are written into a temporary file, and the parts already written are kept track of next to it until
+        the download completes, so that downloading the same unchanged object again only downloads the missing parts.
+        Every part is asked for with the etag of the object, so that parts of different versions are never mixed.
+
+        Returns
+        -------
+        (int, str, dict)
+            size and etag of the object, and the metrics of the transfer.
+
+        """
+        start = time.time()
+        stat = stat or self.client.stat_object(bucket, file_name)
+        parts = self.__get_parts(stat.size)
+        temp_path = f"{object_path}.part"
+        state_path = f"{object_path}.download"
+        expected = {'bucket': bucket, 'object': file_name, 'etag': stat.etag,
+                    'size': stat.size, 'part_size': self.part_size}
+        state = None
+        if len(parts) > 1 and os.path.exists(temp_path):
+            state = self.__load_state(state_path, expected)
+        if state is None:
+            state = {**expected, 'done': []}
+            with open(temp_path, 'wb') as output_file:
+                output_file.truncate(stat.size)
+        done = set(state['done'])
+        lock = threading.Lock()
+
+        def _download_part(part):
+            number, offset, length = part
+            response = self.client.get_object(
+                bucket, file_name, offset, length, request_headers={'If-Match': stat.etag})
+            try:
+                with open(temp_path, 'r+b') as output_file:
+                    output_file.seek(offset)
+                    for chunk in response.stream(STREAM_CHUNK_SIZE):
+                        output_file.write(chunk)
+            finally:
+                response.close()
+                response.release_conn()
+            if len(parts) > 1:
+                with lock:
+                    done.add(number)
+                    self.__save_state(
+                        state_path, {**state, 'done': sorted(done)})
+
+        missing = [part for part in parts if part[0] not in done]
+        if len(missing) > 1:
+            list(self.__get_part_pool().map(_download_part, missing))
+        else:
+            for part in missing:
+                _download_part(part)
+        os.replace(temp_path, object_path)
+        if os.path.exists(state_path):
+            os.remove(state_path)
+        return stat.size, stat.etag, self.__get_transfer(stat.size, start, len(parts), len(parts) - len(missing))
+
+    def __get_object(self, bucket, file_name, object_path):
+        """
+        Downloads an object into object_path, or copies it from the cache when the cached copy has the current etag.
+        With the cache, the transfer metrics have a cache_hit flag.
+        """
+        if self.cache is None:
+            return self.__download(bucket, file_name, object_path)
+        start = time.time()
+        stat = self.client.stat_object(bucket, file_name)
+        if self.cache.copy_to(bucket, file_name, stat.etag, object_path):
+            return stat.size, stat.etag, {**self.__get_transfer(stat.size, start, 0, 0), 'cache_hit': True}
+        size, etag, transfer = self.__download(
+            bucket, file_name, object_path, stat)
+        self.cache.add_file(bucket, file_name, etag, object_path)
+        return size, etag, {**transfer, 'cache_hit': False}
+
+    def create_indexes(self):
+        """
+        Creates the indexes of the object events used by the lookups, once per process. It is called by the orchestrator
+        rather than on construction, so that creating a store in an action makes no round trip to the document store.
+        """
+        create_event_indexes(self.events_collection)
+
+    def ignore_activation(self, action_id, activation_id):
+        """
+        Marks the objects read and written by an activation of an action as ignored. It is used for the loser
+        when an action was speculatively run twice, so that only the writes of the winner are used for lookups.
+
+        Parameters
+        ----------
+        action_id : ObjectId
+            action the activation belongs to
+        activation_id : str
+            openwhisk activation id
+
+        Returns
+        -------
+        None
+
+        """
         self.db_collection.update_one(
             {'_id': action_id},
-            update_changes,
+            {'$addToSet': {'ignored_activations': activation_id}},
             upsert=True
         )
 
+    def __get_ignored_activations(self, events):
+        """
+        Returns action id -> activations ignored of the actions of events. Only events recorded by an activation can
+        be ignored, so there is no lookup when none of the events has an activation id, e.g. migrated ones.
+        """
+        action_ids = list({event['action_id'] for event in events
+                           if event.get('activation_id', None) is not None})
+        if not action_ids:
+            return dict()
+        return {info['_id']: set(info['ignored_activations']) for info in self.db_collection.find(
+            {'_id': {'$in': action_ids}, 'ignored_activations': {'$exists': True}}, {'ignored_activations': 1})}
+
+    def __is_ignored(self, event, ignored):
+        return event.get('activation_id', None) in ignored.get(event['action_id'], set())
+
+    def __find_events(self, query, sort=[('time', 1)]):
+        """
+        Returns the object events matching query, leaving out the ones of ignored activations.
+        """
+        events = list(self.events_collection.find(query, sort=sort))
+        ignored = self.__get_ignored_activations(events)
+        if not ignored:
+            return events
+        return [event for event in events if not self.__is_ignored(event, ignored)]
+
+    def __find_first_event(self, query, sort=[('time', 1)]):
+        """
+        Returns the first object event matching query in the order of sort which is not of an ignored activation, None
+        if there is none. Only the first event is read, the events of an ignored activation are left out by the query
+        for the next one.
+        """
+        excluded = []
+        while True:
+            event = self.events_collection.find_one(
+                {**query, '$nor': excluded} if excluded else query, sort=sort)
+            if event is None:
+                return None
+            ignored = self.__get_ignored_activations([event])
+            if not self.__is_ignored(event, ignored):
+                return event
+            excluded.append({'action_id': event['action_id'],
+                             'activation_id': {'$in': list(ignored[event['action_id']])}})
+
+    def __get_action_info(self, action_id, events):
+        """
+        Groups the events of an action in the shape its document had before object events, with the entries of
+        objects_get, objects_put and error_get in the order they happened.
+        """
+        info = {'_id': action_id, 'action_id': str(action_id),
+                'objects_get': [], 'objects_put': [], 'error_get': []}
+        fields = {method: field for field, method in EVENT_METHODS.items()}
+        for event in events:
+            info['orch_id'] = str(event['orch_id'])
+            info[fields[event['method']]].append(event)
+        return info
+
     def put_sync(self, context, bucket, file_name):
         """
         From the "bucket/file_name" directory, puts the object into bucket and file.
@@ -137,9 +521,9 @@ class ObjectStore:
         if not self.client:
             return
         object_path = f"{bucket}/{file_name}"
-        self.client.fput_object(bucket, file_name, object_path)
+        etag, transfer = self.__upload(bucket, file_name, object_path)
         self.__mark_object(context, object_path,
-                           os.path.getsize(object_path), 'put')
+                           os.path.getsize(object_path), 'put', etag, transfer)
 
     def get_sync(self, context, bucket, file_name):
         """
@@ -162,13 +546,258 @@ class ObjectStore:
             return
         object_path = f"{bucket}/{file_name}"
         try:
-            object = self.client.fget_object(bucket, file_name, object_path)
-            self.__mark_object(context, object_path, object.size, 'get')
+            size, etag, transfer = self.__get_object(
+                bucket, file_name, object_path)
+            self.__mark_object(context, object_path,
+                               size, 'get', etag, transfer)
+        except Exception as e:
+            self.__raise_get_error(context, object_path, e)
+
+    def put_bytes(self, context, bucket, file_name, data):
+        """
+        Puts data from memory into bucket and file, without writing it to "bucket/file_name" first.
+
+        Parameters
+        ----------
+        context: contains details for orchestration and action
+        bucket : str
+            The bucket which has the object
+        file_name : str
+            The file_name which is the object
+        data : bytes | str
+            content of the object, a str is encoded as utf-8.
+
+        Returns
+        -------
+        None
+
+        """
+        if isinstance(data, str):
+            data = data.encode()
+        self.put_stream(context, bucket, file_name, io.BytesIO(data), len(data))
+
+    def put_stream(self, context, bucket, file_name, stream, length=-1):
+        """
+        Puts the content read from a file-like object, e.g. the stdout of a process, into bucket and file. The stream is
+        read in chunks, and uploaded in parts of part_size when it is larger, so it is never held in memory as a whole.
+
+        Parameters
+        ----------
+        context: contains details for orchestration and action
+        bucket : str
+            The bucket which has the object
+        file_name : str
+            The file_name which is the object
+        stream : file-like
+            object with a read(size) method returning bytes, it is read until it is exhausted.
+        length : int
+            number of bytes of the object, -1 when it is not known in advance.
+
+        Returns
+        -------
+        None
+
+        """
+        if not self.client:
+            return
+        object_path = f"{bucket}/{file_name}"
+        start = time.time()
+        reader = CountingReader(stream)
+        result = self.client.put_object(bucket, file_name, reader, length, part_size=self.part_size,
+                                        num_parallel_uploads=self.part_workers)
+        self.__mark_object(context, object_path, reader.size, 'put', result.etag,
+                           self.__get_transfer(reader.size, start, len(self.__get_parts(reader.size)), 0))
+
+    def get_bytes(self, context, bucket, file_name):
+        """
+        Gets the content of bucket and file into memory, without writing it to "bucket/file_name".
+
+        Parameters
+        ----------
+        context: contains details for orchestration and action
+        bucket : str
+            The bucket which has the object
+        file_name : str
+            The file_name which is the object
+
+        Returns
+        -------
+        bytes
+            content of the object.
+
+        """
+        if not self.client:
+            return
+        object_path = f"{bucket}/{file_name}"
+        start = time.time()
+        data = None
+        stream = None
+        try:
+            if self.cache is not None:
+                etag = self.client.stat_object(bucket, file_name).etag
+                data = self.cache.read(bucket, file_name, etag)
+            if data is None:
+                with self.__open_stream(bucket, file_name) as stream:
+                    data = stream.read()
+        except Exception as e:
+            self.__raise_get_error(context, object_path, e)
+        cache_hit = stream is None
+        if not cache_hit:
+            etag = stream.etag
+            if self.cache is not None:
+                self.cache.add_bytes(bucket, file_name, etag, data)
+        transfer = self.__get_transfer(
+            len(data), start, 0 if cache_hit else 1, 0)
+        if self.cache is not None:
+            transfer['cache_hit'] = cache_hit
+        self.__mark_object(context, object_path,
+                           len(data), 'get', etag, transfer)
+        return data
+
+    def get_stream(self, context, bucket, file_name):
+        """
+        Opens bucket and file for reading without writing it to "bucket/file_name". The object is recorded as read
+        once it is opened, its transfer is not measured as it is up to the caller.
+
+        Parameters
+        ----------
+        context: contains details for orchestration and action
+        bucket : str
+            The bucket which has the object
+        file_name : str
+            The file_name which is the object
+
+        Returns
+        -------
+        ObjectStream
+            file-like object over the content of the object, to be closed once read, e.g. by using it in a with block.
+            iter_chunks(size) reads it in chunks of size bytes.
+
+        """
+        if not self.client:
+            return
+        object_path = f"{bucket}/{file_name}"
+        try:
+            stream = self.__open_stream(bucket, file_name)
         except Exception as e:
-            self.__mark_error_get(context, object_path)
-            if e.code == 'NoSuchKey':
-                raise NoSuchKeyException(e)
-            raise e
+            self.__raise_get_error(context, object_path, e)
+        self.__mark_object(context, object_path,
+                           stream.size, 'get', stream.etag)
+        return stream
+
+    def __open_stream(self, bucket, file_name):
+        return ObjectStream(self.client.get_object(bucket, file_name))
+
+    def __raise_get_error(self, context, object_path, e):
+        self.__mark_error_get(context, object_path)
+        if getattr(e, 'code', None) == 'NoSuchKey':
+            raise NoSuchKeyException(e)
+        raise e
+
+    def put_many(self, context, bucket, file_names):
+        """
+        Same as put_sync for several files, which are uploaded concurrently by up to max_workers workers.
+        All the uploads are recorded with a single write once they are done.
+
+        Parameters
+        ----------
+        context: contains details for orchestration and action
+        bucket : str
+            The bucket to put the objects in
+        file_names : str[]
+            The files to upload from "bucket/file_name"
+
+        Returns
+        -------
+        None
+
+        """
+        if not self.client:
+            return
+
+        def _put(file_name):
+            object_path = f"{bucket}/{file_name}"
+            etag, transfer = self.__upload(bucket, file_name, object_path)
+            return self.__get_object_entry(context, object_path, os.path.getsize(object_path), etag, transfer)
+
+        entries = []
+        error = None
+        futures = [self.__get_pool().submit(_put, file_name)
+                   for file_name in file_names]
+        for future in futures:
+            try:
+                entries.append(future.result())
+            except Exception as e:
+                error = error or e
+        # the objects that were uploaded are recorded even if some upload failed
+        self.__mark_objects(context, {'objects_put': entries})
+        if error is not None:
+            raise error
+
+    def get_many(self, context, bucket, file_names):
+        """
+        Same as get_sync for several objects, which are downloaded concurrently by up to max_workers workers.
+        All the downloads, and the objects that were not found, are recorded with a single write once they are done.
+
+        Parameters
+        ----------
+        context: contains details for orchestration and action
+        bucket : str
+            The bucket which has the objects
+        file_names : str[]
+            The objects to download into "bucket/file_name"
+
+        Returns
+        -------
+        None
+
+        Raises
+        ------
+        NoSuchKeyException
+            for the first missing object, once every object has been tried. Other errors are raised as they are.
+
+        """
+        if not self.client:
+            return
+
+        def _get(file_name):
+            object_path = f"{bucket}/{file_name}"
+            size, etag, transfer = self.__get_object(
+                bucket, file_name, object_path)
+            return self.__get_object_entry(context, object_path, size, etag, transfer)
+
+        entries = []
+        error_entries = []
+        errors = []
+        futures = [self.__get_pool().submit(_get, file_name)
+                   for file_name in file_names]
+        for file_name, future in zip(file_names, futures):
+            try:
+                entries.append(future.result())
+            except Exception as e:
+                error_entries.append(self.__get_error_entry(
+                    context, f"{bucket}/{file_name}"))
+                errors.append(e)
+        self.__mark_objects(
+            context, {'objects_get': entries, 'error_get': error_entries})
+        # a missing object is reported first, as the orchestrator can recover it
+        for error in errors:
+            if getattr(error, 'code', None) == 'NoSuchKey':
+                raise NoSuchKeyException(error)
+        if errors:
+            raise errors[0]
+
+    async def put_many_async(self, context, bucket, file_names):
+        """
+        Awaitable put_many, the uploads run off the event loop.
+        """
+        await asyncio.to_thread(self.put_many, context, bucket, file_names)
+
+    async def get_many_async(self, context, bucket, file_names):
+        """
+        Awaitable get_many, the downloads run off the event loop.
+        """
+        await asyncio.to_thread(self.get_many, context, bucket, file_names)
 
     def remove_object(self, context, bucket, file_name):
         if not self.client:
@@ -176,6 +805,60 @@ class ObjectStore:
         # object_path = f"{bucket}/{file_name}"
         self.client.remove_object(bucket, file_name)
 
+    def get_object_versions(self, object_paths):
+        """
+        Fetches the current version of objects from the object store.
+
+        Parameters
+        ----------
+        object_paths : str[]
+            List of objects as "bucket/file_name"
+
+        Returns
+        -------
+        dict
+            object path -> {'etag', 'size'} of the object, None for the objects that do not exist.
+            None if the object store is not configured.
+
+        """
+        if not self.client:
+            return None
+        versions = dict()
+        for object_path in object_paths:
+            bucket, file_name = object_path.split('/', 1)
+            try:
+                stat = self.client.stat_object(bucket, file_name)
+                versions[object_path] = {'etag': stat.etag, 'size': stat.size}
+            except Exception as e:
+                if getattr(e, 'code', None) != 'NoSuchKey':
+                    raise e
+                versions[object_path] = None
+
+        return versions
+
+    def get_objects_for_action(self, action_id):
+        """
+        Fetches the objects read and written by an action, leaving out the activations that were ignored.
+        An object used by several attempts of the action keeps the entry of the latest one.
+
+        Parameters
+        ----------
+        action_id : ObjectId
+            action for which the objects are required
+
+        Returns
+        -------
+        object
+            'read' and 'written', each a dict of object path -> entry with the size, etag and time of the access.
+
+        """
+        objects = {'read': dict(), 'written': dict()}
+        kinds = {'get': 'read', 'put': 'written'}
+        for event in self.__find_events({'action_id': ObjectId(action_id), 'method': {'$in': ['get', 'put']}}):
+            objects[kinds[event['method']]][event['object']] = event
+
+        return objects
+
     def get_action_ids_for_objects(self, keys):
         """
         Fetches the action_id that was responsible for writing data to the object store for each key.
@@ -192,13 +875,14 @@ class ObjectStore:
             action id responsible for writing to the object
 
         """
-        objects = []
+        action_ids = []
         for key in keys:
-            result = self.db_collection.find_one({"objects_put.object": key})
-            if result:
-                objects.append(result)
+            # writes of an ignored activation do not make an action the owner of the key
+            put = self.__find_first_event({'object': key, 'method': 'put'})
+            if put is not None:
+                action_ids.append(put['action_id'])
 
-        return list(map(lambda action: ObjectId(action['action_id']), objects))
+        return action_ids
 
     def get_all_action_ids_for_objects(self, keys):
         """
@@ -218,40 +902,38 @@ class ObjectStore:
             Each individual list is sorted by timestamp.
 
         """
+        # the latest write of every activation which wrote one of the keys, rather than every write of the keys
+        activations = list(self.events_collection.aggregate([
+            {'$match': {'object': {'$in': list(keys)}, 'method': 'put'}},
+            {'$group': {'_id': {'object': '$object', 'action_id': '$action_id', 'activation_id': '$activation_id'},
+                        'time': {'$max': '$time'}}}
+        ]))
+        writes = [{**activation['_id'], 'time': activation['time']} for activation in activations]
+        ignored = self.__get_ignored_activations(writes)
+        # key -> action id -> time of its latest write of the key
+        writers = dict()
+        for write in writes:
+            if self.__is_ignored(write, ignored):
+                continue
+            key_writers = writers.setdefault(write['object'], dict())
+            key_writers[write['action_id']] = max(write['time'], key_writers.get(write['action_id'], write['time']))
+
         objects = []
         for key in keys:
-            object_for_key = []
-            result = self.db_collection.find({"objects_put.object": key})
-            # result = list(self.db_collection.find({"error_get": "*"}))
-            for res in result:
-                curr = {}
-                for obj in res['objects_put']:
-                    if obj['object'] == key:
-                        curr = {'action_id': res['action_id'], **obj}
-                if curr:
-                    object_for_key.append(curr)
-            object_for_key = sorted(object_for_key, key=lambda x: x['time'])
-            if object_for_key:
-                objects.append(
-                    list(map(lambda action: ObjectId(action['action_id']), object_for_key)))
+            if key in writers:
+                objects.append(sorted(writers[key], key=lambda action_id: writers[key][action_id]))
 
         return objects
 
     def get_objects_involved(self, orch_id: ObjectId):
-        orch_info = list(self.db_collection.find(
-            {'orch_id': str(orch_id)}))
         objects_read = set()
         objects_written = set()
 
-        for info in orch_info:
-            for object_read in info.get('objects_get', []):
-                if not object_read['orch_id'] == orch_id:
-                    continue
-                objects_read.add(object_read['object'])
-            for object_wrote in info.get('objects_put', []):
-                if not object_wrote['orch_id'] == orch_id:
-                    continue
-                objects_written.add(object_wrote['object'])
+        for event in self.__find_events({'orch_id': ObjectId(orch_id), 'method': {'$in': ['get', 'put']}}, sort=None):
+            if event['method'] == 'get':
+                objects_read.add(event['object'])
+            else:
+                objects_written.add(event['object'])
 
         return {
             'objects_read': objects_read,
@@ -276,39 +958,35 @@ class ObjectStore:
             It also consists of the details action wise.
 
         """
-        actions_info = list(self.db_collection.find(
-            {'_id': {'$in': action_ids}}))
+        query = {'action_id': {'$in': [ObjectId(action_id) for action_id in action_ids]},
+                 'method': {'$in': ['get', 'put']}}
+        if orch_id:
+            query['orch_id'] = ObjectId(orch_id)
         action_metrics = dict()
         objects_read = set()
         objects_written = set()
         total_object_read_sz = 0
         total_object_write_sz = 0
 
-        for info in actions_info:
-            object_read_sz = 0
-            object_write_sz = 0
-
-            if 'objects_get' in info:
-                for object_read in info['objects_get']:
-                    if orch_id and not object_read['orch_id'] == orch_id:
-                        continue
-                    objects_read.add(object_read['object'])
-                    object_read_sz += object_read['size']
-            if 'objects_put' in info:
-                for object_wrote in info['objects_put']:
-                    if orch_id and not object_wrote['orch_id'] == orch_id:
-                        continue
-                    objects_written.add(object_wrote['object'])
-                    object_write_sz += object_wrote['size']
-
-            total_object_read_sz += object_read_sz
-            total_object_write_sz += object_write_sz
-
-            action_metrics[info['_id']] = {
-                'action_id': info['_id'],
-                'object_read_sz': object_read_sz,
-                'object_write_sz': object_write_sz
-            }
+        for event in self.__find_events(query, sort=None):
+            action_id = event['action_id']
+            if action_id not in action_metrics:
+                action_metrics[action_id] = {
+                    'action_id': action_id,
+                    'object_read_sz': 0,
+                    'object_write_sz': 0,
+                    'cache_hits': 0
+                }
+            if event['method'] == 'get':
+                objects_read.add(event['object'])
+                action_metrics[action_id]['object_read_sz'] += event['size']
+                action_metrics[action_id]['cache_hits'] += int(
+                    event.get('cache_hit', False))
+                total_object_read_sz += event['size']
+            else:
+                objects_written.add(event['object'])
+                action_metrics[action_id]['object_write_sz'] += event['size']
+                total_object_write_sz += event['size']
 
         return {
             'objects_read': objects_read,
@@ -337,37 +1015,17 @@ class ObjectStore:
         """
         result = []
         for object in objects:
-            objects_put_info = self.db_collection.find(
-                {"objects_put.object": object})
-            put_time = None
-            put_size = 0
-            for info in objects_put_info:
-                if not 'objects_put' in info:
-                    continue
-                for obj in info['objects_put']:
-                    if orch_id and not obj['orch_id'] == orch_id:
-                        continue
-                    if not obj['object'] == object:
-                        continue
-                    if not put_time or put_time > obj['time']:
-                        put_time = obj['time']
-                        put_size += obj['size']
-
-            objects_get_info = self.db_collection.find(
-                {"objects_get.object": object})
-            get_time = None
-            get_size = 0
-            for info in objects_get_info:
-                if not 'objects_get' in info:
-                    continue
-                for obj in info['objects_get']:
-                    if orch_id and not obj['orch_id'] == orch_id:
-                        continue
-                    if not obj['object'] == object:
-                        continue
-                    if not get_time or get_time < obj['time']:
-                        get_time = obj['time']
-                        get_size += obj['size']
+            query = {'object': object}
+            if orch_id:
+                query['orch_id'] = ObjectId(orch_id)
+
+            # the earliest put and the latest get, along with their sizes
+            put = self.__find_first_event({**query, 'method': 'put'})
+            get = self.__find_first_event({**query, 'method': 'get'}, sort=[('time', -1)])
+            put_time = put['time'] if put else None
+            put_size = put['size'] if put else 0
+            get_time = get['time'] if get else None
+            get_size = get['size'] if get else 0
 
             lifetime = None
             if get_time and put_time:
@@ -403,42 +1061,50 @@ class ObjectStore:
             An object consisting of number object written and their size.
 
         """
-        actions_info = self.db_collection.find({'_id': {'$in': action_ids}})
+        query = {'action_id': {'$in': [ObjectId(action_id) for action_id in action_ids]}, 'method': 'put'}
+        if orch_ids:
+            query['orch_id'] = {'$in': [ObjectId(orch_id) for orch_id in orch_ids]}
         metrics = {}
-        for info in actions_info:
-            action_id = info['_id']
-            objects_put = info.get('objects_put', [])
-
-            for object_wrote in objects_put:
-                orch_id = object_wrote['orch_id']
-                if orch_ids and orch_id not in orch_ids:
-                    continue
-                object_name = object_wrote['object']
-
-                if orch_id not in metrics:
-                    metrics[orch_id] = {}
-                if action_id not in metrics[orch_id]:
-                    metrics[orch_id][action_id] = {}
-                metrics[orch_id][action_id][object_name] = {
-                    'object': object_name,
-                    'size': object_wrote['size'],
-                    'put_time': object_wrote['time']
-                }
+        # a later write of an object replaces the earlier one
+        for event in self.__find_events(query):
+            orch_id = event['orch_id']
+            action_id = event['action_id']
+            object_name = event['object']
+
+            if orch_id not in metrics:
+                metrics[orch_id] = {}
+            if action_id not in metrics[orch_id]:
+                metrics[orch_id][action_id] = {}
+            metrics[orch_id][action_id][object_name] = {
+                'object': object_name,
+                'size': event['size'],
+                'put_time': event['time']
+            }
 
         return metrics
 
     def get_details_object_write(self, orch_id, object):
-        result = self.db_collection.find_one(
-            {"objects_put.object": object, "objects_get.orch_id": orch_id})
-        return result
+        """
+        Fetches the objects used by the action which wrote object in the orchestration, None if it was not written in it.
+        """
+        put = self.__find_first_event(
+            {'object': object, 'orch_id': ObjectId(orch_id), 'method': 'put'}, sort=[('time', -1)])
+        if put is None:
+            return None
+        return self.get_action_details(put['action_id'])
 
     def get_action_details(self, action_id):
+        """
+        Fetches the objects read, written and not found by an action, as 'objects_get', 'objects_put' and 'error_get'.
+        None if the action used no object.
+        """
         if not isinstance(action_id, ObjectId):
             action_id = ObjectId(action_id)
 
-        result = self.db_collection.find_one(
-            {"_id": action_id})
-        return result
+        events = self.__find_events({'action_id': action_id})
+        if not events:
+            return None
+        return self.__get_action_info(action_id, events)
 
 
 class NoSuchKeyException(Exception):
@@ -454,6 +1120,56 @@ class NoSuchKeyException(Exception):
         return str(self.original_exception)
 
 
+class ObjectStream(io.RawIOBase):
+    """
+    Read-only file-like object over the response of a get, closing it releases the connection back to the pool.
+    """
+
+    def __init__(self, response):
+        super().__init__()
+        self.response = response
+        self.size = int(response.headers.get('Content-Length', 0))
+        # same form as the etags returned by stat_object and put_object
+        self.etag = (response.headers.get('ETag') or '').replace('"', '') or None
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        return self.response.readinto(buffer)
+
+    def iter_chunks(self, chunk_size=STREAM_CHUNK_SIZE):
+        """
+        Yields the rest of the object in chunks of up to chunk_size bytes.
+        """
+        while True:
+            chunk = self.read(chunk_size)
+            if not chunk:
+                return
+            yield chunk
+
+    def close(self):
+        if not self.closed:
+            self.response.close()
+            self.response.release_conn()
+        super().close()
+
+
+class CountingReader:
+    """
+    Wraps a stream being uploaded, counting the bytes read from it.
+    """
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.size = 0
+
+    def read(self, size=-1):
+        data = self.stream.read(size)
+        self.size += len(data)
+        return data
+
+
 if __name__ == '__main__':
     STORAGE_ENDPOINT = "172.24.20.28:9000"
     AWS_ACCESS_KEY_ID = "minioadmin"
@@ -46,6 +46,7 @@ async def main():
 
     # you need to call stop function
     orch.stop()
+    await orch.close()
 
 if __name__ == "__main__":
     asyncio.run(main())
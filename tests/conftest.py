@@ -0,0 +1,57 @@
+import os
+import socket
+import sys
+
+import mongomock
+import pytest
+import pymongo
+
+# the orchestrator and the object store connect to mongo when they are imported, the tests use an in-memory mongo instead
+pymongo.MongoClient = mongomock.MongoClient
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# with motor installed the awaitable metadata calls would go to a real MongoDB, they are made on mongomock in worker threads
+import object_store.metadata  # noqa: E402
+
+object_store.metadata.AsyncIOMotorClient = None
+
+auth = ("guest", "guest")
+
+
+def get_free_port():
+    """
+    Returns a port on which a FakeOpenwhisk can be started.
+    """
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+async def start_fake(**options):
+    """
+    Starts a FakeOpenwhisk with the given options and returns it with its url.
+    """
+    from benchmarks.fake_openwhisk import FakeOpenwhisk
+
+    fake = FakeOpenwhisk(**options)
+    url = await fake.start(port=get_free_port())
+    return fake, url
+
+
+def get_orchestrator(url, log_file, **kwargs):
+    """
+    Returns an orchestrator for the openwhisk at url, without an object store: the actions of the fake openwhisk do not
+    use objects.
+    """
+    from BaseOrchestrator import BaseOrchestrator
+
+    return BaseOrchestrator(auth, url=url, adaptive_polling=False, storage_config={}, log_file=log_file, **kwargs)
+
+
+@pytest.fixture(scope='session')
+def log_file(tmp_path_factory):
+    """
+    File the orchestrators of the tests log to, instead of the logfile.log of the repository.
+    """
+    return str(tmp_path_factory.mktemp('logs') / 'orchestrator.log')
@@ -0,0 +1,61 @@
+import asyncio
+import time
+
+from datetime import datetime
+
+from ActivationTracker import Completion
+from Executor import Executor
+from LocalExecutor import get_record
+
+
+class FakeExecutor(Executor):
+    """
+    Runs the actions in the event loop of the test. The result of an activation is given by the function of its action,
+    called with the parameters when it is invoked, or is the parameters for an action without a function. An activation
+    completes after its 'runtime' parameter, 0.01 seconds by default, and never completes with a runtime of None.
+    """
+
+    def __init__(self, actions=None) -> None:
+        self.actions = actions or {}
+        # (action name, parameters) of every invocation, in order
+        self.invocations = []
+        self.activations = {}
+        self.futures = {}
+
+    def names(self):
+        """
+        Returns the name of the action of every invocation, in order.
+        """
+        return [action_name for action_name, _ in self.invocations]
+
+    async def invoke(self, action_name, params) -> str:
+        activation_id = 'activation-{}'.format(len(self.invocations))
+        self.invocations.append((action_name, params))
+        function = self.actions.get(action_name, None)
+        result = function(params) if function is not None else params
+        self.activations[activation_id] = (time.time(), params.get('runtime', 0.01), result)
+        return activation_id
+
+    def __complete(self, activation_id, future):
+        start, _, result = self.activations[activation_id]
+        if not future.done():
+            future.set_result(Completion(get_record(activation_id, start, time.time(), result), datetime.utcnow(), 1))
+
+    def track(self, activation_id, start_ts, expected_runtime=None) -> asyncio.Future:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self.futures[activation_id] = future
+        start, runtime, _ = self.activations[activation_id]
+        if runtime is not None:
+            loop.call_later(max(start + runtime - time.time(), 0), self.__complete, activation_id, future)
+        return future
+
+    def untrack(self, activation_id):
+        future = self.futures.pop(activation_id, None)
+        if future is not None and not future.done():
+            future.cancel()
+        return 0
+
+    async def close(self):
+        for activation_id in list(self.futures):
+            self.untrack(activation_id)
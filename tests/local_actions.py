@@ -0,0 +1,14 @@
+import os
+
+
+def square(args):
+    return {'value': args['value'] ** 2}
+
+
+def fail(args):
+    raise Exception('failed on purpose')
+
+
+def crash(args):
+    # the worker process dies like it would when killed for running out of memory
+    os._exit(1)
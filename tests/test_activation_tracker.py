@@ -0,0 +1,124 @@
+import asyncio
+import logging
+
+from datetime import datetime
+
+from ActivationTracker import ActivationTracker
+
+
+class FakeHttp:
+    """
+    Answers the list and GET calls of the tracker from a dict of activation records, and fails the calls it is told to.
+    Only the records of the listed activations, all of them by default, are returned by the list.
+    """
+
+    def __init__(self, records, listed=None, list_available=True, failures=0) -> None:
+        self.records = records
+        self.listed = set(records) if listed is None else listed
+        self.list_available = list_available
+        self.failures = failures
+        self.list_calls = 0
+        self.get_calls = []
+
+    async def get(self, url, params=None):
+        if self.failures > 0:
+            self.failures -= 1
+            raise Exception('connection reset')
+        if params is not None:
+            self.list_calls += 1
+            if not self.list_available:
+                return {'error': 'The requested resource does not exist.'}
+            records = [record for activation_id, record in self.records.items() if activation_id in self.listed]
+            return records[params['skip']:params['skip'] + params['limit']]
+        activation_id = url.rsplit('/', 1)[1]
+        self.get_calls.append(activation_id)
+        return self.records.get(activation_id, {'error': 'The requested resource does not exist.'})
+
+
+def get_tracker(http, **kwargs):
+    return ActivationTracker(http, 'http://openwhisk/api/v1/namespaces', logging.getLogger('tests'),
+                             min_poll_interval=0.01, max_poll_interval=0.05, **kwargs)
+
+
+def completed(activation_id):
+    return {'activationId': activation_id, 'end': 1, 'response': {'result': {}}}
+
+
+def test_list_poll_resolves_every_tracked_activation():
+    async def main():
+        http = FakeHttp({'a': completed('a'), 'b': completed('b')})
+        tracker = get_tracker(http, poll_mode='list')
+        futures = [tracker.track(activation_id, datetime.utcnow()) for activation_id in ['a', 'b']]
+        records = [(await asyncio.wait_for(future, 5)).record for future in futures]
+        await tracker.close()
+        return http, records
+
+    http, records = asyncio.run(main())
+    assert [record['activationId'] for record in records] == ['a', 'b']
+    assert http.get_calls == []
+
+
+def test_unavailable_list_falls_back_to_get():
+    async def main():
+        http = FakeHttp({'a': completed('a')}, list_available=False)
+        tracker = get_tracker(http, poll_mode='list')
+        completion = await asyncio.wait_for(tracker.track('a', datetime.utcnow()), 5)
+        await tracker.close()
+        return http, completion
+
+    http, completion = asyncio.run(main())
+    assert completion.record['activationId'] == 'a'
+    assert http.list_calls >= 1 and http.get_calls == ['a']
+
+
+def test_straggler_missing_from_list_is_fetched_by_id():
+    async def main():
+        # the activation has ended but the list does not show it, e.g. it is older than the pages fetched
+        http = FakeHttp({'a': completed('a')}, listed=set())
+        tracker = get_tracker(http, poll_mode='list', straggler_interval=0.05)
+        completion = await asyncio.wait_for(tracker.track('a', datetime.utcnow()), 5)
+        await tracker.close()
+        return http, completion
+
+    http, completion = asyncio.run(main())
+    assert completion.record['activationId'] == 'a'
+    assert http.list_calls >= 2 and http.get_calls == ['a']
+
+
+def test_transient_poll_errors_are_retried():
+    async def main():
+        http = FakeHttp({'a': completed('a')}, failures=3)
+        tracker = get_tracker(http, poll_mode='id', max_poll_errors=5)
+        completion = await asyncio.wait_for(tracker.track('a', datetime.utcnow()), 5)
+        await tracker.close()
+        return completion
+
+    assert asyncio.run(main()).record['activationId'] == 'a'
+
+
+def test_repeated_poll_errors_fail_the_activation():
+    async def main():
+        http = FakeHttp({'a': completed('a')}, failures=100)
+        tracker = get_tracker(http, poll_mode='id', max_poll_errors=3)
+        try:
+            await asyncio.wait_for(tracker.track('a', datetime.utcnow()), 5)
+        except Exception as e:
+            return e
+        finally:
+            await tracker.close()
+
+    assert str(asyncio.run(main())) == 'connection reset'
+
+
+def test_poll_errors_fail_the_activation_after_poll_error_timeout():
+    async def main():
+        http = FakeHttp({'a': completed('a')}, failures=100)
+        tracker = get_tracker(http, poll_mode='id', max_poll_errors=1000, poll_error_timeout=0.1)
+        try:
+            await asyncio.wait_for(tracker.track('a', datetime.utcnow()), 5)
+        except Exception as e:
+            return e
+        finally:
+            await tracker.close()
+
+    assert str(asyncio.run(main())) == 'connection reset'
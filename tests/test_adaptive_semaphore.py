@@ -0,0 +1,65 @@
+import asyncio
+import logging
+
+from AdaptiveSemaphore import AdaptiveSemaphore
+
+
+def get_semaphore(max_limit, **kwargs):
+    return AdaptiveSemaphore(max_limit, logging.getLogger('tests'), **kwargs)
+
+
+def test_backpressure_cuts_the_limit_multiplicatively():
+    async def main():
+        semaphore = get_semaphore(10, decrease_factor=0.5, min_limit=2)
+        limits = []
+        for _ in range(4):
+            semaphore.on_backpressure('throttled')
+            limits.append((semaphore.limit, semaphore.value))
+        return limits
+
+    assert asyncio.run(main()) == [(5, 5), (2.5, 2), (2, 2), (2, 2)]
+
+
+def test_slots_in_use_are_taken_back_on_release():
+    async def main():
+        semaphore = get_semaphore(4, decrease_factor=0.5)
+        for _ in range(4):
+            await semaphore.acquire()
+        semaphore.on_backpressure('throttled')
+        # the two slots over the new limit are dropped rather than freed
+        semaphore.release()
+        semaphore.release()
+        after_dropped = semaphore.value
+        semaphore.release()
+        return after_dropped, semaphore.value
+
+    assert asyncio.run(main()) == (0, 1)
+
+
+def test_limit_grows_additively_up_to_max_limit():
+    async def main():
+        semaphore = get_semaphore(4, decrease_factor=0.5)
+        semaphore.on_backpressure('throttled')
+        # about one slot for every limit completions
+        for _ in range(2):
+            semaphore.on_completed()
+        grown = (round(semaphore.limit, 2), semaphore.value)
+        for _ in range(100):
+            semaphore.on_completed()
+        return grown, semaphore.limit, semaphore.value
+
+    grown, limit, value = asyncio.run(main())
+    assert grown == (2.9, 2)
+    assert (limit, value) == (4, 4)
+
+
+def test_long_queue_wait_cuts_the_limit_once_per_cooldown():
+    async def main():
+        semaphore = get_semaphore(10, decrease_factor=0.5, decrease_cooldown=60, min_queue_wait=0.1)
+        semaphore.on_completed(queue_wait=0.01)
+        semaphore.on_completed(queue_wait=1)
+        # activations queued before the cut complete after it
+        semaphore.on_completed(queue_wait=1)
+        return semaphore.limit
+
+    assert asyncio.run(main()) == 5
@@ -0,0 +1,113 @@
+import asyncio
+import time
+
+from conftest import get_orchestrator
+from fake_executor import FakeExecutor
+
+
+class PollFailingExecutor(FakeExecutor):
+    """
+    Fails the future of the given activations, as the tracker does after repeated poll errors.
+    """
+
+    def __init__(self, failing) -> None:
+        super().__init__()
+        self.failing = failing
+
+    def track(self, activation_id, start_ts, expected_runtime=None) -> asyncio.Future:
+        future = super().track(activation_id, start_ts, expected_runtime)
+        if activation_id in self.failing:
+            future.set_exception(Exception('connection reset'))
+        return future
+
+
+def get_attempts(orch, results):
+    orch.instrumentation.flush()
+    return [orch.db_collection.find_one({'_id': res['action_id']}).get('attempts', []) for res in results]
+
+
+def test_hung_activation_times_out_after_action_timeout(log_file):
+    async def main():
+        executor = FakeExecutor()
+        orch = get_orchestrator(None, log_file, executor=executor, retry_backoff=0.01)
+        orch.start('action-timeout-test')
+        results = await asyncio.wait_for(orch.make_action(
+            [orch.prepare_action('hung', {'runtime': None}), orch.prepare_action('quick', {})],
+            retries=1, parallelisation=2, action_timeout=0.1), 10)
+        attempts = get_attempts(orch, results)
+        orch.stop()
+        await orch.close()
+        return executor, results, attempts
+
+    executor, results, attempts = asyncio.run(main())
+    assert not results[0]['success'] and results[0]['error']['code'] == 'Timeout'
+    assert results[1]['success']
+    # the timed out activation is retried like any other failure
+    assert executor.names() == ['hung', 'quick', 'hung']
+    assert [(attempt['timed_out'], attempt['missed_deadline']) for attempt in attempts[0]] == [(True, 'action')] * 2
+
+
+def test_batch_timeout_fails_the_actions_left(log_file):
+    async def main():
+        executor = FakeExecutor()
+        orch = get_orchestrator(None, log_file, executor=executor)
+        orch.start('batch-timeout-test')
+        start = time.time()
+        results = await asyncio.wait_for(orch.make_action(
+            [orch.prepare_action('quick', {})] + [orch.prepare_action('hung', {'runtime': None, 'index': i}) for i in range(2)],
+            parallelisation=2, action_timeout=60, batch_timeout=0.3), 10)
+        elapsed = time.time() - start
+        attempts = get_attempts(orch, results)
+        orch.stop()
+        await orch.close()
+        return executor, results, attempts, elapsed
+
+    executor, results, attempts, elapsed = asyncio.run(main())
+    assert elapsed < 2
+    assert [res['success'] for res in results] == [True, False, False]
+    assert [res['error']['code'] for res in results[1:]] == ['Timeout', 'Timeout']
+    # both hung activations were running at the deadline, and are not retried after it
+    assert executor.names() == ['quick', 'hung', 'hung']
+    assert [attempt['missed_deadline'] for attempt in attempts[1] + attempts[2]] == ['batch', 'batch']
+
+
+def test_batch_timeout_fails_the_actions_not_invoked(log_file):
+    async def main():
+        executor = FakeExecutor()
+        orch = get_orchestrator(None, log_file, executor=executor)
+        orch.start('batch-timeout-pending-test')
+        results = await asyncio.wait_for(orch.make_action(
+            [orch.prepare_action('hung', {'runtime': None, 'index': i}) for i in range(3)],
+            parallelisation=1, action_timeout=60, batch_timeout=0.2), 10)
+        orch.stop()
+        await orch.close()
+        return executor, results
+
+    executor, results = asyncio.run(main())
+    assert executor.names() == ['hung']
+    assert [res['error']['code'] for res in results] == ['Timeout'] * 3
+    assert [res['error']['message'].startswith('Batch deadline') for res in results] == [False, True, True]
+
+
+def test_activation_that_can_not_be_polled_fails_only_its_action(log_file):
+    async def main():
+        executor = PollFailingExecutor(failing=['activation-0', 'activation-2'])
+        orch = get_orchestrator(None, log_file, executor=executor, retry_backoff=0.01)
+        orch.start('poll-error-test')
+        results = await asyncio.wait_for(orch.make_action(
+            [orch.prepare_action('unpolled', {}), orch.prepare_action('polled', {'runtime': 0.2})],
+            retries=0, parallelisation=1), 10)
+        retried = await asyncio.wait_for(orch.make_action([orch.prepare_action('unpolled', {})], retries=1), 10)
+        attempts = get_attempts(orch, results + retried)
+        orch.stop()
+        await orch.close()
+        return results, retried, attempts
+
+    results, retried, attempts = asyncio.run(main())
+    assert not results[0]['success'] and results[0]['error']['code'] == 'PollError'
+    assert 'connection reset' in results[0]['error']['message']
+    assert results[1]['success']
+    assert [attempt.get('poll_error') for attempt in attempts[0]] == ['connection reset']
+    # the failure is retried like any other
+    assert retried[0]['success']
+    assert [attempt['success'] for attempt in attempts[2]] == [False, True]
@@ -0,0 +1,66 @@
+import asyncio
+
+from DispatchOrder import PrioritySemaphore, get_dispatch_order, get_downstream_lengths
+from conftest import get_orchestrator
+from fake_executor import FakeExecutor
+
+
+def test_dispatch_order_goes_from_the_highest_priority():
+    # longest_first uses the predicted runtimes as priorities, actions without a prediction go last in their list order
+    assert get_dispatch_order([0.5, None, 2, 1, None, 2]) == [2, 5, 3, 0, 1, 4]
+
+
+def test_downstream_lengths_follow_the_longest_chain():
+    runtimes = {'split': 1, 'transcode': 5, 'combine': 2, 'thumbnail': 1}
+    dependents = {'split': {'transcode', 'thumbnail'}, 'transcode': {'combine', 'transcode'}}
+    lengths = get_downstream_lengths(runtimes, dependents)
+
+    assert lengths == {'split': 7, 'transcode': 2, 'combine': 0, 'thumbnail': 0}
+    # critical_path priorities are the runtime plus the work after the action
+    priorities = [runtimes[name] + lengths[name] for name in ['thumbnail', 'combine', 'split', 'transcode']]
+    assert get_dispatch_order(priorities) == [2, 3, 1, 0]
+
+
+def test_priority_semaphore_wakes_the_highest_priority_first():
+    async def main():
+        semaphore = PrioritySemaphore(1)
+        await semaphore.acquire()
+        woken = []
+
+        async def _wait(name, priority):
+            await semaphore.acquire(priority)
+            woken.append(name)
+            semaphore.release()
+
+        waiters = [asyncio.create_task(_wait(name, priority))
+                   for name, priority in [('low', 1), ('none', None), ('high', 5), ('high-later', 5)]]
+        await asyncio.sleep(0)
+        semaphore.release()
+        await asyncio.gather(*waiters)
+        return woken, semaphore.value
+
+    woken, value = asyncio.run(main())
+    assert woken == ['high', 'high-later', 'low', 'none']
+    assert value == 1
+
+
+def test_longest_first_invokes_the_longest_predicted_action_first(log_file):
+    async def main():
+        executor = FakeExecutor()
+        orch = get_orchestrator(None, log_file, executor=executor)
+        # earlier runs give the predicted runtimes
+        orch.start('longest-first-test')
+        await orch.make_action([orch.prepare_action('short-action', {'runtime': 0.01}),
+                                orch.prepare_action('long-action', {'runtime': 0.1})], parallelisation=2)
+        orch.stop()
+
+        orch.start('longest-first-test')
+        num_invocations = len(executor.invocations)
+        await orch.make_action([orch.prepare_action('short-action', {'runtime': 0.01, 'index': i}) for i in range(2)] +
+                               [orch.prepare_action('long-action', {'runtime': 0.1})],
+                               parallelisation=1, dispatch_order='longest_first')
+        orch.stop()
+        await orch.close()
+        return executor.names()[num_invocations:]
+
+    assert asyncio.run(main()) == ['long-action', 'short-action', 'short-action']
@@ -0,0 +1,59 @@
+import asyncio
+
+import pytest
+
+from OpenwhiskClient import OpenwhiskClient, ThrottledException
+from conftest import auth, start_fake
+
+
+def get_wait_time(record):
+    return [annotation['value'] for annotation in record['annotations'] if annotation['key'] == 'waitTime'][0]
+
+
+async def invoke_all(url, num_invocations):
+    """
+    Invokes num_invocations activations of 0.2 seconds at once, and returns their records once they have all ended.
+    """
+    http = OpenwhiskClient(auth)
+    try:
+        responses = await asyncio.gather(*[http.post(f'{url}/guest/actions/queued', {'runtime': 0.2, 'index': i})
+                                           for i in range(num_invocations)])
+        records = []
+        for response in responses:
+            record = {}
+            while 'end' not in record:
+                await asyncio.sleep(0.05)
+                record = await http.get(f"{url}/guest/activations/{response['activationId']}")
+            records.append(record)
+        return records
+    finally:
+        await http.close()
+
+
+def test_queued_activations_report_their_wait_time():
+    async def main():
+        fake, url = await start_fake(max_concurrent=1, queue=True)
+        try:
+            return await invoke_all(url, 3)
+        finally:
+            await fake.stop()
+
+    records = sorted(asyncio.run(main()), key=lambda record: record['start'])
+    # each activation starts once the one before it has ended
+    assert [later['start'] - earlier['end'] for earlier, later in zip(records, records[1:])] == [0, 0]
+    waits = [get_wait_time(record) for record in records]
+    assert waits[0] < 50
+    assert 150 <= waits[1] < 300 and 350 <= waits[2] < 500
+
+
+def test_activations_over_the_limit_are_rejected_without_queue():
+    async def main():
+        fake, url = await start_fake(max_concurrent=1)
+        try:
+            return await invoke_all(url, 2)
+        finally:
+            await fake.stop()
+
+    with pytest.raises(ThrottledException) as e:
+        asyncio.run(main())
+    assert e.value.status == 429
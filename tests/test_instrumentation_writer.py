@@ -0,0 +1,80 @@
+import asyncio
+import logging
+
+import mongomock
+
+from pymongo import InsertOne, UpdateOne
+
+from InstrumentationWriter import InstrumentationWriter
+
+
+class FlakyCollection:
+    """
+    Fails the first bulk writes it is given as a dropped connection would, and passes the others to the collection.
+    """
+
+    def __init__(self, db_collection, failures) -> None:
+        self.db_collection = db_collection
+        self.failures = failures
+        self.num_writes = 0
+
+    def bulk_write(self, operations, ordered=True):
+        self.num_writes += 1
+        if self.failures > 0:
+            self.failures -= 1
+            raise Exception('connection reset')
+        return self.db_collection.bulk_write(operations, ordered=ordered)
+
+
+def get_writer(db_collection, **kwargs):
+    return InstrumentationWriter(db_collection, logging.getLogger('tests'), flush_interval=0.01, retry_backoff=0.01, **kwargs)
+
+
+def test_updates_are_written_in_order():
+    async def main():
+        db_collection = mongomock.MongoClient().db.attempts
+        writer = get_writer(db_collection, max_batch=3)
+        await writer.write(InsertOne({'_id': 1, 'attempts': []}))
+        for i in range(20):
+            await writer.write(UpdateOne({'_id': 1}, {'$push': {'attempts': i}}))
+            if i % 7 == 0:
+                # flush may run in another thread while the flushing task writes
+                await asyncio.to_thread(writer.flush)
+        await writer.close()
+        return db_collection.find_one({'_id': 1})['attempts']
+
+    assert asyncio.run(main()) == list(range(20))
+
+
+def test_updates_after_a_failed_update_are_written():
+    async def main():
+        db_collection = mongomock.MongoClient().db.attempts
+        writer = get_writer(db_collection)
+        await writer.write([InsertOne({'_id': 1, 'attempts': []}), InsertOne({'_id': 1}),
+                            UpdateOne({'_id': 1}, {'$push': {'attempts': 0}})])
+        await writer.close()
+        return db_collection.find_one({'_id': 1})['attempts']
+
+    assert asyncio.run(main()) == [0]
+
+
+def test_failed_batch_is_retried():
+    async def main():
+        db_collection = FlakyCollection(mongomock.MongoClient().db.attempts, failures=2)
+        writer = get_writer(db_collection, max_retries=3)
+        await writer.write([InsertOne({'_id': 1, 'attempts': []}), UpdateOne({'_id': 1}, {'$push': {'attempts': 0}})])
+        await writer.close()
+        return db_collection.num_writes, db_collection.db_collection.find_one({'_id': 1})['attempts']
+
+    assert asyncio.run(main()) == (3, [0])
+
+
+def test_batch_is_dropped_after_max_retries():
+    async def main():
+        db_collection = FlakyCollection(mongomock.MongoClient().db.attempts, failures=100)
+        writer = get_writer(db_collection, max_retries=2)
+        await writer.write(InsertOne({'_id': 1}))
+        await writer.close()
+        return db_collection.num_writes, db_collection.db_collection.count_documents({})
+
+    assert asyncio.run(main()) == (3, 0)
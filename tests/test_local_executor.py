@@ -0,0 +1,46 @@
+import asyncio
+import os
+
+from datetime import datetime
+
+from LocalExecutor import LocalExecutor
+
+
+ACTIONS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'local_actions.py')
+
+
+def get_executor():
+    return LocalExecutor({name: '{}:{}'.format(ACTIONS_FILE, name) for name in ['square', 'fail', 'crash']}, max_workers=2)
+
+
+async def run(executor, action_name, params):
+    activation_id = await executor.invoke(action_name, params)
+    return (await asyncio.wait_for(executor.track(activation_id, datetime.utcnow()), 30)).record
+
+
+def test_action_results_and_errors_are_activation_records():
+    async def main():
+        executor = get_executor()
+        records = [await run(executor, 'square', {'value': 3}), await run(executor, 'fail', {})]
+        await executor.close()
+        return records
+
+    square, fail = asyncio.run(main())
+    assert square['response'] == {'result': {'value': 9}, 'status': 'success', 'success': True}
+    assert not fail['response']['success']
+    assert fail['response']['result']['error'] == 'An error has occurred: failed on purpose'
+
+
+def test_dead_worker_fails_its_activation_and_the_pool_is_replaced():
+    async def main():
+        executor = get_executor()
+        crashed = await run(executor, 'crash', {})
+        # a broken pool does not take any more runs, the next invocation gets a new one
+        after = await run(executor, 'square', {'value': 2})
+        await executor.close()
+        return crashed, after
+
+    crashed, after = asyncio.run(main())
+    assert not crashed['response']['success']
+    assert crashed['response']['result']['error'].startswith('An error has occurred: ')
+    assert after['response']['result'] == {'value': 4}
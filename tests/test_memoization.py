@@ -0,0 +1,86 @@
+import asyncio
+
+from datetime import datetime
+from types import SimpleNamespace
+
+from conftest import get_orchestrator, start_fake
+
+
+class NoSuchKey(Exception):
+    code = 'NoSuchKey'
+
+
+class FakeMinio:
+    """
+    Answers the stat calls made for checking the objects of memoized actions.
+    """
+
+    def __init__(self, objects) -> None:
+        # bucket/file_name -> (etag, size)
+        self.objects = objects
+
+    def stat_object(self, bucket, file_name):
+        if f'{bucket}/{file_name}' not in self.objects:
+            raise NoSuchKey()
+        etag, size = self.objects[f'{bucket}/{file_name}']
+        return SimpleNamespace(etag=etag, size=size)
+
+
+def test_memoized_actions_are_not_invoked_again(log_file):
+    def get_actions(orch):
+        return [orch.prepare_action('memoized', {'chunk': i}) for i in range(3)] + \
+            [orch.prepare_action('random', {'chunk': 0}, memoize=False)]
+
+    async def main():
+        fake, url = await start_fake()
+        orch = get_orchestrator(url, log_file)
+        orch.start('memoization-test')
+        first = await orch.make_action(get_actions(orch), parallelisation=4, memoize=True)
+        orch.stop()
+        num_invocations = len(fake.invocation_times)
+
+        orch.start('memoization-test')
+        second = await orch.make_action(get_actions(orch), parallelisation=4, memoize=True)
+        orch.stop()
+        await orch.close()
+        await fake.stop()
+        return first, second, len(fake.invocation_times) - num_invocations
+
+    first, second, num_invocations = asyncio.run(main())
+    assert num_invocations == 1
+    assert [res.get('memoized_from') for res in second] == [res['action_id'] for res in first[:3]] + [None]
+    assert [res['result'] for res in second[:3]] == [res['result'] for res in first[:3]]
+
+
+def test_memoized_action_whose_object_changed_runs_again(log_file):
+    def get_actions(orch):
+        # actions with the same name and parameters in the other tests would be memoized too
+        return [orch.prepare_action('memoized-reader', {'chunk': i}) for i in range(2)]
+
+    async def main():
+        fake, url = await start_fake()
+        orch = get_orchestrator(url, log_file)
+        minio = FakeMinio({'input/0': ('etag-0', 10), 'input/1': ('etag-1', 10)})
+        orch.store.client = minio
+        orch.start('memoization-objects-test')
+        first = await orch.make_action(get_actions(orch), parallelisation=2, memoize=True)
+        orch.instrumentation.flush()
+        # the actions read their input objects
+        orch.store.events_collection.insert_many([
+            {'action_id': res['action_id'], 'method': 'get', 'orch_id': orch.orch_id, 'object': f'input/{i}', 'size': 10,
+             'etag': f'etag-{i}', 'time': datetime.utcnow(), 'activation_id': None} for i, res in enumerate(first)])
+        orch.stop()
+        minio.objects['input/1'] = ('etag-changed', 10)
+        num_invocations = len(fake.invocation_times)
+
+        orch.start('memoization-objects-test')
+        second = await orch.make_action(get_actions(orch), parallelisation=2, memoize=True)
+        orch.stop()
+        await orch.close()
+        await fake.stop()
+        return first, second, len(fake.invocation_times) - num_invocations
+
+    first, second, num_invocations = asyncio.run(main())
+    assert num_invocations == 1
+    assert second[0].get('memoized_from') == first[0]['action_id']
+    assert second[1].get('memoized_from') is None and second[1]['success']
@@ -0,0 +1,103 @@
+import asyncio
+
+from pymongo import UpdateOne
+
+from object_store import metadata
+from object_store.store import get_mongo_client
+
+
+class FakeMotorCollection:
+    """
+    Makes the calls of a motor collection on the synchronous collection, and records them.
+    """
+
+    def __init__(self, sync_collection, calls) -> None:
+        self.sync = sync_collection
+        self.calls = calls
+
+    def find(self, query, projection=None, sort=None, limit=0):
+        self.calls.append('find')
+        documents = list(self.sync.find(query, projection, sort=sort, limit=limit))
+
+        class Cursor:
+            async def to_list(self, length):
+                return documents
+
+        return Cursor()
+
+    async def find_one(self, query, projection=None):
+        self.calls.append('find_one')
+        return self.sync.find_one(query, projection)
+
+    async def insert_one(self, document):
+        self.calls.append('insert_one')
+        return self.sync.insert_one(document)
+
+    async def insert_many(self, documents):
+        self.calls.append('insert_many')
+        return self.sync.insert_many(documents)
+
+    async def update_one(self, query, update, upsert=False):
+        self.calls.append('update_one')
+        return self.sync.update_one(query, update, upsert=upsert)
+
+    async def bulk_write(self, operations, ordered=True):
+        self.calls.append('bulk_write')
+        return self.sync.bulk_write(operations, ordered=ordered)
+
+
+class FakeMotorDatabase:
+    def __init__(self, database, calls) -> None:
+        self.database = database
+        self.calls = calls
+
+    def __getitem__(self, name):
+        return FakeMotorCollection(get_mongo_client({})[self.database][name], self.calls)
+
+
+class FakeMotorClient:
+    """
+    Stands in for AsyncIOMotorClient, on the same in-memory database as the synchronous client.
+    """
+    calls = []
+
+    def __init__(self, host, port) -> None:
+        pass
+
+    def __getitem__(self, database):
+        return FakeMotorDatabase(database, self.calls)
+
+    def close(self):
+        pass
+
+
+async def use_collection(collection):
+    await collection.insert_one({'_id': 1, 'values': []})
+    await collection.insert_many([{'_id': 2}, {'_id': 3}])
+    await collection.update_one({'_id': 1}, {'$push': {'values': 0}})
+    await collection.bulk_write([UpdateOne({'_id': 1}, {'$push': {'values': 1}})])
+    return await collection.find({}, sort=[('_id', -1)], limit=2), await collection.find_one({'_id': 1})
+
+
+def test_calls_run_in_worker_threads_without_motor(monkeypatch):
+    monkeypatch.setattr(metadata, 'AsyncIOMotorClient', None)
+    collection = metadata.MetadataStore(database='metadata-tests').collection('thread')
+
+    documents, document = asyncio.run(use_collection(collection))
+    assert [document['_id'] for document in documents] == [3, 2]
+    assert document['values'] == [0, 1]
+    assert collection.sync.find_one({'_id': 1})['values'] == [0, 1]
+
+
+def test_calls_are_awaited_with_motor_when_it_is_installed(monkeypatch):
+    monkeypatch.setattr(metadata, 'AsyncIOMotorClient', FakeMotorClient)
+    monkeypatch.setattr(metadata, 'async_clients', {})
+    FakeMotorClient.calls.clear()
+    collection = metadata.MetadataStore(database='metadata-tests').collection('motor')
+
+    documents, document = asyncio.run(use_collection(collection))
+    assert FakeMotorClient.calls == ['insert_one', 'insert_many', 'update_one', 'bulk_write', 'find', 'find_one']
+    assert [document['_id'] for document in documents] == [3, 2]
+    assert document['values'] == [0, 1]
+    # the documents are in the same database as for the synchronous client
+    assert collection.sync.find_one({'_id': 1})['values'] == [0, 1]
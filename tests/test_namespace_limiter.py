@@ -0,0 +1,89 @@
+import asyncio
+import json
+import multiprocessing
+import os
+
+from NamespaceLimiter import NamespaceLimiter
+
+
+def acquire_in_process(state_dir, connection):
+    """
+    Takes a lease in another process and exits without releasing it, like an orchestrator that died.
+    """
+    limiter = NamespaceLimiter('tests', max_concurrent=2, state_dir=state_dir)
+    connection.send(asyncio.run(limiter.try_acquire('other')))
+
+
+def test_leases_bound_the_activations_in_flight(tmp_path):
+    async def main():
+        limiter = NamespaceLimiter('tests', max_concurrent=2, state_dir=str(tmp_path))
+        # limiters with the same name share their state, like orchestrators in other processes
+        other = NamespaceLimiter('tests', max_concurrent=2, state_dir=str(tmp_path))
+        first = await limiter.try_acquire('a')
+        second = await other.try_acquire('b')
+        refused = await limiter.try_acquire('a')
+        await other.release(second)
+        third = await limiter.try_acquire('a')
+        return first, second, refused, third
+
+    first, second, refused, third = asyncio.run(main())
+    assert first is not None and second is not None and third is not None
+    assert refused is None
+
+
+def test_concurrent_acquires_never_exceed_the_limit(tmp_path):
+    async def main():
+        limiters = [NamespaceLimiter('tests', max_concurrent=5, state_dir=str(tmp_path)) for _ in range(4)]
+        # every attempt updates the state file in its own worker thread, under the file lock
+        return await asyncio.gather(*[limiter.try_acquire(str(i)) for i in range(10) for limiter in limiters])
+
+    assert sum(1 for lease in asyncio.run(main()) if lease is not None) == 5
+
+
+def test_token_bucket_bounds_the_rate(tmp_path):
+    async def main():
+        limiter = NamespaceLimiter('tests', rate=20, burst=2, state_dir=str(tmp_path))
+        leases = [await limiter.try_acquire('a') for _ in range(3)]
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        await limiter.acquire('a')
+        return leases, loop.time() - start
+
+    leases, waited = asyncio.run(main())
+    assert [lease is not None for lease in leases] == [True, True, False]
+    assert 0.02 <= waited < 1
+
+
+def test_waiting_orchestration_below_its_share_goes_first(tmp_path):
+    async def main():
+        limiter = NamespaceLimiter('tests', max_concurrent=3, state_dir=str(tmp_path))
+        big = [await limiter.acquire('big') for _ in range(2)]
+        small = await limiter.acquire('small')
+        await limiter.release(big[0])
+        # small holds fewer leases than big and is waiting, so the freed slot is not taken by big
+        waiting = asyncio.create_task(limiter.acquire('small'))
+        await asyncio.sleep(0.05)
+        refused = await limiter.try_acquire('big')
+        return small, await waiting, refused
+
+    small, granted, refused = asyncio.run(main())
+    assert small is not None and granted is not None
+    assert refused is None
+
+
+def test_leases_of_dead_processes_are_dropped(tmp_path):
+    context = multiprocessing.get_context('spawn')
+    connection, child_connection = context.Pipe()
+    process = context.Process(target=acquire_in_process, args=(str(tmp_path), child_connection))
+    process.start()
+    assert connection.recv() is not None
+    process.join()
+
+    with open(os.path.join(str(tmp_path), 'openwhisk-limiter-tests.json')) as state_file:
+        assert len(json.load(state_file)['leases']) == 1
+
+    async def main():
+        limiter = NamespaceLimiter('tests', max_concurrent=2, state_dir=str(tmp_path))
+        return await asyncio.wait_for(asyncio.gather(limiter.acquire('a'), limiter.acquire('a')), 5)
+
+    assert all(lease is not None for lease in asyncio.run(main()))
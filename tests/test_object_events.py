@@ -0,0 +1,154 @@
+from datetime import datetime, timedelta
+
+import mongomock
+import pytest
+
+from bson import ObjectId
+
+import object_store.store
+from object_store.migrate import migrate
+from object_store.store import ObjectStore
+
+
+class CountingCollection:
+    """
+    Passes every call to the collection, and counts the calls to find.
+    """
+
+    def __init__(self, db_collection) -> None:
+        self.db_collection = db_collection
+        self.num_finds = 0
+
+    def find(self, *args, **kwargs):
+        self.num_finds += 1
+        return self.db_collection.find(*args, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self.db_collection, name)
+
+
+@pytest.fixture
+def store(monkeypatch):
+    # a database of its own, so that the events of the other tests are not found
+    monkeypatch.setattr(object_store.store, 'client', mongomock.MongoClient())
+    return ObjectStore()
+
+
+def get_time(seconds):
+    return datetime(2026, 1, 1) + timedelta(seconds=seconds)
+
+
+def record(store, action_id, method, key, seconds, activation_id=None, orch_id=None, size=1):
+    """
+    Records an event as the object store of the action would have.
+    """
+    store.events_collection.insert_one({
+        'action_id': action_id, 'method': method, 'orch_id': orch_id or ObjectId(), 'object': key, 'size': size,
+        'time': get_time(seconds), 'activation_id': activation_id})
+
+
+def test_writers_of_ignored_activations_do_not_own_the_key(store):
+    first, second, third = ObjectId(), ObjectId(), ObjectId()
+    record(store, first, 'put', 'bucket/a', 1, activation_id='first-loser')
+    record(store, second, 'put', 'bucket/a', 2, activation_id='second')
+    record(store, first, 'put', 'bucket/a', 3, activation_id='first-winner')
+    record(store, third, 'put', 'bucket/b', 4, activation_id='third')
+    store.ignore_activation(first, 'first-loser')
+
+    assert store.get_action_ids_for_objects(['bucket/a', 'bucket/missing', 'bucket/b']) == [second, third]
+    # every writer of a key, ordered by its latest write, keys without one are left out
+    assert store.get_all_action_ids_for_objects(['bucket/missing', 'bucket/a']) == [[second, first]]
+
+
+def test_writers_are_ordered_by_their_latest_write(store):
+    first, second = ObjectId(), ObjectId()
+    record(store, first, 'put', 'bucket/a', 1, activation_id='first')
+    record(store, second, 'put', 'bucket/a', 2, activation_id='second')
+    record(store, first, 'put', 'bucket/a', 3, activation_id='first-retry')
+    store.ignore_activation(second, 'second')
+
+    assert store.get_all_action_ids_for_objects(['bucket/a']) == [[first]]
+    store.db_collection.delete_many({})
+    assert store.get_all_action_ids_for_objects(['bucket/a']) == [[second, first]]
+
+
+def test_metrics_for_objects_use_the_first_put_and_the_last_get(store):
+    writer, reader = ObjectId(), ObjectId()
+    orch_id = ObjectId()
+    record(store, writer, 'put', 'bucket/a', 1, activation_id='ignored', orch_id=orch_id, size=5)
+    record(store, writer, 'put', 'bucket/a', 2, activation_id='writer', orch_id=orch_id, size=10)
+    record(store, reader, 'get', 'bucket/a', 3, activation_id='reader', orch_id=orch_id, size=10)
+    record(store, reader, 'get', 'bucket/a', 4, activation_id='ignored-reader', orch_id=orch_id, size=5)
+    store.ignore_activation(writer, 'ignored')
+    store.ignore_activation(reader, 'ignored-reader')
+
+    [metrics] = store.get_metrics_for_objects(str(orch_id), ['bucket/a', 'bucket/missing'])
+    assert (metrics['put_time'], metrics['put_size']) == (get_time(2), 10)
+    assert (metrics['get_time'], metrics['get_size']) == (get_time(3), 10)
+    assert metrics['lifetime'] == timedelta(seconds=1)
+    assert store.get_details_object_write(orch_id, 'bucket/a')['_id'] == writer
+    assert store.get_details_object_write(ObjectId(), 'bucket/a') is None
+
+
+def test_ignored_activations_are_only_looked_up_for_events_of_activations(store):
+    action_id = ObjectId()
+    record(store, action_id, 'put', 'bucket/a', 1)
+    store.db_collection = CountingCollection(store.db_collection)
+
+    # events without an activation id, e.g. migrated ones, can not be of an ignored activation
+    assert store.get_action_details(action_id)['objects_put'][0]['object'] == 'bucket/a'
+    assert store.get_all_action_ids_for_objects(['bucket/a']) == [[action_id]]
+    assert store.db_collection.num_finds == 0
+
+    record(store, action_id, 'put', 'bucket/b', 2, activation_id='activation')
+    assert store.get_action_ids_for_objects(['bucket/b']) == [action_id]
+    assert store.db_collection.num_finds == 1
+
+
+def add_action_document(store, orch_id):
+    """
+    Adds an action_store document with its objects recorded as arrays, as they were before object events.
+    """
+    action_id = ObjectId()
+    store.db_collection.insert_one({
+        '_id': action_id, 'action_id': str(action_id), 'orch_id': str(orch_id),
+        'objects_put': [{'object': 'bucket/a', 'size': 1, 'time': get_time(1)}],
+        'objects_get': [{'object': 'bucket/b', 'size': 2, 'time': get_time(2), 'orch_id': orch_id}],
+        'error_get': [{'object': 'bucket/c', 'time': get_time(3)}],
+        'ignored_activations': ['loser']})
+    return action_id
+
+
+def get_migrated_events(store, action_id):
+    return sorted((event['method'], event['object'], event['orch_id'])
+                  for event in store.events_collection.find({'action_id': action_id}))
+
+
+def test_migration_can_be_run_again(store):
+    orch_id = ObjectId()
+    action_id = add_action_document(store, orch_id)
+
+    assert migrate({}) == (1, 3)
+    assert migrate({}) == (0, 0)
+
+    assert get_migrated_events(store, action_id) == [
+        ('error_get', 'bucket/c', orch_id), ('get', 'bucket/b', orch_id), ('put', 'bucket/a', orch_id)]
+    # only the ignored activations are left in the document
+    assert store.db_collection.find_one({'_id': action_id}) == {'_id': action_id, 'ignored_activations': ['loser']}
+    assert store.get_action_ids_for_objects(['bucket/a']) == [action_id]
+
+
+def test_migration_keeping_the_arrays_replaces_the_migrated_events(store):
+    orch_id = ObjectId()
+    action_id = add_action_document(store, orch_id)
+    document = store.db_collection.find_one({'_id': action_id})
+    record(store, action_id, 'put', 'bucket/d', 4, activation_id='recorded', orch_id=orch_id)
+
+    assert migrate({}, keep_arrays=True) == (1, 3)
+    assert migrate({}, keep_arrays=True) == (1, 3)
+
+    assert store.db_collection.find_one({'_id': action_id}) == document
+    # the events migrated by the first run are replaced, the ones recorded as events are kept
+    assert get_migrated_events(store, action_id) == [
+        ('error_get', 'bucket/c', orch_id), ('get', 'bucket/b', orch_id), ('put', 'bucket/a', orch_id),
+        ('put', 'bucket/d', orch_id)]
@@ -0,0 +1,83 @@
+import asyncio
+
+from datetime import datetime
+
+from conftest import get_orchestrator
+from fake_executor import FakeExecutor
+
+
+class Objects:
+    """
+    Objects written by the writer actions and read by the reader actions, a reader fails with NoSuchKey for a missing one.
+    """
+
+    def __init__(self) -> None:
+        self.keys = set()
+
+    def write(self, params):
+        self.keys.add(params['key'])
+        return {'key': params['key']}
+
+    def read(self, params):
+        if params['key'] not in self.keys:
+            return {'error': {'code': 'NoSuchKey', 'message': 'The specified key does not exist.', 'meta': {'key': params['key']}}}
+        return {'key': params['key']}
+
+    def get_executor(self):
+        return FakeExecutor({'writer': self.write, 'reader': self.read})
+
+
+async def write_object(orch, key):
+    """
+    Runs a writer of key and records its put, as the object store of the action would have.
+    """
+    [res] = await orch.make_action([orch.prepare_action('writer', {'key': key})])
+    orch.store.events_collection.insert_one({
+        'action_id': res['action_id'], 'method': 'put', 'orch_id': orch.orch_id, 'object': key, 'size': 1,
+        'time': datetime.utcnow(), 'activation_id': None})
+    return res
+
+
+def test_every_orchestration_recovers_a_missing_object(log_file):
+    async def run_orchestration(objects, key):
+        executor = objects.get_executor()
+        orch = get_orchestrator(None, log_file, executor=executor)
+        orch.start('object-recovery-test')
+        await write_object(orch, key)
+        objects.keys.discard(key)
+        [res] = await orch.make_action([orch.prepare_action('reader', {'key': key})], retries=0)
+        orch.stop()
+        await orch.close()
+        return res, executor.names()
+
+    async def main():
+        objects = Objects()
+        # the second orchestration loses the same key as the first one, and still has to recover it
+        return [await run_orchestration(objects, 'bucket/shared') for _ in range(2)]
+
+    for res, names in asyncio.run(main()):
+        assert res['success']
+        assert names == ['writer', 'reader', 'writer', 'reader']
+
+
+def test_missing_object_reruns_its_writer_then_the_reader(log_file):
+    async def main():
+        objects = Objects()
+        executor = objects.get_executor()
+        orch = get_orchestrator(None, log_file, executor=executor, retry_backoff=0.01)
+        orch.start('object-recovery-order-test')
+        writer = await write_object(orch, 'bucket/lost')
+        objects.keys.discard('bucket/lost')
+        results = await orch.make_action([orch.prepare_action('reader', {'key': 'bucket/lost'}),
+                                          orch.prepare_action('other', {'runtime': 0.3})], parallelisation=2, retries=0)
+        orch.stop()
+        await orch.close()
+        return writer, executor, results
+
+    writer, executor, results = asyncio.run(main())
+    assert [res['success'] for res in results] == [True, True]
+    assert executor.names() == ['writer', 'reader', 'other', 'writer', 'reader']
+    # the writer rerun is the action that wrote the object, and the reader is retried even with retries=0
+    assert executor.invocations[3][1]['context']['action_id'] == str(writer['action_id'])
+    # the recovery does not wait for the other action of the batch
+    assert executor.activations['activation-4'][0] < executor.activations['activation-2'][0] + 0.3
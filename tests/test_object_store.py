@@ -0,0 +1,427 @@
+import hashlib
+import inspect
+import io
+import os
+import threading
+import time
+
+from types import SimpleNamespace
+
+import minio
+import pytest
+
+from bson import ObjectId
+from minio.datatypes import ListPartsResult
+
+from object_store.cache import ObjectCache
+from object_store.store import MIN_PART_SIZE, NoSuchKeyException, ObjectStore
+
+
+class NoSuchKey(Exception):
+    code = 'NoSuchKey'
+
+    def __init__(self, resource) -> None:
+        super().__init__(resource)
+        self._resource = resource
+
+
+class Response:
+    def __init__(self, data, etag) -> None:
+        self.data = data
+        self.body = io.BytesIO(data)
+        self.headers = {'Content-Length': str(len(data)), 'ETag': '"{}"'.format(etag)}
+
+    def readinto(self, buffer):
+        return self.body.readinto(buffer)
+
+    def stream(self, chunk_size):
+        for offset in range(0, len(self.data), chunk_size):
+            yield self.data[offset:offset + chunk_size]
+
+    def close(self):
+        pass
+
+    def release_conn(self):
+        pass
+
+
+class FakeMinio:
+    """
+    Keeps the objects in memory and implements the calls made by ObjectStore, including the multipart ones.
+    The upload or download of the part numbered fail_part fails, like with a dropped connection.
+    """
+
+    def __init__(self) -> None:
+        self.objects = {}
+        self.uploads = {}
+        self.fail_part = None
+        self.part_calls = []
+        self.aborted = []
+        self.lock = threading.Lock()
+
+    def __get_etag(self, data):
+        return hashlib.md5(data).hexdigest()
+
+    def __call_part(self, number):
+        with self.lock:
+            self.part_calls.append(number)
+        if number == self.fail_part:
+            raise Exception('connection reset')
+
+    def fput_object(self, bucket, file_name, file_path):
+        with open(file_path, 'rb') as input_file:
+            self.objects[(bucket, file_name)] = input_file.read()
+        return SimpleNamespace(etag=self.__get_etag(self.objects[(bucket, file_name)]))
+
+    def stat_object(self, bucket, file_name):
+        if (bucket, file_name) not in self.objects:
+            raise NoSuchKey(f'/{bucket}/{file_name}')
+        data = self.objects[(bucket, file_name)]
+        return SimpleNamespace(size=len(data), etag=self.__get_etag(data))
+
+    def put_object(self, bucket, file_name, data, length, part_size=None, num_parallel_uploads=None):
+        # like minio, a stream of unknown length is read in parts until it is exhausted
+        chunks = []
+        while True:
+            chunk = data.read(length if length >= 0 else part_size)
+            if not chunk:
+                break
+            chunks.append(chunk)
+        self.objects[(bucket, file_name)] = b''.join(chunks)
+        return SimpleNamespace(etag=self.__get_etag(self.objects[(bucket, file_name)]))
+
+    def get_object(self, bucket, file_name, offset=0, length=0, request_headers=None):
+        if (bucket, file_name) not in self.objects:
+            raise NoSuchKey(f'/{bucket}/{file_name}')
+        data = self.objects[(bucket, file_name)]
+        if request_headers is not None:
+            assert request_headers['If-Match'] == self.__get_etag(data)
+        self.__call_part(offset // MIN_PART_SIZE + 1)
+        return Response(data[offset:offset + length] if length else data[offset:], self.__get_etag(data))
+
+    def _create_multipart_upload(self, bucket, file_name, headers):
+        upload_id = os.urandom(4).hex()
+        self.uploads[upload_id] = {}
+        return upload_id
+
+    def _upload_part(self, bucket, file_name, data, headers, upload_id, number):
+        self.__call_part(number)
+        self.uploads[upload_id][number] = data
+        return 'part-{}'.format(number)
+
+    def _list_parts(self, bucket, file_name, upload_id, part_number_marker=None):
+        if upload_id not in self.uploads:
+            raise Exception('NoSuchUpload')
+        # the response is parsed by minio, whose parts differ between versions, e.g. in the type of their numbers
+        parts = ''.join('<Part><PartNumber>{}</PartNumber><ETag>"part-{}"</ETag><Size>{}</Size></Part>'.format(number, number, len(data))
+                        for number, data in sorted(self.uploads[upload_id].items()))
+        return ListPartsResult(SimpleNamespace(data='<ListPartsResult xmlns="http://s3.amazonaws.com/doc/2006-03-01/">'
+                                                    '<IsTruncated>false</IsTruncated>{}</ListPartsResult>'.format(parts).encode()))
+
+    def _abort_multipart_upload(self, bucket, file_name, upload_id):
+        self.uploads.pop(upload_id)
+        self.aborted.append(upload_id)
+
+    def _complete_multipart_upload(self, bucket, file_name, upload_id, parts):
+        uploaded = self.uploads.pop(upload_id)
+        self.objects[(bucket, file_name)] = b''.join(uploaded[part.part_number] for part in parts)
+        return SimpleNamespace(etag=self.__get_etag(self.objects[(bucket, file_name)]))
+
+
+class CountingCollection:
+    """
+    Passes every call to the collection, and keeps the documents of every insert_many.
+    """
+
+    def __init__(self, db_collection) -> None:
+        self.db_collection = db_collection
+        self.inserts = []
+
+    def insert_many(self, documents, ordered=True):
+        self.inserts.append(list(documents))
+        return self.db_collection.insert_many(documents, ordered=ordered)
+
+    def __getattr__(self, name):
+        return getattr(self.db_collection, name)
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    # objects are transferred from and to "bucket/file_name" in the working directory
+    monkeypatch.chdir(tmp_path)
+    os.makedirs('bucket')
+    store = ObjectStore(part_size=MIN_PART_SIZE, part_workers=1)
+    store.client = FakeMinio()
+    return store
+
+
+def get_context():
+    return {'action_id': str(ObjectId()), 'orch_id': str(ObjectId())}
+
+
+def get_events(store, context, method):
+    return list(store.events_collection.find({'action_id': ObjectId(context['action_id']), 'method': method}))
+
+
+def test_interrupted_multipart_upload_resumes_with_the_missing_parts(store):
+    data = os.urandom(3 * MIN_PART_SIZE - 1)
+    with open('bucket/large', 'wb') as object_file:
+        object_file.write(data)
+    context = get_context()
+
+    # the parts are transferred one at a time, the last one fails
+    store.client.fail_part = 3
+    with pytest.raises(Exception):
+        store.put_sync(context, 'bucket', 'large')
+    assert os.path.exists('bucket/large.upload')
+
+    store.client.fail_part = None
+    store.client.part_calls = []
+    store.put_sync(context, 'bucket', 'large')
+
+    assert store.client.part_calls == [3]
+    assert store.client.objects[('bucket', 'large')] == data
+    assert not os.path.exists('bucket/large.upload')
+    [event] = get_events(store, context, 'put')
+    assert (event['parts'], event['resumed_parts']) == (3, 2)
+
+
+def test_upload_of_a_changed_file_aborts_the_interrupted_upload(store):
+    with open('bucket/large', 'wb') as object_file:
+        object_file.write(os.urandom(3 * MIN_PART_SIZE - 1))
+    store.client.fail_part = 3
+    with pytest.raises(Exception):
+        store.put_sync(get_context(), 'bucket', 'large')
+    [stale_upload] = store.client.uploads
+
+    data = os.urandom(3 * MIN_PART_SIZE - 1)
+    with open('bucket/large', 'wb') as object_file:
+        object_file.write(data)
+    # the modification time may not change within its resolution
+    os.utime('bucket/large', (time.time() + 10, time.time() + 10))
+    store.client.fail_part = None
+    store.client.part_calls = []
+    store.put_sync(get_context(), 'bucket', 'large')
+
+    assert store.client.aborted == [stale_upload]
+    assert store.client.uploads == {}
+    assert sorted(store.client.part_calls) == [1, 2, 3]
+    assert store.client.objects[('bucket', 'large')] == data
+
+
+def test_minio_has_the_private_multipart_calls_used():
+    # minio has no public api for resuming a multipart upload, these calls are the same in 7.1.8 (the pinned version) and 7.2
+    calls = {
+        '_create_multipart_upload': ['bucket_name', 'object_name', 'headers'],
+        '_upload_part': ['bucket_name', 'object_name', 'data', 'headers', 'upload_id', 'part_number'],
+        '_list_parts': ['bucket_name', 'object_name', 'upload_id', 'max_parts', 'part_number_marker'],
+        '_complete_multipart_upload': ['bucket_name', 'object_name', 'upload_id', 'parts'],
+        '_abort_multipart_upload': ['bucket_name', 'object_name', 'upload_id'],
+    }
+    for name, parameters in calls.items():
+        assert list(inspect.signature(getattr(minio.Minio, name)).parameters)[1:len(parameters) + 1] == parameters
+
+
+def test_interrupted_ranged_download_resumes_with_the_missing_parts(store):
+    data = os.urandom(3 * MIN_PART_SIZE - 1)
+    store.client.objects[('bucket', 'large')] = data
+    context = get_context()
+
+    store.client.fail_part = 3
+    with pytest.raises(Exception):
+        store.get_sync(context, 'bucket', 'large')
+    assert os.path.exists('bucket/large.download') and not os.path.exists('bucket/large')
+
+    store.client.fail_part = None
+    store.client.part_calls = []
+    store.get_sync(context, 'bucket', 'large')
+
+    assert store.client.part_calls == [3]
+    with open('bucket/large', 'rb') as object_file:
+        assert object_file.read() == data
+    assert not os.path.exists('bucket/large.download') and not os.path.exists('bucket/large.part')
+    [event] = get_events(store, context, 'get')
+    assert (event['parts'], event['resumed_parts']) == (3, 2)
+
+
+def test_download_of_a_changed_object_starts_over(store):
+    store.client.objects[('bucket', 'large')] = os.urandom(2 * MIN_PART_SIZE)
+    store.client.fail_part = 2
+    with pytest.raises(Exception):
+        store.get_sync(get_context(), 'bucket', 'large')
+
+    data = os.urandom(2 * MIN_PART_SIZE)
+    store.client.objects[('bucket', 'large')] = data
+    store.client.fail_part = None
+    store.client.part_calls = []
+    store.get_sync(get_context(), 'bucket', 'large')
+
+    assert sorted(store.client.part_calls) == [1, 2]
+    with open('bucket/large', 'rb') as object_file:
+        assert object_file.read() == data
+
+
+def test_missing_object_raises_no_such_key(store):
+    context = get_context()
+    with pytest.raises(NoSuchKeyException):
+        store.get_sync(context, 'bucket', 'missing')
+    [event] = get_events(store, context, 'error_get')
+    assert event['object'] == 'bucket/missing'
+
+
+def test_cached_object_is_not_downloaded_again(store, tmp_path):
+    store.cache = ObjectCache(str(tmp_path / 'cache'), 1024)
+    store.client.objects[('bucket', 'small')] = b'content'
+    context = get_context()
+
+    store.get_sync(context, 'bucket', 'small')
+    os.remove('bucket/small')
+    store.client.part_calls = []
+    store.get_sync(context, 'bucket', 'small')
+    assert store.get_bytes(context, 'bucket', 'small') == b'content'
+
+    assert store.client.part_calls == []
+    with open('bucket/small', 'rb') as object_file:
+        assert object_file.read() == b'content'
+    assert [event['cache_hit'] for event in get_events(store, context, 'get')] == [False, True, True]
+
+
+def test_cache_evicts_the_least_recently_used_copies(tmp_path):
+    cache = ObjectCache(str(tmp_path), 10)
+    cache.add_bytes('bucket', 'a', 'etag-a', b'aaaa')
+    # copies are ordered by their modification time, whose resolution can be coarse
+    time.sleep(0.02)
+    cache.add_bytes('bucket', 'b', 'etag-b', b'bbbb')
+    time.sleep(0.02)
+    # reading a makes b the least recently used
+    assert cache.read('bucket', 'a', 'etag-a') == b'aaaa'
+    time.sleep(0.02)
+    cache.add_bytes('bucket', 'c', 'etag-c', b'cccc')
+
+    assert cache.read('bucket', 'a', 'etag-a') == b'aaaa'
+    assert cache.read('bucket', 'b', 'etag-b') is None
+    assert cache.read('bucket', 'c', 'etag-c') == b'cccc'
+    # an object larger than the cache is not kept
+    cache.add_bytes('bucket', 'd', 'etag-d', b'd' * 11)
+    assert cache.read('bucket', 'd', 'etag-d') is None
+
+
+def test_cache_only_serves_the_copy_of_the_same_version(tmp_path):
+    cache = ObjectCache(str(tmp_path), 1024)
+    cache.add_bytes('bucket', 'a', 'etag-1', b'first')
+    assert cache.read('bucket', 'a', 'etag-2') is None
+
+    cache.add_bytes('bucket', 'a', 'etag-2', b'second')
+    assert cache.read('bucket', 'a', 'etag-2') == b'second'
+    # the copy of the earlier version is removed
+    assert cache.read('bucket', 'a', 'etag-1') is None
+    assert len([name for name in os.listdir(str(tmp_path)) if name.endswith('.cached')]) == 1
+
+
+def test_cache_directory_is_shared(tmp_path):
+    source = tmp_path / 'downloaded'
+    source.write_bytes(b'content')
+    ObjectCache(str(tmp_path / 'cache'), 1024).add_file('bucket', 'a', 'etag', str(source))
+
+    # another process, e.g. another worker of a LocalExecutor, finds the copy
+    target = tmp_path / 'target'
+    assert ObjectCache(str(tmp_path / 'cache'), 1024).copy_to('bucket', 'a', 'etag', str(target))
+    assert target.read_bytes() == b'content'
+
+
+
+def test_files_got_through_the_cache_stay_writable(store, tmp_path):
+    store.cache = ObjectCache(str(tmp_path / 'cache'), 1024)
+    store.client.objects[('bucket', 'small')] = b'content'
+    context = get_context()
+
+    # the downloaded file, kept by the cache, and the file copied out of the cache can both be modified in place
+    for _ in range(2):
+        store.get_sync(context, 'bucket', 'small')
+        with open('bucket/small', 'r+b') as object_file:
+            object_file.write(b'changed')
+
+    assert store.get_bytes(context, 'bucket', 'small') == b'content'
+    assert [event['cache_hit'] for event in get_events(store, context, 'get')] == [False, True, True]
+
+def test_put_many_records_every_upload_with_one_write(store):
+    for name in ['a', 'b', 'c']:
+        with open(f'bucket/{name}', 'wb') as object_file:
+            object_file.write(name.encode() * 10)
+    store.events_collection = CountingCollection(store.events_collection)
+    context = get_context()
+
+    store.put_many(context, 'bucket', ['a', 'b', 'c'])
+
+    assert [store.client.objects[('bucket', name)] for name in ['a', 'b', 'c']] == [b'a' * 10, b'b' * 10, b'c' * 10]
+    [events] = store.events_collection.inserts
+    assert sorted((event['object'], event['method'], event['size']) for event in events) == \
+        [('bucket/a', 'put', 10), ('bucket/b', 'put', 10), ('bucket/c', 'put', 10)]
+
+
+def test_get_many_records_downloads_and_missing_objects_with_one_write(store):
+    for name in ['a', 'b']:
+        store.client.objects[('bucket', name)] = name.encode() * 10
+    store.events_collection = CountingCollection(store.events_collection)
+    context = get_context()
+
+    # the missing object is reported once the others have been downloaded
+    with pytest.raises(NoSuchKeyException) as e:
+        store.get_many(context, 'bucket', ['a', 'missing', 'b'])
+
+    assert e.value.meta['key'] == 'bucket/missing'
+    for name in ['a', 'b']:
+        with open(f'bucket/{name}', 'rb') as object_file:
+            assert object_file.read() == name.encode() * 10
+    [events] = store.events_collection.inserts
+    assert sorted((event['object'], event['method']) for event in events) == \
+        [('bucket/a', 'get'), ('bucket/b', 'get'), ('bucket/missing', 'error_get')]
+
+
+def test_bytes_round_trip_without_files(store):
+    context = get_context()
+    store.put_bytes(context, 'bucket', 'text', 'content')
+
+    assert store.get_bytes(context, 'bucket', 'text') == b'content'
+    assert not os.path.exists('bucket/text')
+    etag = store.client.stat_object('bucket', 'text').etag
+    [put] = get_events(store, context, 'put')
+    [get] = get_events(store, context, 'get')
+    assert (put['size'], put['etag']) == (7, etag)
+    assert (get['size'], get['etag']) == (7, etag)
+
+
+class Pipe:
+    """
+    A stream of unknown length, like the stdout of a process, read in small chunks.
+    """
+
+    def __init__(self, chunks) -> None:
+        self.chunks = list(chunks)
+
+    def read(self, size=-1):
+        return self.chunks.pop(0) if self.chunks else b''
+
+
+def test_stream_round_trip(store):
+    context = get_context()
+    chunks = [os.urandom(1000) for _ in range(5)]
+    store.put_stream(context, 'bucket', 'stream', Pipe(chunks))
+
+    with store.get_stream(context, 'bucket', 'stream') as stream:
+        assert b''.join(stream.iter_chunks(700)) == b''.join(chunks)
+
+    etag = store.client.stat_object('bucket', 'stream').etag
+    [put] = get_events(store, context, 'put')
+    [get] = get_events(store, context, 'get')
+    assert (put['size'], put['etag']) == (5000, etag)
+    assert (get['size'], get['etag']) == (5000, etag)
+
+
+def test_missing_object_stream_raises_no_such_key(store):
+    context = get_context()
+    with pytest.raises(NoSuchKeyException):
+        store.get_stream(context, 'bucket', 'missing')
+    with pytest.raises(NoSuchKeyException):
+        store.get_bytes(context, 'bucket', 'missing')
+    assert len(get_events(store, context, 'error_get')) == 2
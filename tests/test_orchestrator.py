@@ -0,0 +1,65 @@
+import asyncio
+
+from BaseOrchestrator import BaseOrchestrator
+from Executor import Executor
+from conftest import get_orchestrator, start_fake
+
+
+class CancellingExecutor(Executor):
+    """
+    Invokes nothing and cancels the future of every tracked activation, like an executor being closed.
+    """
+
+    def __init__(self) -> None:
+        self.num_invocations = 0
+
+    async def invoke(self, action_name, params) -> str:
+        self.num_invocations += 1
+        return 'activation-{}'.format(self.num_invocations)
+
+    def track(self, activation_id, start_ts, expected_runtime=None) -> asyncio.Future:
+        future = asyncio.get_running_loop().create_future()
+        asyncio.get_running_loop().call_later(0.01, future.cancel)
+        return future
+
+    def untrack(self, activation_id):
+        return 0
+
+    async def close(self):
+        pass
+
+
+def test_cancelled_activation_is_a_failed_completion(log_file):
+    async def main():
+        executor = CancellingExecutor()
+        orch = BaseOrchestrator(None, adaptive_polling=False, storage_config={}, log_file=log_file, executor=executor)
+        orch.start('cancellation-test')
+        results = await asyncio.wait_for(orch.make_action([orch.prepare_action('transcode', {})], retries=1), 10)
+        orch.instrumentation.flush()
+        attempts = orch.db_collection.find_one({'_id': results[0]['action_id']})['attempts']
+        await orch.close()
+        return executor.num_invocations, results[0], attempts
+
+    num_invocations, result, attempts = asyncio.run(main())
+    assert not result['success']
+    assert result['error']['code'] == 'Cancelled'
+    # the cancelled activation is retried like any failed one
+    assert num_invocations == 2
+    assert [attempt.get('cancelled') for attempt in attempts] == [True, True]
+
+
+def test_stream_yields_results_in_completion_order(log_file):
+    async def main():
+        fake, url = await start_fake()
+        orch = get_orchestrator(url, log_file)
+        orch.start('stream-test')
+        actions = [orch.prepare_action('stream', {'runtime': runtime}) for runtime in [0.6, 0.05, 0.3]]
+        streamed = [(index, res) async for index, res in orch.make_action_stream(actions, parallelisation=3)]
+        orch.stop()
+        await orch.close()
+        await fake.stop()
+        return streamed
+
+    streamed = asyncio.run(main())
+    assert [index for index, _ in streamed] == [1, 2, 0]
+    assert [res['result']['runtime'] for _, res in streamed] == [0.05, 0.3, 0.6]
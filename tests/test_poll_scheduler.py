@@ -0,0 +1,40 @@
+import time
+
+from PollScheduler import PollScheduler
+
+
+def test_first_check_at_expected_runtime():
+    scheduler = PollScheduler(min_interval=0.1, max_interval=8)
+    scheduler.add('predicted', expected_runtime=2)
+    scheduler.add('unknown')
+
+    assert scheduler.time_to_next() <= 0.1
+    assert scheduler.pop_due() == []
+    time.sleep(0.12)
+    assert scheduler.pop_due() == ['unknown']
+    assert 1.5 < scheduler.time_to_next() <= 2
+
+
+def test_reschedule_backs_off_up_to_max_interval():
+    scheduler = PollScheduler(min_interval=0.1, max_interval=0.5)
+    scheduler.add('a')
+    intervals = []
+    for _ in range(5):
+        scheduler.reschedule('a')
+        intervals.append(round(max(entry for entry, _ in scheduler.queue) - time.monotonic(), 1))
+
+    assert intervals == [0.1, 0.2, 0.4, 0.5, 0.5]
+    assert scheduler.remove('a') == 5
+
+
+def test_removed_activation_is_never_due():
+    scheduler = PollScheduler(min_interval=0.01)
+    scheduler.add('a')
+    scheduler.add('b')
+    scheduler.remove('a')
+    # rescheduling an activation which is not scheduled any more does nothing
+    scheduler.reschedule('a')
+    time.sleep(0.02)
+
+    assert scheduler.pop_due() == ['b']
+    assert scheduler.time_to_next() is None
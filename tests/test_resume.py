@@ -0,0 +1,37 @@
+import asyncio
+
+from conftest import get_orchestrator, start_fake
+
+
+def test_resume_returns_recorded_results_and_adopts_running_activations(log_file):
+    async def pipeline(orch, results):
+        results.extend(await orch.make_action([orch.prepare_action('split', {'runtime': 0.05})]))
+        results.extend(await orch.make_action([orch.prepare_action('transcode', {'chunk': i, 'runtime': 1})
+                                               for i in range(2)], parallelisation=2))
+
+    async def main():
+        fake, url = await start_fake()
+        orch = get_orchestrator(url, log_file)
+        orch.start('resume-test')
+        task = asyncio.create_task(pipeline(orch, []))
+        await asyncio.sleep(0.5)
+        # the orchestrator dies while the transcodes are running
+        task.cancel()
+        orch.instrumentation.flush()
+        await orch.close()
+        num_invocations = len(fake.invocation_times)
+
+        resumed = get_orchestrator(url, log_file)
+        resumed.resume(orch.orch_id)
+        results = []
+        await pipeline(resumed, results)
+        resumed.stop()
+        await resumed.close()
+        await fake.stop()
+        return num_invocations, len(fake.invocation_times), results
+
+    before, after, results = asyncio.run(main())
+    assert before == 3
+    assert after == before
+    assert [res['success'] for res in results] == [True, True, True]
+    assert [res['result']['chunk'] for res in results[1:]] == [0, 1]
@@ -0,0 +1,60 @@
+import asyncio
+
+from conftest import get_orchestrator
+from fake_executor import FakeExecutor
+
+
+def fail(params):
+    return {'error': {'code': None, 'message': 'Injected failure', 'meta': None}}
+
+
+def fail_first(num_failures):
+    """
+    Returns the function of an action whose first num_failures activations fail.
+    """
+    activations = []
+
+    def _run(params):
+        activations.append(params)
+        return fail(params) if len(activations) <= num_failures else params
+
+    return _run
+
+
+def test_failed_action_is_retried_before_the_batch_ends(log_file):
+    async def main():
+        executor = FakeExecutor({'flaky': fail_first(1)})
+        orch = get_orchestrator(None, log_file, executor=executor, retry_backoff=0.01)
+        orch.start('retry-test')
+        results = await orch.make_action([orch.prepare_action('flaky', {}), orch.prepare_action('slow', {'runtime': 0.5})],
+                                         parallelisation=2)
+        orch.stop()
+        await orch.close()
+        return executor, results
+
+    executor, results = asyncio.run(main())
+    assert [res['success'] for res in results] == [True, True]
+    assert executor.names() == ['flaky', 'slow', 'flaky']
+    retry_start = executor.activations['activation-2'][0]
+    slow_start, slow_runtime, _ = executor.activations['activation-1']
+    # the retry does not wait for the slow action of the batch
+    assert retry_start < slow_start + slow_runtime
+
+
+def test_failed_action_is_retried_at_most_retries_times(log_file):
+    async def main():
+        executor = FakeExecutor({'failing': fail})
+        orch = get_orchestrator(None, log_file, executor=executor, retry_backoff=0.01)
+        orch.start('retry-count-test')
+        results = await orch.make_action([orch.prepare_action('failing', {})], retries=2)
+        orch.instrumentation.flush()
+        attempts = orch.db_collection.find_one({'_id': results[0]['action_id']})['attempts']
+        orch.stop()
+        await orch.close()
+        return executor, results, attempts
+
+    executor, results, attempts = asyncio.run(main())
+    assert not results[0]['success']
+    assert results[0]['error']['message'] == 'Injected failure'
+    assert executor.names() == ['failing'] * 3
+    assert len(attempts) == 3
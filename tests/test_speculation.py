@@ -0,0 +1,54 @@
+import asyncio
+
+from conftest import get_orchestrator
+from fake_executor import FakeExecutor
+
+
+class StragglingExecutor(FakeExecutor):
+    """
+    The activations invoked while straggle is set never complete, like one stuck on a slow invoker.
+    """
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.straggle = False
+
+    async def invoke(self, action_name, params) -> str:
+        activation_id = await super().invoke(action_name, params)
+        if self.straggle:
+            start, _, result = self.activations[activation_id]
+            self.activations[activation_id] = (start, None, result)
+            self.straggle = False
+        return activation_id
+
+
+def test_speculative_copy_of_a_straggler_wins(log_file):
+    async def main():
+        executor = StragglingExecutor()
+        orch = get_orchestrator(None, log_file, executor=executor, min_speculation_samples=3)
+        # earlier runs give the runtimes the straggler is compared with
+        orch.start('speculation-test')
+        await orch.make_action([orch.prepare_action('speculated', {'runtime': 0.02, 'index': i}) for i in range(3)],
+                               parallelisation=3)
+        orch.stop()
+
+        orch.start('speculation-test')
+        executor.straggle = True
+        [res] = await asyncio.wait_for(orch.make_action([orch.prepare_action('speculated', {'runtime': 0.02, 'index': 3})],
+                                                        parallelisation=2, speculative=True), 10)
+        orch.instrumentation.flush()
+        info = orch.db_collection.find_one({'_id': res['action_id']})
+        ignored = orch.store.db_collection.find_one({'_id': res['action_id']})['ignored_activations']
+        orch.stop()
+        await orch.close()
+        return executor, res, info, ignored
+
+    executor, res, info, ignored = asyncio.run(main())
+    assert res['success'] and res['result']['index'] == 3
+    straggler, copy = executor.invocations[3:]
+    assert straggler[1]['index'] == copy[1]['index'] == 3
+    # the straggler is recorded as the ignored loser, so the objects it writes are not used for lookups
+    assert ignored == ['activation-3']
+    attempts = {attempt['activation_id']: attempt for attempt in info['attempts']}
+    assert (attempts['activation-3']['speculative'], attempts['activation-3']['ignored']) == (False, True)
+    assert (attempts['activation-4']['speculative'], attempts['activation-4']['success']) == (True, True)
@@ -0,0 +1,46 @@
+import asyncio
+import time
+
+from OpenwhiskClient import ThrottledException
+from conftest import get_orchestrator
+from fake_executor import FakeExecutor
+
+
+class ThrottlingExecutor(FakeExecutor):
+    """
+    Rejects the first num_throttles invocations with a 429, as openwhisk does over the limits of the namespace.
+    """
+
+    def __init__(self, num_throttles, retry_after=None) -> None:
+        super().__init__()
+        self.num_throttles = num_throttles
+        self.retry_after = retry_after
+        self.rejection_times = []
+
+    async def invoke(self, action_name, params) -> str:
+        if len(self.rejection_times) < self.num_throttles:
+            self.rejection_times.append(time.time())
+            raise ThrottledException(429, self.retry_after, 'Too many concurrent requests in flight')
+        return await super().invoke(action_name, params)
+
+
+def test_throttled_invocation_is_made_again_without_using_a_retry(log_file):
+    async def main():
+        executor = ThrottlingExecutor(num_throttles=3, retry_after=0.1)
+        orch = get_orchestrator(None, log_file, executor=executor, retry_backoff=0.01)
+        orch.start('throttling-test')
+        [res] = await asyncio.wait_for(orch.make_action([orch.prepare_action('throttled', {})], retries=0), 10)
+        orch.instrumentation.flush()
+        info = orch.db_collection.find_one({'_id': res['action_id']})
+        orch.stop()
+        await orch.close()
+        return executor, res, info
+
+    executor, res, info = asyncio.run(main())
+    assert res['success']
+    assert executor.names() == ['throttled']
+    # every invocation waits for the retry_after of the rejection before it, rather than only the much shorter backoff
+    invocation_time = executor.activations['activation-0'][0]
+    gaps = [later - earlier for earlier, later in zip(executor.rejection_times, executor.rejection_times[1:] + [invocation_time])]
+    assert len(gaps) == 3 and min(gaps) >= 0.1
+    assert len(info['attempts']) == 1
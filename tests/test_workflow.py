@@ -0,0 +1,66 @@
+import asyncio
+
+import pytest
+
+from Workflow import Workflow
+from conftest import get_orchestrator, start_fake
+
+
+def test_fan_out_and_map_follow_the_results_of_their_parents(log_file):
+    async def main():
+        fake, url = await start_fake()
+        orch = get_orchestrator(url, log_file)
+        orch.start('workflow-test')
+        # the actions of the fake openwhisk return their parameters
+        workflow = Workflow(orch, concurrency=3)
+        workflow.action('split', 'workflow-split', {'splits': ['a', 'b', 'c']})
+        workflow.fan_out('transcode', 'workflow-transcode', parent='split', items=lambda results: results['split']['splits'],
+                         params=lambda chunk, results: {'chunk': chunk, 'runtime': 0.8 if chunk == 'c' else 0.05})
+        workflow.map('upload', 'workflow-upload', parent='transcode',
+                     params=lambda results: {'chunk': results['transcode']['chunk'] + '-uploaded'})
+        workflow.action('combine', 'workflow-combine', after=['upload'],
+                        params=lambda results: {'chunks': [res['chunk'] for res in results['upload']]})
+        results = await workflow.run()
+        orch.stop()
+        await orch.close()
+        await fake.stop()
+        return results, {activation['result'].get('chunk'): activation for activation in fake.activations.values()}
+
+    results, activations = asyncio.run(main())
+    assert [res['chunk'] for res in results['transcode']] == ['a', 'b', 'c']
+    assert results['combine']['chunks'] == ['a-uploaded', 'b-uploaded', 'c-uploaded']
+    # the upload of a starts as soon as its transcode is done, without waiting for the transcode of c
+    assert activations['a-uploaded']['start'] < activations['c']['end']
+
+
+def test_empty_fan_out_completes_its_dependants(log_file):
+    async def main():
+        fake, url = await start_fake()
+        orch = get_orchestrator(url, log_file)
+        orch.start('workflow-empty-test')
+        workflow = Workflow(orch)
+        workflow.action('split', 'workflow-split', {'splits': []})
+        workflow.fan_out('transcode', 'workflow-transcode', parent='split', items=lambda results: results['split']['splits'],
+                         params=lambda chunk, results: {'chunk': chunk})
+        workflow.action('combine', 'workflow-combine', after=['transcode'],
+                        params=lambda results: {'num_chunks': len(results['transcode'])})
+        results = await workflow.run()
+        orch.stop()
+        await orch.close()
+        await fake.stop()
+        return results
+
+    results = asyncio.run(main())
+    assert results['transcode'] == []
+    assert results['combine']['num_chunks'] == 0
+
+
+def test_nodes_can_only_depend_on_declared_nodes():
+    workflow = Workflow(None)
+    workflow.action('split', 'workflow-split', {})
+    with pytest.raises(Exception, match='has not been declared'):
+        workflow.action('combine', 'workflow-combine', {}, after=['transcode'])
+    with pytest.raises(Exception, match='can only map over'):
+        workflow.map('upload', 'workflow-upload', parent='split', params=lambda results: {})
+    with pytest.raises(Exception, match='already exists'):
+        workflow.action('split', 'workflow-split', {})
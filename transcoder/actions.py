@@ -57,9 +57,10 @@ class AudioVideo:
         video_streams = []
         audio_streams = []
 
+        # every chunk is downloaded at once before ffmpeg starts
+        store.get_many(context, TRANSCODED_CHUNKS_NAME, files)
         for file_name in files:
             input_file = f"{TRANSCODED_CHUNKS_NAME}/{file_name}"
-            store.get_sync(context, TRANSCODED_CHUNKS_NAME, file_name)
             input_stream = ffmpeg.input(input_file)
             video_streams.append(input_stream.video)
             if input_stream.audio is not None:
@@ -107,9 +108,9 @@ class AudioVideo:
             ffmpeg.input(input_file, ss=i * chunk_size, t=chunk_size).output(
                 output_file, codec='copy').run(overwrite_output=True, quiet=True)
             splits.append(output_file_name)
-            print("putting")
-            store.put_sync(context, CHUNKS_BUCKET_NAME, output_file_name)
 
+        print("putting")
+        store.put_many(context, CHUNKS_BUCKET_NAME, splits)
         print("Splits are: {}".format(splits))
 
         end = datetime.utcnow()
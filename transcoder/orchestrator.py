@@ -1,12 +1,28 @@
 import asyncio
+import os
 from object_store import store
 from BaseOrchestrator import BaseOrchestrator
+from LocalExecutor import LocalExecutor
+from Workflow import Workflow
 from constants import MINIO_ENDPOINT, AWS_ACCESS_KEY_ID, AWS_SECRET_ACCESS_KEY
 
 
 auth = ("23bc46b1-71f6-4ed5-8c54-816aa4f8c502",
         "123zO3xZCLrMN6v2BKK1dXYFpXlPkccOFqm12CdAsMgRU4VrNZ9lyGVCGuMDGIwP")
-orch = BaseOrchestrator(auth)
+# with LOCAL_EXECUTOR set, the actions run in local worker processes instead of openwhisk
+LOCAL_ACTIONS = {
+    'splitter': 'transcoder.actions',
+    'transcoder': 'transcoder.actions',
+    'combiner': 'transcoder.actions',
+}
+# the object store of the actions, the orchestrator checks the objects of memoized actions in it
+config = dict(
+    STORAGE_ENDPOINT=MINIO_ENDPOINT,
+    AWS_ACCESS_KEY_ID=AWS_ACCESS_KEY_ID,
+    AWS_SECRET_ACCESS_KEY=AWS_SECRET_ACCESS_KEY
+)
+orch = BaseOrchestrator(auth, storage_config=config, executor=LocalExecutor(
+    LOCAL_ACTIONS) if os.environ.get('LOCAL_EXECUTOR') else None)
 action_name = 'transcoder'
 
 CHUNKS_BUCKET_NAME = 'output-chunks'
@@ -16,12 +32,6 @@ INPUT_VIDEO_BUCKET = 'input-video'
 
 
 def get_store():
-    config = dict(
-        STORAGE_ENDPOINT=MINIO_ENDPOINT,
-        AWS_ACCESS_KEY_ID=AWS_ACCESS_KEY_ID,
-        AWS_SECRET_ACCESS_KEY=AWS_SECRET_ACCESS_KEY
-    )
-
     return store.ObjectStore(config, [
         CHUNKS_BUCKET_NAME, TRANSCODED_CHUNKS_NAME, PROCESSED_VIDEO_BUCKET, INPUT_VIDEO_BUCKET])
 
@@ -34,58 +44,40 @@ async def main():
     # you need to call start function
     orch.start('video-transcoding')
 
-    print("** Chunking **")
-    params = {
+    def get_combine_params(results):
+        chunks = results['split']['splits']
+        # shows the retry feature, in case of NoSuchKeyException
+        store.remove_object({}, TRANSCODED_CHUNKS_NAME, chunks[0])
+        return {
+            "type": "combine",
+            "input": chunks
+        }
+
+    # every chunk is transcoded as soon as the split is done, and the chunks are combined once all of them are transcoded
+    workflow = Workflow(orch, concurrency=transcoding_parallelisation)
+    workflow.action('split', 'splitter', {
         "type": "chunk",
         "num_chunks": num_chunks,
         "input": "facebook.mp4"
-    }
-
-    split_action = orch.prepare_action('splitter', params)
-    split_results = (await orch.make_action([split_action]))[0]
-    if not split_results['success']:
-        raise Exception('Error splitting in chunks')
-
-    chunks = split_results['result']['splits']
-
-    print(f"** Transcoding in batches of: {transcoding_parallelisation} **")
-
-    transcoding_actions = []
-    for i, chunk in enumerate(chunks):
-        params = {
-            "type": "transcode",
-            "input": chunk,
-            "resolution": "360p"
-        }
-        # if i % 2 == 0:
-        #     params["type"] = "transcodes"
-        transcoding_actions.append(
-            orch.prepare_action(action_name, params))
-
-    trans_results = await orch.make_action(transcoding_actions)
-    for res in trans_results:
-        if not res['success']:
-            raise Exception('Some transcoding Unsuccessful')
-
-    # shows the retry feature, in case of NoSuchKeyException
-    store.remove_object({}, TRANSCODED_CHUNKS_NAME, chunks[0])
-
-    print("** Combining **")
-    params = {
-        "type": "combine",
-        "input": chunks
-    }
-    combine_action = orch.prepare_action('combiner', params)
-    combine_results = (await orch.make_action([combine_action], object_ownership=False))[0]
-    if not combine_results['success']:
-        raise Exception('Error combining transcoded chunks')
+    })
+    workflow.fan_out('transcode', action_name, parent='split', items=lambda results: results['split']['splits'],
+                     params=lambda chunk, results: {
+                         "type": "transcode",
+                         "input": chunk,
+                         "resolution": "360p"
+                     })
+    workflow.action('combine', 'combiner', get_combine_params, after=['split', 'transcode'], object_ownership=False)
+
+    print(f"** Chunking, transcoding in batches of: {transcoding_parallelisation} and combining **")
+    results = await workflow.run()
 
     print("** Done **")
     print("Output available at: {}".format(
-        combine_results['result']['output_file']))
+        results['combine']['output_file']))
 
     # you need to call stop function
     orch.stop()
+    await orch.close()
 
 
 if __name__ == "__main__":